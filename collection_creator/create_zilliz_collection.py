@@ -1,12 +1,16 @@
 from fastapi import HTTPException
 from pymilvus import MilvusClient, DataType
+from typing import Dict, Iterator, Optional, Set
 from config.config import zillizconfig
+from utils.chunk_batch import ChunkBatch, rows_to_batch
+from collection_creator.vector_backend import collection_dimensions
 from pymilvus.exceptions import MilvusException, ConnectError
 import logging
 
 class ZillizClient:
     def __init__(self):
         self.client=None
+        self._fields: Dict[str, Set[str]] = {}
         self.connect()
 
     def connect(self):
@@ -27,17 +31,19 @@ class ZillizClient:
             print(f"Unexpected error when connecting to Zilliz Cloud: {str(e)}")
             raise
         
-    def create_collection(self, collection_name: str):
+    def create_collection(self, collection_name: str, dims: Optional[Dict[str, int]] = None):
         """
         Curate collection from given collection name - is the model_provider_session_id
-        Input fields and schema includes id, vector, content, overview, source and url fields
+        Input fields and schema includes id, vector, content, overview, source, url and source_urls fields
+        Each vector field gets its own dim (VECTOR_DIMENSIONS, overridable per collection with `dims`)
         Uses COSINE as similarity score - can also replace with L2 or other supported distance metric
         """
         try:
             if collection_name in self.client.list_collections():
                 print(f"Collection {collection_name} exists.")
                 return 
-            print(f"Collection doesnt exist, Creating new collection: {collection_name}")
+            dims = collection_dimensions(dims)
+            print(f"Collection doesnt exist, Creating new collection: {collection_name} with dims {dims}")
             schema = self.client.create_schema(
                 enable_dynamic_field=False,
                 description=f"Schema for {collection_name}'s collection.",
@@ -59,13 +65,13 @@ class ZillizClient:
                 field_name="vector",
                 datatype=DataType.FLOAT_VECTOR,
                 description="Content Embedding",
-                dim=zillizconfig.VECTOR_DIMENSION
+                dim=dims["vector"]
             )
             schema.add_field(
                 field_name="vector_openai",
                 datatype=DataType.FLOAT_VECTOR,
                 description="Content Embedding",
-                dim=zillizconfig.VECTOR_DIMENSION
+                dim=dims["vector_openai"]
             )
             schema.add_field(
                 field_name="overview",
@@ -85,6 +91,12 @@ class ZillizClient:
                 description="URL from which data is extracted from",
                 max_length=500
             )
+            schema.add_field(
+                field_name="source_urls",
+                datatype=DataType.VARCHAR,
+                description="Newline separated URLs a deduplicated chunk appeared on",
+                max_length=65535
+            )
             index_params = self.client.prepare_index_params()
             index_params.add_index(
                 field_name="vector", metric_type="COSINE", index_type="AUTOINDEX"
@@ -95,9 +107,12 @@ class ZillizClient:
             self.client.create_collection(
                 collection_name=collection_name, schema=schema, index_params=index_params, using="default"
             )
+            self._fields.pop(collection_name, None)
         
             logging.info(f"Collection {collection_name} created successfully.")
             return 
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         except MilvusException as e:
             logging.error(f"Milvus error when creating collection {collection_name}: {str(e)}")
             raise HTTPException(status_code=500, detail="Milvus error when creating collection")
@@ -105,27 +120,100 @@ class ZillizClient:
             logging.error(f"Unexpected error when creating collection {collection_name}: {str(e)}")
             raise HTTPException(status_code=500, detail="Unexpected error when creating collection")
 
-    def insert_records(self, collection_name: str, records: list):
+    def insert_records(self, collection_name: str, records) -> list:
         """
         Inserts chunks into schema - validates  data and pushes it to given collection name
+        records is a ChunkBatch (vectors go to Milvus as float32 rows) or a list of records carrying their vectors
+        Returns the auto generated primary keys in record order
         """
         try:
-            entities = []
-            for record in records:
-                entities.append({
-                    "content" :record.content,
-                    "overview": record.overview,
-                    "source": record.meta_data.source,
-                    "url": record.meta_data.url or "",
-                    "vector": record.vector,
-                    "vector_openai": record.vector_openai
-                })
+            batch = records if isinstance(records, ChunkBatch) else ChunkBatch.from_records(records)
+            entities = batch.to_entities(self.get_scalar_fields(collection_name))
             logging.info(f"Inserting {len(records)} records into collection {collection_name}")
-            self.client.insert(collection_name=collection_name, data=entities)
+            result = self.client.insert(collection_name=collection_name, data=entities)
             logging.info(f"Successfully inserted {len(records)} records into {collection_name}")
+            return list(result["ids"])
         except MilvusException as e:
             logging.error(f"Milvus error when inserting records into {collection_name}: {str(e)}")
             raise HTTPException(status_code=500, detail="Milvus error when inserting records")
         except Exception as e:
             logging.error(f"Unexpected error when inserting records into {collection_name}: {str(e)}")
-            raise HTTPException(status_code=500, detail="Unexpected error when inserting records")
\ No newline at end of file
+            raise HTTPException(status_code=500, detail="Unexpected error when inserting records")
+
+    def delete_records(self, collection_name: str, ids: list):
+        """
+        Deletes records from the given collection by primary key
+        """
+        if not ids:
+            return
+        try:
+            logging.info(f"Deleting {len(ids)} records from collection {collection_name}")
+            self.client.delete(collection_name=collection_name, ids=ids)
+        except MilvusException as e:
+            logging.error(f"Milvus error when deleting records from {collection_name}: {str(e)}")
+            raise HTTPException(status_code=500, detail="Milvus error when deleting records")
+        except Exception as e:
+            logging.error(f"Unexpected error when deleting records from {collection_name}: {str(e)}")
+            raise HTTPException(status_code=500, detail="Unexpected error when deleting records")
+
+    def get_dimensions(self, collection_name: str) -> Dict[str, int]:
+        """
+        Dim of every vector field in the collection's schema - collections created before per-field dims
+        report VECTOR_DIMENSION for both fields
+        """
+        try:
+            description = self.client.describe_collection(collection_name=collection_name)
+            return {
+                field["name"]: int(field["params"]["dim"])
+                for field in description["fields"]
+                if field["type"] == DataType.FLOAT_VECTOR
+            }
+        except MilvusException as e:
+            logging.error(f"Milvus error when describing collection {collection_name}: {str(e)}")
+            raise HTTPException(status_code=500, detail="Milvus error when describing collection")
+
+    def get_scalar_fields(self, collection_name: str) -> Set[str]:
+        """
+        Non-vector fields of the collection's schema, cached per collection - collections created before
+        source_urls was added don't have it
+        """
+        if collection_name not in self._fields:
+            try:
+                description = self.client.describe_collection(collection_name=collection_name)
+            except MilvusException as e:
+                logging.error(f"Milvus error when describing collection {collection_name}: {str(e)}")
+                raise HTTPException(status_code=500, detail="Milvus error when describing collection")
+            self._fields[collection_name] = {
+                field["name"] for field in description["fields"]
+                if field["type"] != DataType.FLOAT_VECTOR and not field.get("is_primary")
+            }
+        return self._fields[collection_name]
+
+    def iter_collection(self, collection_name: str, batch_size: int = 1000) -> Iterator[ChunkBatch]:
+        """
+        Pages through every record of the collection as ChunkBatches carrying their stored vectors
+        """
+        fields = list(self.get_dimensions(collection_name))
+        iterator = self.client.query_iterator(
+            collection_name=collection_name,
+            batch_size=batch_size,
+            output_fields=[*sorted(self.get_scalar_fields(collection_name)), *fields],
+        )
+        try:
+            while True:
+                rows = iterator.next()
+                if not rows:
+                    break
+                yield rows_to_batch(collection_name, rows, fields)
+        finally:
+            iterator.close()
+
+    def replace_collection(self, collection_name: str, replacement: str):
+        """
+        Drops collection_name and renames replacement into its place
+        """
+        logging.info(f"Replacing collection {collection_name} with {replacement}")
+        self.client.drop_collection(collection_name=collection_name)
+        self.client.rename_collection(old_name=replacement, new_name=collection_name)
+        self._fields.pop(collection_name, None)
+        self._fields.pop(replacement, None)
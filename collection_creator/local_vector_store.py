@@ -0,0 +1,303 @@
+from typing import Iterator, List, Optional, Dict, Any
+from collection_creator.query_milvus import VectorSearchBase
+from collection_creator.vector_backend import collection_dimensions
+from config.config import zillizconfig
+from utils.chunk_batch import ChunkBatch, rows_to_batch
+import json
+import logging
+import os
+import shutil
+import numpy as np
+
+SCALAR_FIELDS = ["content", "overview", "source", "url", "source_urls"]
+
+
+class LocalCollection:
+    """
+    On-disk collection for the local vector backend
+    Each vector field is an append-only float32 matrix file (rows L2-normalised at insert time, read via np.memmap)
+    and scalar fields are kept in a JSON lines file - row i of every file is the same record
+    Deletes append the row id to a tombstone file and are masked out at search time
+    """
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, "meta.json"), "r") as f:
+            self.meta = json.load(f)
+            self._meta_inode = os.fstat(f.fileno()).st_ino
+        self._vectors: Dict[str, np.memmap] = {}
+        self.records: List[Dict[str, Any]] = []
+        self._records_offset = 0
+        self.deleted = np.empty(0, dtype=np.int64)
+        self._deleted_size = 0
+
+    @classmethod
+    def create(cls, path: str, dims: Dict[str, int]) -> "LocalCollection":
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, "meta.json"), "w") as f:
+            json.dump({"dims": dims}, f)
+        for field in dims:
+            open(os.path.join(path, f"{field}.f32"), "ab").close()
+        open(os.path.join(path, "records.jsonl"), "ab").close()
+        open(os.path.join(path, "deleted.i64"), "ab").close()
+        return cls(path)
+
+    @property
+    def dims(self) -> Dict[str, int]:
+        return self.meta["dims"]
+
+    def refresh(self):
+        """
+        Pick up rows appended since the last read (by this or another process)
+        Raises when the collection was dropped or replaced (e.g. by migrate_collection) since it was opened
+        """
+        meta_path = os.path.join(self.path, "meta.json")
+        if not os.path.exists(meta_path) or os.stat(meta_path).st_ino != self._meta_inode:
+            raise RuntimeError(f"Local collection {self.path} was dropped or replaced, reload it")
+        deleted_path = os.path.join(self.path, "deleted.i64")
+        if os.path.exists(deleted_path) and os.path.getsize(deleted_path) != self._deleted_size:
+            self.deleted = np.unique(np.fromfile(deleted_path, dtype=np.int64))
+            self._deleted_size = os.path.getsize(deleted_path)
+
+        records_path = os.path.join(self.path, "records.jsonl")
+        if os.path.getsize(records_path) == self._records_offset:
+            return
+        with open(records_path, "r") as f:
+            f.seek(self._records_offset)
+            for line in iter(f.readline, ""):
+                if not line.endswith("\n"):
+                    break
+                self.records.append(json.loads(line))
+                self._records_offset = f.tell()
+
+    def vectors(self, field: str) -> np.ndarray:
+        """
+        Memory-mapped (num_rows, dim) matrix for a vector field
+        """
+        self.refresh()
+        rows = len(self.records)
+        matrix = self._vectors.get(field)
+        if matrix is None or matrix.shape[0] != rows:
+            if rows == 0:
+                return np.empty((0, self.dims[field]), dtype=np.float32)
+            matrix = np.memmap(
+                os.path.join(self.path, f"{field}.f32"), dtype=np.float32, mode="r", shape=(rows, self.dims[field])
+            )
+            self._vectors[field] = matrix
+        return matrix
+
+    def append(self, vectors: Dict[str, np.ndarray], records: List[Dict[str, Any]]) -> List[int]:
+        self.refresh()
+        first_id = len(self.records)
+        for field, dim in self.dims.items():
+            matrix = np.asarray(vectors[field], dtype=np.float32).reshape(len(records), dim)
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            matrix = matrix / np.where(norms == 0, 1.0, norms)
+            with open(os.path.join(self.path, f"{field}.f32"), "ab") as f:
+                f.write(matrix.tobytes())
+        ids = list(range(first_id, first_id + len(records)))
+        # records are written last, so a row only becomes visible once all its vectors are on disk
+        with open(os.path.join(self.path, "records.jsonl"), "a") as f:
+            for record_id, record in zip(ids, records):
+                f.write(json.dumps({"id": record_id, **record}) + "\n")
+        self.refresh()
+        return ids
+
+    def delete(self, ids: List[int]):
+        """
+        Tombstone rows by id (ids are row numbers) - deleted rows are masked out of search
+        Ids that aren't live rows are ignored, like Milvus does for unknown primary keys
+        """
+        self.refresh()
+        ids = np.unique(np.asarray(ids, dtype=np.int64))
+        valid = ids[(ids >= 0) & (ids < len(self.records))]
+        valid = np.setdiff1d(valid, self.deleted)
+        if len(valid) < len(ids):
+            logging.warning(f"Ignoring {len(ids) - len(valid)} unknown or already deleted ids in {self.path}")
+        if not len(valid):
+            return
+        with open(os.path.join(self.path, "deleted.i64"), "ab") as f:
+            f.write(valid.tobytes())
+        self.refresh()
+
+
+class LocalVectorClient:
+    """
+    Local drop-in for ZillizClient - stores collections as NumPy matrices under LOCAL_VECTOR_STORE_PATH
+    """
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or zillizconfig.LOCAL_VECTOR_STORE_PATH
+        os.makedirs(self.path, exist_ok=True)
+
+    def list_collections(self) -> List[str]:
+        return [name for name in os.listdir(self.path) if os.path.exists(os.path.join(self.path, name, "meta.json"))]
+
+    def create_collection(self, collection_name: str, dims: Optional[Dict[str, int]] = None):
+        """
+        Create the local collection with the same vector fields and per-field dims as the Zilliz schema
+        """
+        if collection_name in self.list_collections():
+            print(f"Collection {collection_name} exists.")
+            return
+        LocalCollection.create(os.path.join(self.path, collection_name), collection_dimensions(dims))
+        logging.info(f"Local collection {collection_name} created successfully.")
+
+    def get_dimensions(self, collection_name: str) -> Dict[str, int]:
+        return dict(LocalCollection(os.path.join(self.path, collection_name)).dims)
+
+    def insert_records(self, collection_name: str, records) -> List[int]:
+        """
+        Appends chunks with their embeddings to the local collection and returns the new ids
+        records is a ChunkBatch, or a list of records carrying their vectors
+        """
+        batch = records if isinstance(records, ChunkBatch) else ChunkBatch.from_records(records)
+        collection = LocalCollection(os.path.join(self.path, collection_name))
+        logging.info(f"Inserting {len(batch)} records into local collection {collection_name}")
+        return collection.append(batch.vectors, list(batch.scalar_rows()))
+
+    def delete_records(self, collection_name: str, ids: list):
+        """
+        Deletes records from the local collection by id
+        """
+        if not ids:
+            return
+        logging.info(f"Deleting {len(ids)} records from local collection {collection_name}")
+        LocalCollection(os.path.join(self.path, collection_name)).delete(ids)
+
+
+    def iter_collection(self, collection_name: str, batch_size: int = 1000) -> Iterator[ChunkBatch]:
+        """
+        Pages through the live (not deleted) records as ChunkBatches carrying their stored vectors
+        """
+        collection = LocalCollection(os.path.join(self.path, collection_name))
+        collection.refresh()
+        live = np.setdiff1d(np.arange(len(collection.records)), collection.deleted)
+        for start in range(0, len(live), batch_size):
+            rows = live[start:start + batch_size]
+            batch = rows_to_batch(collection_name, [collection.records[i] for i in rows], [])
+            for field in collection.dims:
+                batch.set_vectors(field, collection.vectors(field)[rows])
+            yield batch
+
+    def replace_collection(self, collection_name: str, replacement: str):
+        """
+        Drops collection_name and moves replacement into its place
+        """
+        logging.info(f"Replacing local collection {collection_name} with {replacement}")
+        shutil.rmtree(os.path.join(self.path, collection_name))
+        os.rename(os.path.join(self.path, replacement), os.path.join(self.path, collection_name))
+
+
+class LocalVectorSearch(VectorSearchBase):
+    """
+    Local drop-in for ZillizVectorSearch - exact cosine top-k with one matrix multiply per query batch
+    """
+    def __init__(self, path: Optional[str] = None, embedding_service=None):
+        self.path = path or zillizconfig.LOCAL_VECTOR_STORE_PATH
+        self.collection: Optional[LocalCollection] = None
+        self.embedding_service = embedding_service
+
+    def has_collection(self, collection_name: str) -> bool:
+        return os.path.exists(os.path.join(self.path, collection_name, "meta.json"))
+
+    def load_collection(self, collection_name: str) -> None:
+        self.collection = LocalCollection(os.path.join(self.path, collection_name))
+        self.dimensions = dict(self.collection.dims)
+
+    def _top_k(self, embeddings: List[List[float]], vector_field: str, top_k: int):
+        """
+        Exact cosine similarity top-k - returns (indices, scores), both (num_queries, k) and sorted best first
+        """
+        matrix = self.collection.vectors(vector_field)
+        queries = np.asarray(self._fit_queries(embeddings, vector_field), dtype=np.float32).reshape(-1, matrix.shape[1])
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        queries = queries / np.where(norms == 0, 1.0, norms)
+
+        deleted = self.collection.deleted
+        # tombstones written by other tools may point past the rows this matrix covers
+        deleted = deleted[(deleted >= 0) & (deleted < matrix.shape[0])]
+        k = min(top_k, matrix.shape[0] - len(deleted))
+        if k <= 0:
+            return np.empty((len(queries), 0), dtype=np.int64), np.empty((len(queries), 0), dtype=np.float32)
+        scores = queries @ matrix.T
+        if len(deleted):
+            scores[:, deleted] = -np.inf
+        indices = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, indices, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        return np.take_along_axis(indices, order, axis=1), np.take_along_axis(top_scores, order, axis=1)
+
+    def _hits(self, indices, scores, output_fields: Optional[List[str]]) -> List[List[Dict[str, Any]]]:
+        results = []
+        for query_indices, query_scores in zip(indices, scores):
+            hits = []
+            for index, score in zip(query_indices, query_scores):
+                record = self.collection.records[index]
+                hit: Dict[str, Any] = {"id": record["id"], "distance": float(score)}
+                for field in output_fields or []:
+                    hit[field] = record.get(field)
+                hits.append(hit)
+            results.append(hits)
+        return results
+
+    def search(
+        self,
+        embeddings: List[List[float]],
+        vector_field: str = "vector",
+        top_k: int = 3,
+        metric: str = "COSINE",
+        nprobe: int = 10,
+        output_fields: Optional[List[str]] = ['content', 'overview'],
+        expr: Optional[str] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Same contract as ZillizVectorSearch.search - only COSINE and no filter expressions are supported
+        """
+        if self.collection is None:
+            raise ValueError("Collection not loaded; call load_collection() first.")
+        if metric != "COSINE" or expr:
+            raise ValueError("Local vector backend only supports COSINE search without filter expressions")
+
+        indices, scores = self._top_k(embeddings, vector_field, top_k)
+        return self._hits(indices, scores, output_fields)
+
+    def hybrid_search(
+        self,
+        embeddings: Dict[str, List[List[float]]],
+        top_k: int = 3,
+        ranker: str = "rrf",
+        weights: Optional[List[float]] = None,
+        rrf_k: int = 60,
+        candidate_limit: Optional[int] = None,
+        metric: str = "COSINE",
+        nprobe: int = 10,
+        output_fields: Optional[List[str]] = ['content', 'overview'],
+        expr: Optional[str] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Same contract as ZillizVectorSearch.hybrid_search - fuses per-field candidates with RRF or weighted scores
+        """
+        if self.collection is None:
+            raise ValueError("Collection not loaded; call load_collection() first.")
+        if metric != "COSINE" or expr:
+            raise ValueError("Local vector backend only supports COSINE search without filter expressions")
+        if ranker not in ("rrf", "weighted"):
+            raise ValueError(f"Unsupported ranker: {ranker}")
+
+        weights = weights or [1.0] * len(embeddings)
+        fused: List[Dict[int, float]] = []
+        for weight, (field, field_embeddings) in zip(weights, embeddings.items()):
+            indices, scores = self._top_k(field_embeddings, field, candidate_limit or 2 * top_k)
+            for query, (query_indices, query_scores) in enumerate(zip(indices, scores)):
+                if len(fused) <= query:
+                    fused.append({})
+                for rank, (index, score) in enumerate(zip(query_indices, query_scores)):
+                    # weighted ranker normalises cosine scores to [0, 1] like Milvus does
+                    contribution = 1.0 / (rrf_k + rank + 1) if ranker == "rrf" else weight * (score + 1) / 2
+                    fused[query][index] = fused[query].get(index, 0.0) + contribution
+
+        indices, scores = [], []
+        for candidates in fused:
+            ranked = sorted(candidates.items(), key=lambda item: item[1], reverse=True)[:top_k]
+            indices.append([index for index, _ in ranked])
+            scores.append([score for _, score in ranked])
+        return self._hits(indices, scores, output_fields)
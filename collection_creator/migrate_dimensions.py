@@ -0,0 +1,56 @@
+from typing import Dict, Optional
+from config.config import onboardconfig
+from utils.chunk_batch import fit_embeddings
+import logging
+import os
+
+
+def migrate_collection(
+    client,
+    collection_name: str,
+    dims: Optional[Dict[str, int]] = None,
+    target: Optional[str] = None,
+    replace: bool = False,
+    batch_size: int = 1000,
+    fingerprints=None,
+) -> int:
+    """
+    Copies a collection into a new one with per-field dims (VECTOR_DIMENSIONS unless `dims` is given)
+    Nothing is re-embedded - legacy collections zero-pad jina vectors to VECTOR_DIMENSION so their leading dims are
+    the native vector, and jina-v3 / text-embedding-3 are Matryoshka trained, so truncating and re-normalising the
+    stored vectors gives the same embedding the models return at the smaller size.
+    client is a ZillizClient or LocalVectorClient. With replace=True the source is dropped and the copy takes its name;
+    the copied rows get new primary keys, so the session's FingerprintStore (`fingerprints`, defaults to the one at
+    FINGERPRINT_DB_PATH when it exists) is remapped to them, or cleared when the old keys can't be read back.
+    Returns the number of records copied
+    """
+    target = target or f"{collection_name}_migrated"
+    client.create_collection(target, dims)
+    target_dims = client.get_dimensions(target)
+    logging.info(f"Migrating {collection_name} {client.get_dimensions(collection_name)} -> {target} {target_dims}")
+
+    copied = 0
+    id_map: Optional[Dict[int, int]] = {}
+    for batch in client.iter_collection(collection_name, batch_size):
+        for field in list(batch.vectors):
+            batch.set_vectors(field, fit_embeddings(batch.vectors[field], target_dims[field]))
+        new_ids = client.insert_records(target, batch)
+        if batch.ids is None or id_map is None:
+            id_map = None
+        else:
+            id_map.update(zip(batch.ids, new_ids))
+        copied += len(batch)
+    logging.info(f"Copied {copied} records from {collection_name} to {target}")
+
+    if replace:
+        client.replace_collection(collection_name, target)
+        if fingerprints is None and os.path.exists(onboardconfig.FINGERPRINT_DB_PATH):
+            from onboard_workflow.fingerprints import FingerprintStore
+            fingerprints = FingerprintStore(onboardconfig.FINGERPRINT_DB_PATH)
+        if fingerprints is not None:
+            if id_map is None:
+                logging.warning(f"Old primary keys of {collection_name} unknown, clearing its fingerprints")
+                fingerprints.clear_session(collection_name)
+            else:
+                fingerprints.remap_record_ids(collection_name, id_map)
+    return copied
@@ -1,15 +1,123 @@
 from typing import List, Optional, Dict, Any
-from pymilvus import connections, Collection
+from pymilvus import connections, utility, Collection, AnnSearchRequest, RRFRanker, WeightedRanker, DataType
 from pymilvus.exceptions import ConnectError
 from config.config import zillizconfig
+from utils.chunk_batch import fit_embeddings
+import asyncio
+import numpy as np
 
-class ZillizVectorSearch:
+class VectorSearchBase:
+    """
+    Query-text helpers shared by the vector search backends - subclasses implement search and hybrid_search.
+    """
+    # EmbeddingService method that batch-encodes queries for each vector field
+    FIELD_QUERY_ENCODERS = {
+        "vector": "get_many_query_embeddings",
+        "vector_openai": "get_openaiembeddings",
+    }
+    embedding_service = None
+    # dim of each vector field in the loaded collection - query embeddings are fitted to it
+    dimensions: Dict[str, int] = {}
+
+    async def search_many(
+        self,
+        queries: List[str],
+        fields: List[str] = ["vector", "vector_openai"],
+        top_k: int = 3,
+        output_fields: Optional[List[str]] = ['content', 'overview'],
+        expr: Optional[str] = None,
+    ) -> Dict[str, Dict[str, np.ndarray]]:
+        """
+        Embed and search many queries at once - one batched encode and one search per vector field.
+
+        Args:
+            queries: Query texts.
+            fields: Vector fields to search, each embedded with its matching model.
+            top_k: Maximum number of results to return per query.
+            output_fields: Additional metadata fields to return alongside id and distance.
+            expr: Optional filter expression.
+
+        Returns:
+            For each field a dict of columnar (len(queries), top_k) arrays: 'id', 'distance' and each output field.
+            Missing hits are padded with -1 ids, NaN distances and None values.
+        """
+        embeddings = await self._embed_queries(queries, fields)
+
+        # the per-field searches are independent round trips, run them at the same time
+        field_hits = await asyncio.gather(*[
+            asyncio.to_thread(
+                self.search, field_embeddings, vector_field=field, top_k=top_k,
+                output_fields=output_fields, expr=expr,
+            )
+            for field, field_embeddings in zip(fields, embeddings)
+        ])
+        return {
+            field: self._to_columns(hits, top_k, output_fields or [])
+            for field, hits in zip(fields, field_hits)
+        }
+
+    async def _embed_queries(self, queries: List[str], fields: List[str]) -> List[List[List[float]]]:
+        """
+        Batch-encode the queries once per vector field with the field's embedding model
+        """
+        if self.embedding_service is None:
+            from utils.services import EmbeddingService
+            self.embedding_service = EmbeddingService()
+
+        return await asyncio.gather(*[
+            getattr(self.embedding_service, self.FIELD_QUERY_ENCODERS[field])(queries, dim=self.dimensions.get(field))
+            for field in fields
+        ])
+
+    def _fit_queries(self, embeddings: List[List[float]], vector_field: str) -> List[List[float]]:
+        """
+        Fit query vectors to the field's dim in the loaded collection - the embedding helpers called without `dim`
+        return the legacy VECTOR_DIMENSION layout, which smaller fields would reject
+        """
+        dim = self.dimensions.get(vector_field)
+        if dim is None or len(embeddings) == 0 or len(embeddings[0]) == dim:
+            return embeddings
+        return fit_embeddings(np.asarray(embeddings, dtype=np.float32), dim).tolist()
+
+    @staticmethod
+    def _to_columns(hits: List[List[Dict[str, Any]]], top_k: int, output_fields: List[str]) -> Dict[str, np.ndarray]:
+        """
+        Convert nested per-query hits into (num_queries, top_k) arrays
+        """
+        columns = {
+            "id": np.full((len(hits), top_k), -1, dtype=np.int64),
+            "distance": np.full((len(hits), top_k), np.nan, dtype=np.float32),
+        }
+        for field in output_fields:
+            columns[field] = np.full((len(hits), top_k), None, dtype=object)
+        for row, query_hits in enumerate(hits):
+            for rank, hit in enumerate(query_hits[:top_k]):
+                for name, column in columns.items():
+                    column[row, rank] = hit.get(name)
+        return columns
+
+    async def hybrid_search_many(
+        self,
+        queries: List[str],
+        fields: List[str] = ["vector", "vector_openai"],
+        top_k: int = 3,
+        **kwargs,
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Embed queries for every field (one batched encode each) and run one fused hybrid search.
+        Extra keyword arguments are passed on to `hybrid_search`.
+        """
+        embeddings = await self._embed_queries(queries, fields)
+        return await asyncio.to_thread(self.hybrid_search, dict(zip(fields, embeddings)), top_k=top_k, **kwargs)
+
+class ZillizVectorSearch(VectorSearchBase):
     """
     Client for connecting to Zilliz Cloud (Milvus) and performing cosine similarity vector searches.
     """
-    def __init__(self, alias: str = "zilliz-cloud", secure: bool = True):
+    def __init__(self, alias: str = "zilliz-cloud", secure: bool = True, embedding_service=None):
         self.alias = alias
         self.collection: Optional[Collection] = None
+        self.embedding_service = embedding_service
         self._connect(secure)
 
     def _connect(self, secure: bool = True) -> None:
@@ -28,6 +136,12 @@ class ZillizVectorSearch:
         except ConnectError as e:
             raise ConnectionError(f"Could not connect to Zilliz Cloud: {e}")
 
+    def has_collection(self, collection_name: str) -> bool:
+        """
+        Whether the collection exists on the connected cluster.
+        """
+        return utility.has_collection(collection_name, using=self.alias)
+
     def load_collection(self, collection_name: str) -> None:
         """
         Load a Milvus collection into the client for subsequent search operations.
@@ -36,6 +150,11 @@ class ZillizVectorSearch:
             collection_name: The name of the collection to load.
         """
         self.collection = Collection(name=collection_name, using=self.alias)
+        self.dimensions = {
+            field.name: int(field.params["dim"])
+            for field in self.collection.schema.fields
+            if field.dtype == DataType.FLOAT_VECTOR
+        }
 
     def search(
         self,
@@ -69,7 +188,7 @@ class ZillizVectorSearch:
         search_params = {"metric_type": metric, "params": {"nprobe": nprobe}}
 
         results = self.collection.search(
-            data=embeddings,
+            data=self._fit_queries(embeddings, vector_field),
             anns_field=vector_field,
             param=search_params,
             limit=top_k,
@@ -78,6 +197,13 @@ class ZillizVectorSearch:
             consistency_level="Session",
         )
 
+        return self._parse_results(results, output_fields)
+
+    @staticmethod
+    def _parse_results(results, output_fields: Optional[List[str]]) -> List[List[Dict[str, Any]]]:
+        """
+        Convert Milvus search hits into one list of dicts per query vector
+        """
         parsed_results: List[List[Dict[str, Any]]] = []
         for hits in results:
             batch_results: List[Dict[str, Any]] = []
@@ -89,4 +215,65 @@ class ZillizVectorSearch:
                 batch_results.append(record)
             parsed_results.append(batch_results)
 
-        return parsed_results
\ No newline at end of file
+        return parsed_results
+
+    def hybrid_search(
+        self,
+        embeddings: Dict[str, List[List[float]]],
+        top_k: int = 3,
+        ranker: str = "rrf",
+        weights: Optional[List[float]] = None,
+        rrf_k: int = 60,
+        candidate_limit: Optional[int] = None,
+        metric: str = "COSINE",
+        nprobe: int = 10,
+        output_fields: Optional[List[str]] = ['content', 'overview'],
+        expr: Optional[str] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Search several vector fields in one Milvus hybrid request and fuse them into a single ranking.
+
+        Args:
+            embeddings: Query vectors per vector field, e.g. {"vector": [...], "vector_openai": [...]}.
+            top_k: Maximum number of fused results to return per query.
+            ranker: 'rrf' (reciprocal rank fusion) or 'weighted' (weighted score fusion).
+            weights: Per-field weights for the weighted ranker, in the order of `embeddings`.
+            rrf_k: Smoothing constant for reciprocal rank fusion.
+            candidate_limit: Candidates retrieved per field before fusion, defaults to 2 * top_k.
+            metric: Similarity metric (e.g., 'COSINE', 'L2').
+            nprobe: Number of probes controlling recall/latency tradeoff.
+            output_fields: Additional metadata fields to return alongside id and distance.
+            expr: Optional filter expression applied to every field.
+
+        Returns:
+            A nested list like `search`, where 'distance' holds the fused score.
+        """
+        if self.collection is None:
+            raise ValueError("Collection not loaded; call load_collection() first.")
+
+        search_params = {"metric_type": metric, "params": {"nprobe": nprobe}}
+        requests = [
+            AnnSearchRequest(
+                data=self._fit_queries(field_embeddings, field),
+                anns_field=field,
+                param=search_params,
+                limit=candidate_limit or 2 * top_k,
+                expr=expr,
+            )
+            for field, field_embeddings in embeddings.items()
+        ]
+
+        if ranker == "rrf":
+            rerank = RRFRanker(rrf_k)
+        elif ranker == "weighted":
+            rerank = WeightedRanker(*(weights or [1.0] * len(requests)))
+        else:
+            raise ValueError(f"Unsupported ranker: {ranker}")
+
+        results = self.collection.hybrid_search(
+            reqs=requests,
+            rerank=rerank,
+            limit=top_k,
+            output_fields=output_fields or [],
+        )
+        return self._parse_results(results, output_fields)
@@ -0,0 +1,253 @@
+from contextlib import asynccontextmanager
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+from fastapi import FastAPI, HTTPException
+from pydantic import BaseModel, Field
+from config.config import queryserviceconfig
+from collection_creator.query_milvus import VectorSearchBase
+from collection_creator.vector_backend import get_vector_search
+from utils.streams import micro_batches
+import asyncio
+import logging
+import time
+import numpy as np
+
+# Long-lived retrieval service - run with `uvicorn collection_creator.query_service:app`
+# The embedding model is loaded and warmed once at startup, search clients are cached per collection on top of
+# one shared Milvus connection alias (and reloaded after a TTL or a failed search, so migrated collections are
+# picked up), and concurrent queries for the same collection/fields/top_k are micro-batched into a single encode
+# per field and a single batched search per field.
+
+
+class SearchRequest(BaseModel):
+    query: str
+    fields: List[str] = Field(default_factory=lambda: ["vector"])
+    top_k: int = Field(3, ge=1)
+
+
+class SearchResponse(BaseModel):
+    results: Dict[str, List[Dict[str, Any]]]
+    latency_ms: float
+
+
+class LatencyMetrics:
+    """
+    Rolling window of request latencies and batch sizes for p50/p99 reporting
+    """
+    def __init__(self, window: int):
+        self.latencies = deque(maxlen=window)
+        self.batch_sizes = deque(maxlen=window)
+        self.requests = 0
+        self.errors = 0
+
+    def record(self, seconds: float):
+        self.requests += 1
+        self.latencies.append(seconds)
+
+    def record_batch(self, size: int):
+        self.batch_sizes.append(size)
+
+    def summary(self) -> Dict[str, float]:
+        latencies = np.asarray(self.latencies) * 1000
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "p50_ms": float(np.percentile(latencies, 50)) if len(latencies) else 0.0,
+            "p99_ms": float(np.percentile(latencies, 99)) if len(latencies) else 0.0,
+            "mean_batch_size": float(np.mean(self.batch_sizes)) if self.batch_sizes else 0.0,
+        }
+
+
+class PendingQuery:
+    def __init__(self, key: Tuple[str, Tuple[str, ...], int], query: str, future: asyncio.Future):
+        self.key = key
+        self.query = query
+        self.future = future
+
+
+class SearchBatcher:
+    """
+    Collects concurrent queries and searches them in micro-batches
+    Queries with the same (collection, fields, top_k) that arrive within max_wait of each other (up to batch_size)
+    go through VectorSearchBase.search_many together - one encode and one search per vector field.
+    """
+    def __init__(self, embedding_service, batch_size: int, max_wait: float, metrics: LatencyMetrics):
+        self.embedding_service = embedding_service
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.metrics = metrics
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.searchers: Dict[str, Any] = {}
+        self._loaded_at: Dict[str, float] = {}
+        self._searcher_locks: Dict[str, asyncio.Lock] = {}
+        self._tasks = set()
+        self._runner: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._runner = asyncio.create_task(self._run())
+
+    async def stop(self):
+        await self.queue.put(None)
+        if self._runner is not None:
+            await self._runner
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _pending(self):
+        while True:
+            pending = await self.queue.get()
+            if pending is None:
+                return
+            yield pending
+
+    async def _run(self):
+        async for key, batch in micro_batches(self._pending(), self.batch_size, self.max_wait, key=lambda pending: pending.key):
+            # batches for different collections search concurrently
+            task = asyncio.create_task(self._search_batch(key, batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _searcher(self, collection_name: str):
+        """
+        Search client for a collection, loaded once and reused for QUERY_SEARCHER_TTL_SECONDS - every client shares
+        the service's model and the backend's connection (pymilvus reuses an already connected alias)
+        404 only when the collection doesn't exist, 503 when the vector store can't be reached
+        """
+        searcher = self.searchers.get(collection_name)
+        if searcher is not None and not self._expired(collection_name):
+            return searcher
+        lock = self._searcher_locks.setdefault(collection_name, asyncio.Lock())
+        async with lock:
+            if collection_name not in self.searchers or self._expired(collection_name):
+                try:
+                    searcher = await asyncio.to_thread(get_vector_search, embedding_service=self.embedding_service)
+                    exists = await asyncio.to_thread(searcher.has_collection, collection_name)
+                except Exception as e:
+                    logging.error(f"Vector store unavailable while loading {collection_name}: {str(e)}")
+                    raise HTTPException(status_code=503, detail="Vector store unavailable")
+                if not exists:
+                    self.evict(collection_name)
+                    raise HTTPException(status_code=404, detail=f"Collection {collection_name} not found")
+                try:
+                    await asyncio.to_thread(searcher.load_collection, collection_name)
+                except Exception as e:
+                    logging.error(f"Could not load collection {collection_name}: {str(e)}")
+                    raise HTTPException(status_code=500, detail=f"Could not load collection {collection_name}")
+                self.searchers[collection_name] = searcher
+                self._loaded_at[collection_name] = time.monotonic()
+                logging.info(f"Loaded collection {collection_name} for search")
+        return self.searchers[collection_name]
+
+    def _expired(self, collection_name: str) -> bool:
+        return time.monotonic() - self._loaded_at.get(collection_name, 0.0) > queryserviceconfig.QUERY_SEARCHER_TTL_SECONDS
+
+    def evict(self, collection_name: str, searcher=None):
+        """
+        Drop a cached search client (only if it is still `searcher` when given) so the next query reloads it
+        """
+        if searcher is None or self.searchers.get(collection_name) is searcher:
+            self.searchers.pop(collection_name, None)
+            self._loaded_at.pop(collection_name, None)
+
+    async def _search_many(self, collection_name: str, queries: List[str], fields: List[str], top_k: int):
+        searcher = await self._searcher(collection_name)
+        try:
+            return await searcher.search_many(queries, fields=fields, top_k=top_k)
+        except HTTPException:
+            raise
+        except Exception as e:
+            # the collection may have been dropped, recreated or migrated to other dims since it was loaded
+            logging.warning(f"Search on {collection_name} failed, reloading the collection: {str(e)}")
+            self.evict(collection_name, searcher)
+            searcher = await self._searcher(collection_name)
+            return await searcher.search_many(queries, fields=fields, top_k=top_k)
+
+    async def _search_batch(self, key: Tuple[str, Tuple[str, ...], int], batch: List[PendingQuery]):
+        collection_name, fields, top_k = key
+        self.metrics.record_batch(len(batch))
+        try:
+            results = await self._search_many(collection_name, [pending.query for pending in batch], list(fields), top_k)
+        except Exception as e:
+            for pending in batch:
+                if not pending.future.done():
+                    pending.future.set_exception(e)
+            return
+        for row, pending in enumerate(batch):
+            if not pending.future.done():
+                pending.future.set_result({field: self._hits(columns, row) for field, columns in results.items()})
+
+    @staticmethod
+    def _hits(columns: Dict[str, np.ndarray], row: int) -> List[Dict[str, Any]]:
+        """
+        One query's row of the columnar search_many output as a list of hits, without the -1 padding
+        """
+        hits = []
+        for rank, hit_id in enumerate(columns["id"][row]):
+            if hit_id < 0:
+                break
+            values = {name: column[row, rank] for name, column in columns.items()}
+            hits.append({name: value.item() if isinstance(value, np.generic) else value for name, value in values.items()})
+        return hits
+
+    async def search(self, collection_name: str, query: str, fields: List[str], top_k: int) -> Dict[str, List[Dict[str, Any]]]:
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put(PendingQuery((collection_name, tuple(fields), top_k), query, future))
+        return await future
+
+
+def create_app(embedding_service=None) -> FastAPI:
+    """
+    Builds the query service - embedding_service defaults to a warmed EmbeddingService
+    """
+    metrics = LatencyMetrics(queryserviceconfig.QUERY_METRICS_WINDOW)
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        service = embedding_service
+        if service is None:
+            from utils.services import EmbeddingService
+            service = EmbeddingService()
+            await asyncio.to_thread(service.warmup)
+        batcher = SearchBatcher(
+            service, queryserviceconfig.QUERY_BATCH_SIZE, queryserviceconfig.QUERY_MAX_WAIT_MS / 1000, metrics
+        )
+        batcher.start()
+        app.state.batcher = batcher
+        yield
+        await batcher.stop()
+
+    app = FastAPI(title="LLM-Extractify query service", lifespan=lifespan)
+
+    @app.post("/collections/{collection_name}/search", response_model=SearchResponse)
+    async def search(collection_name: str, request: SearchRequest):
+        unknown = [field for field in request.fields if field not in VectorSearchBase.FIELD_QUERY_ENCODERS]
+        if unknown or not request.fields:
+            raise HTTPException(status_code=400, detail=f"Unknown vector fields {unknown}")
+        if request.top_k > queryserviceconfig.QUERY_MAX_TOP_K:
+            raise HTTPException(status_code=400, detail=f"top_k must be at most {queryserviceconfig.QUERY_MAX_TOP_K}")
+        start = time.perf_counter()
+        try:
+            results = await app.state.batcher.search(collection_name, request.query, request.fields, request.top_k)
+        except HTTPException:
+            metrics.errors += 1
+            raise
+        except Exception as e:
+            metrics.errors += 1
+            logging.error(f"Search on {collection_name} failed: {str(e)}")
+            raise HTTPException(status_code=500, detail="Search failed")
+        elapsed = time.perf_counter() - start
+        metrics.record(elapsed)
+        return SearchResponse(results=results, latency_ms=elapsed * 1000)
+
+    @app.get("/metrics")
+    async def get_metrics():
+        return metrics.summary()
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok", "collections": sorted(app.state.batcher.searchers)}
+
+    return app
+
+
+app = create_app()
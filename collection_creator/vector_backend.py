@@ -0,0 +1,44 @@
+from typing import Dict, Optional
+from config.config import zillizconfig, embeddingconfig
+
+# largest dim each vector field's model produces - smaller dims are Matryoshka truncations
+NATIVE_DIMENSIONS = {
+    "vector": embeddingconfig.JINA_EMBEDDING_DIMENSION,
+    "vector_openai": embeddingconfig.OPENAI_EMBEDDING_DIMENSION,
+}
+
+
+def collection_dimensions(dims: Optional[Dict[str, int]] = None) -> Dict[str, int]:
+    """
+    Per-field dims for a new collection - VECTOR_DIMENSIONS overridden by `dims`
+    Each field must be at most its model's native dim, or VECTOR_DIMENSION for a legacy padded layout
+    """
+    dimensions = {**zillizconfig.VECTOR_DIMENSIONS, **(dims or {})}
+    for field, dim in dimensions.items():
+        if field not in NATIVE_DIMENSIONS:
+            raise ValueError(f"Unknown vector field '{field}'")
+        if not 0 < dim <= NATIVE_DIMENSIONS[field] and dim != zillizconfig.VECTOR_DIMENSION:
+            raise ValueError(f"{field} dim {dim} must be between 1 and {NATIVE_DIMENSIONS[field]}")
+    return dimensions
+
+
+def get_vector_client():
+    """
+    Collection writer for the configured VECTOR_BACKEND - 'zilliz' (default) or 'local'
+    """
+    if zillizconfig.VECTOR_BACKEND == "local":
+        from collection_creator.local_vector_store import LocalVectorClient
+        return LocalVectorClient()
+    from collection_creator.create_zilliz_collection import ZillizClient
+    return ZillizClient()
+
+
+def get_vector_search(**kwargs):
+    """
+    Vector search client for the configured VECTOR_BACKEND
+    """
+    if zillizconfig.VECTOR_BACKEND == "local":
+        from collection_creator.local_vector_store import LocalVectorSearch
+        return LocalVectorSearch(**kwargs)
+    from collection_creator.query_milvus import ZillizVectorSearch
+    return ZillizVectorSearch(**kwargs)
@@ -24,11 +24,14 @@ class AIAgentOnboardRequest(BaseModel):
 	session_id: str
 	urls: List[str]
 	files: List[str]
+	chunking_mode: Literal["llm", "rules", "auto"] = "llm"
 	
 class metaData(BaseModel):
 	session_id: str
 	source: Literal["web", "KB", "email", "user_upload"]
 	url: Optional[str] = None
+	page: Optional[int] = None
+	source_urls: List[str] = []  # every url a deduplicated chunk appeared on
 
 class AIAgentOnboardingDataResponse(BaseModel):
 	meta_data: metaData
@@ -57,6 +60,10 @@ class OpenAIConfig(ModelProviderConfig):
 	}
 	# Pass the openai api key from .env file
 	api_key: str = os.getenv("OPENAI_API_KEY", "MISSING")
+	# Defaults match gpt-4o-mini tier 1 limits, raise them for higher tiers
+	requests_per_minute: int = int(os.getenv("OPENAI_REQUESTS_PER_MINUTE", 500))
+	tokens_per_minute: int = int(os.getenv("OPENAI_TOKENS_PER_MINUTE", 200000))
+	max_concurrency: int = int(os.getenv("OPENAI_MAX_CONCURRENCY", 16))
 
 chunk_and_clean_task_app: OpenAIConfig = OpenAIConfig(
 	messages = "config/prompts/message_chunk_openai_v2.yaml",
@@ -81,11 +88,71 @@ class ZillizConfig(BaseSettings):
     OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY")
     ZILLIZ_AUTH_TOKEN: str = os.getenv("ZILLIZ_AUTH_TOKEN")
     ZILLIZ_CLOUD_URI: str =os.getenv("ZILLIZ_CLOUD_URI")
-    VECTOR_DIMENSION: int = 3072
+    VECTOR_DIMENSION: int = 3072  # legacy collections - every vector field padded to this size
+    # per-field dims for new collections, native sizes by default - lower values are Matryoshka truncations
+    # (jina-v3: 32-1024, text-embedding-3-large: up to 3072 via the `dimensions` parameter)
+    VECTOR_DIMENSIONS: Dict[str, int] = {"vector": 1024, "vector_openai": 3072}
     ZILLIZ_INSERTION_BATCH_SIZE: int = 50
+    VECTOR_BACKEND: Literal["zilliz", "local"] = "zilliz"
+    LOCAL_VECTOR_STORE_PATH: str = "data/vector_store"
 
 zillizconfig = ZillizConfig()
 
+### Setting up the Embedding Config ###
+class EmbeddingConfig(BaseSettings):
+    JINA_MODEL_NAME: str = "jinaai/jina-embeddings-v3"
+    JINA_EMBEDDING_DIMENSION: int = 1024
+    OPENAI_EMBEDDING_MODEL: str = "text-embedding-3-large"
+    OPENAI_EMBEDDING_DIMENSION: int = 3072
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_MAX_ENTRIES: int = 10000
+    EMBEDDING_CACHE_PATH: str = "data/cache/embeddings"
+    EMBEDDING_BATCH_SIZE: int = 32
+    EMBEDDING_WORKERS: int = 0  # > 1 encodes in a pool of worker processes, see utils/embedding_pool.py
+    EMBEDDING_BACKEND: Literal["torch", "onnx", "onnx-int8"] = "torch"  # see utils/embedding_backends.py
+    EMBEDDING_MODEL_DIR: str = "data/models"
+
+embeddingconfig = EmbeddingConfig()
+
+### Setting up the Onboarding Config ###
+class OnboardConfig(BaseSettings):
+    MAX_CONCURRENT_CRAWLS: int = 5
+    MAX_CRAWLS_PER_HOST: int = 2
+    CRAWL_HOST_DELAY: float = 0.5
+    OCR_MAX_CONCURRENT: int = 3
+    OCR_REQUESTS_PER_SECOND: float = 1.0
+    OCR_RATE_LIMIT_BACKOFF: float = 2.0
+    OCR_MAX_RETRIES: int = 3
+    CHUNK_CACHE_ENABLED: bool = True
+    CHUNK_CACHE_PATH: str = "data/cache/chunk_cache.sqlite"
+    CHUNK_CACHE_MAX_BYTES: int = 512 * 1024 * 1024
+    BATCH_OVERLAP_TOKENS: int = 0
+    UPLOAD_PIPELINE_DEPTH: int = 2
+    STREAM_QUEUE_SIZE: int = 32
+    STREAM_MAX_PENDING_BATCHES: int = 8
+    STREAM_FLUSH_SECONDS: float = 2.0
+    FINGERPRINT_DB_PATH: str = "data/cache/fingerprints.sqlite"
+    BATCH_JOBS_DIR: str = "data/batch_jobs"
+    BATCH_POLL_SECONDS: float = 30.0
+    BATCH_MAX_REQUESTS: int = 50000
+    BATCH_COMPLETION_WINDOW: str = "24h"
+    DEDUP_ENABLED: bool = True
+    DEDUP_THRESHOLD: float = 0.85
+    DEDUP_NUM_PERM: int = 128
+    DEDUP_SHINGLE_SIZE: int = 3
+
+onboardconfig = OnboardConfig()
+
+### Setting up the Query Service Config ###
+class QueryServiceConfig(BaseSettings):
+    QUERY_BATCH_SIZE: int = 32
+    QUERY_MAX_WAIT_MS: float = 5.0
+    QUERY_MAX_TOP_K: int = 50
+    QUERY_METRICS_WINDOW: int = 10000
+    QUERY_SEARCHER_TTL_SECONDS: float = 300.0  # cached search clients are reloaded after this, picking up migrated collections
+
+queryserviceconfig = QueryServiceConfig()
+
 ### Setting up the Gemma Config ###
 class GoogleAIConfig(ModelProviderConfig):
     model_config = ConfigDict(extra="allow")
@@ -99,6 +166,10 @@ class GoogleAIConfig(ModelProviderConfig):
         "max_output_tokens": 8192,
     }
     api_key: str = os.getenv("GEMMA_API_KEY", "MISSING")
+    # Gemma free tier limits
+    requests_per_minute: int = int(os.getenv("GEMMA_REQUESTS_PER_MINUTE", 30))
+    tokens_per_minute: int = int(os.getenv("GEMMA_TOKENS_PER_MINUTE", 15000))
+    max_concurrency: int = int(os.getenv("GEMMA_MAX_CONCURRENCY", 4))
 
 gemma_chunk_and_clean_task_app: GoogleAIConfig = GoogleAIConfig(
     messages="config/prompts/message_chunk_gemma_v2.yaml",
@@ -1,8 +1,16 @@
-from pydantic import BaseModel
-from typing import Any, List, Dict
-from openai import OpenAI
+from pydantic import BaseModel, PrivateAttr
+from typing import Any, AsyncIterator, List, Dict, Optional
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+import openai
+import httpx
+import asyncio
+import json
+import os
 import yaml
 from google import genai
+from google.genai import errors as genai_errors
+from config.prompt_templates import CompiledPrompt
+from utils.rate_limiter import ProviderScheduler
 import logging
 
 class ModelProviderConfig(BaseModel):
@@ -22,20 +30,70 @@ class ModelProviderConfig(BaseModel):
         "response_format": {"type": "json_object"}
     }
     api_key: str = "MISSING"
+    max_connections: int = 20
+    # Quota the scheduler paces chunking calls against
+    requests_per_minute: int = 60
+    tokens_per_minute: int = 60000
+    max_concurrency: int = 8
+    max_retries: int = 5
+    retry_backoff: float = 1.0
+    _scheduler: Optional[ProviderScheduler] = PrivateAttr(default=None)
+    _prompts: Dict[str, CompiledPrompt] = PrivateAttr(default_factory=dict)
 
     def update_params(self, **kwargs):
         """
         Update model params"""
         self.params.update(kwargs)
 
+    def classify_error(self, exc: Exception) -> Optional[str]:
+        """
+        "rate_limit" for quota errors, "retry" for transient ones, None when retrying won't help
+        """
+        if isinstance(exc, openai.RateLimitError):
+            return "rate_limit"
+        if isinstance(exc, (openai.APIConnectionError, openai.InternalServerError)):
+            return "retry"
+        if isinstance(exc, genai_errors.APIError):
+            if exc.code == 429:
+                return "rate_limit"
+            if isinstance(exc, genai_errors.ServerError):
+                return "retry"
+        if isinstance(exc, (httpx.TimeoutException, httpx.NetworkError)):
+            return "retry"
+        return None
+
+    def get_scheduler(self) -> ProviderScheduler:
+        """
+        One scheduler per provider config, shared by every DataChunker using it
+        """
+        if self._scheduler is None:
+            self._scheduler = ProviderScheduler(
+                requests_per_minute=self.requests_per_minute,
+                tokens_per_minute=self.tokens_per_minute,
+                max_concurrency=self.max_concurrency,
+                initial_concurrency=max(1, self.max_concurrency // 2),
+                max_retries=self.max_retries,
+                backoff=self.retry_backoff,
+                classify=self.classify_error,
+            )
+        return self._scheduler
+
     def initialize_model_provider(self):
         """
         Initialise and establish connection - can adapt to both openai and gemma wrappers
+        OpenAI gets an async client backed by a pooled http connection so concurrent requests overlap
         """
         if self.api == "openai":
-            return OpenAI(
+            return AsyncOpenAI(
                 base_url=self.base_url,
-                api_key=self.api_key
+                api_key=self.api_key,
+                max_retries=0,  # retries and backoff are handled by the provider scheduler
+                http_client=DefaultAsyncHttpxClient(
+                    limits=httpx.Limits(
+                        max_connections=self.max_connections,
+                        max_keepalive_connections=self.max_connections,
+                    )
+                ),
             )
         elif self.api == "google_ai":
             if not self.api_key or self.api_key == "MISSING":
@@ -48,9 +106,120 @@ class ModelProviderConfig(BaseModel):
             logging.error(f"Unsupported API provider: {self.api}")
             return None
 
+    async def open_stream(self, client, model_messages: List[Dict[str, str]]) -> AsyncIterator[str]:
+        """
+        Start a streamed completion and return an async iterator over its text deltas
+        """
+        if self.api == "openai":
+            logging.info("Streaming request to OpenAI...")
+            stream = await client.chat.completions.create(
+                messages=model_messages,
+                stream=True,
+                **self.params,
+            )
+
+            async def deltas():
+                async for event in stream:
+                    if event.choices and event.choices[0].delta.content:
+                        yield event.choices[0].delta.content
+            return deltas()
+
+        elif self.api == "google_ai":
+            logging.info("Streaming request to Google AI (Gemma)...")
+            stream = await client.aio.models.generate_content_stream(
+                model=self.params.get("model", "gemma-3-27b-it"),
+                contents=model_messages,
+            )
+
+            async def deltas():
+                async for response in stream:
+                    if response.text:
+                        yield response.text
+            return deltas()
+
+        else:
+            raise ValueError(f"open_stream not implemented for API provider: {self.api}")
+
+    def batch_request(self, custom_id: str, model_messages: List[Dict[str, str]]) -> Dict[str, Any]:
+        """
+        One line of a batch job input file - the same chat completion send_request would make
+        """
+        if self.api != "openai":
+            raise ValueError(f"Batch mode is not supported for API provider: {self.api}")
+        return {
+            "custom_id": custom_id,
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": {"messages": model_messages, **self.params},
+        }
+
+    async def submit_batch(self, client, jsonl_path: str, completion_window: str = "24h") -> str:
+        """
+        Upload a JSONL file of batch requests and start a batch job, returns the batch id
+        """
+        with open(jsonl_path, "rb") as file:
+            input_file = await client.files.create(file=file, purpose="batch")
+        batch = await client.batches.create(
+            input_file_id=input_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window=completion_window,
+        )
+        logging.info(f"Submitted batch {batch.id} from {jsonl_path}")
+        return batch.id
+
+    async def wait_for_batch(self, client, batch_id: str, poll_interval: float = 30.0):
+        """
+        Poll a batch job until it reaches a final status
+        """
+        while True:
+            batch = await client.batches.retrieve(batch_id)
+            if batch.status in ("completed", "failed", "expired", "cancelled"):
+                logging.info(f"Batch {batch_id} finished with status {batch.status}")
+                return batch
+            await asyncio.sleep(poll_interval)
+
+    async def get_batch_results(self, client, batch) -> Dict[str, str]:
+        """
+        Map custom_id to response text for every request in the batch that succeeded
+        Expired batches still return the requests completed before the deadline
+        """
+        results = {}
+        if batch.output_file_id:
+            output = await client.files.content(batch.output_file_id)
+            for line in output.text.splitlines():
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                response = record.get("response") or {}
+                if response.get("status_code") != 200:
+                    continue
+                results[record["custom_id"]] = response["body"]["choices"][0]["message"]["content"].strip()
+        if batch.error_file_id:
+            logging.warning(f"Batch {batch.id} has failed requests, see file {batch.error_file_id}")
+        return results
+
+    def get_prompt(self, yaml_file_path: Optional[str] = None) -> CompiledPrompt:
+        """
+        Compiled prompt for `messages` (or the given file), reloaded only when the file's mtime changes
+        """
+        yaml_file_path = yaml_file_path or self.messages
+        prompt = self._prompts.get(yaml_file_path)
+        if prompt is None or prompt.mtime != os.stat(yaml_file_path).st_mtime_ns:
+            prompt = CompiledPrompt.load(yaml_file_path, self.api)
+            self._prompts[yaml_file_path] = prompt
+            logging.info(f"Compiled prompt {yaml_file_path}")
+        return prompt
+
+    def render_messages(self, **kwargs):
+        """
+        Model input for the compiled `messages` prompt - what DataChunker sends
+        """
+        return self.get_prompt().render(**kwargs)
+
     def get_messages_from_yaml(self, yaml_file_path: str) -> List[Dict[str, str]]:
         """
         Read the prompt yaml, create a list of dict and pass it along to model later
+        Not used by the pipeline any more - kept as the reference tests/test_prompt_templates.py checks render_messages against
         """
         try:
             with open(yaml_file_path, 'r') as file:
@@ -68,6 +237,7 @@ class ModelProviderConfig(BaseModel):
     def format_messages(self, messages: List[Dict[str, str]], **kwargs) -> List[Dict[str, str]]:
         """
         Formats messages in wrapper specified format for specified roles
+        Reference implementation for CompiledPrompt.render, see get_messages_from_yaml
         """
         if self.api == "openai":
             formatted_messages = []
@@ -100,7 +270,7 @@ class ModelProviderConfig(BaseModel):
         """
         if self.api == "openai":
             logging.info("Sending request to OpenAI...")
-            response = client.chat.completions.create(
+            response = await client.chat.completions.create(
                 messages=model_messages,
                 **self.params,
             )
@@ -109,40 +279,34 @@ class ModelProviderConfig(BaseModel):
         elif self.api == "google_ai":
             logging.info("Sending request to Google AI (Gemma)...")
             genai_module = client
-            try:
-                model_name = self.params.get("model", "gemma-3-27b-it")
-                generation_config = {
-                    'max_output_tokens': self.params.get("max_output_tokens", 8192),
-                    'temperature': self.params.get("temperature", 0.1),
-                    # top_p=self.params.get("top_p", None),
-                    # top_k=self.params.get("top_k", None),
-                }
-                safety_settings = [
-                    {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
-                    {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
-                    {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
-                    {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
-                ]
-                
-                response = await genai_module.aio.models.generate_content(
-                    model='gemma-3-27b-it',
-                    contents=model_messages,
-                    # generation_config=generation_config,
-                    # safety_settings=safety_settings,
-                    # request_options={"timeout": 600}
-                )
-
-                if not response.candidates:
-                    logging.warning("Warning: Response was blocked, possibly due to safety settings.")
-                    return "Error: Response blocked by safety filters."
-
-                return response.text.strip()
-            
-            except Exception as e:
-                logging.error("Error sending request to Google AI:", e)
-                return "Error: {e}"
-        
+            # Errors propagate so the provider scheduler can back off and retry
+            model_name = self.params.get("model", "gemma-3-27b-it")
+            generation_config = {
+                'max_output_tokens': self.params.get("max_output_tokens", 8192),
+                'temperature': self.params.get("temperature", 0.1),
+                # top_p=self.params.get("top_p", None),
+                # top_k=self.params.get("top_k", None),
+            }
+            safety_settings = [
+                {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
+                {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
+                {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
+                {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
+            ]
+
+            response = await genai_module.aio.models.generate_content(
+                model=model_name,
+                contents=model_messages,
+                # generation_config=generation_config,
+                # safety_settings=safety_settings,
+                # request_options={"timeout": 600}
+            )
+
+            if not response.candidates:
+                logging.warning("Warning: Response was blocked, possibly due to safety settings.")
+                return "[]"
+
+            return response.text.strip()
+
         else:
-            logging.error("send_request not implemented for API provider:", {self.api})
-            return "Error: Unsupported provider"
-            
\ No newline at end of file
+            raise ValueError(f"send_request not implemented for API provider: {self.api}")
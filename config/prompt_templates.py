@@ -0,0 +1,99 @@
+from string import Formatter
+from typing import Callable, Dict, List, Optional, Tuple, Union
+import os
+import yaml
+
+PROMPT_ROLES = ("system", "user", "assistant")
+
+
+class CompiledPrompt:
+    """
+    A prompt yaml loaded, validated and pre-split once
+    Each message template becomes a list of literal text and {field} slots, so rendering a call is a join.
+    Messages without fields are formatted up front and reused as-is, which keeps the prompt prefix
+    byte-identical across calls for provider side prompt caching.
+    """
+    def __init__(self, path: str, source: str, messages: List[Dict[str, str]], api: str, mtime: int):
+        self.path = path
+        self.source = source
+        self.api = api
+        self.mtime = mtime
+        self.roles = [message["role"] for message in messages]
+        self.templates = [self._compile(message["content"]) for message in messages]
+        self.fields = sorted({field for template in self.templates for part, field in template if field})
+        # openai takes role messages, google_ai a single prompt string
+        if api == "google_ai":
+            self.templates = [self._join(self.templates)]
+            self.roles = ["user"]
+        self.static = [
+            "".join(part for part, _ in template) if all(field is None for _, field in template) else None
+            for template in self.templates
+        ]
+        self._token_count: Optional[int] = None
+
+    @classmethod
+    def load(cls, path: str, api: str) -> "CompiledPrompt":
+        mtime = os.stat(path).st_mtime_ns
+        with open(path, "r") as file:
+            source = file.read()
+        content = yaml.safe_load(source)
+        if not isinstance(content, dict) or not content:
+            raise ValueError(f"Prompt file {path} must map roles to message templates")
+
+        messages = []
+        for role, template in content.items():
+            role = str(role).lower()
+            if role not in PROMPT_ROLES:
+                raise ValueError(f"Prompt file {path} has unknown role '{role}'")
+            if not isinstance(template, str):
+                raise ValueError(f"Prompt file {path} role '{role}' is not a string")
+            messages.append({"role": role, "content": template})
+        return cls(path, source, messages, api, mtime)
+
+    @staticmethod
+    def _compile(template: str) -> List[Tuple[str, Optional[str]]]:
+        """
+        Split a str.format template into (literal, field) pairs, with {{ }} already unescaped
+        """
+        parts = []
+        for literal, field, format_spec, conversion in Formatter().parse(template):
+            if field is not None and (not field or field.isdigit() or format_spec or conversion):
+                raise ValueError(f"Unsupported prompt placeholder {{{field}}}, use plain named fields")
+            parts.append((literal, field))
+        return parts
+
+    @staticmethod
+    def _join(templates: List[List[Tuple[str, Optional[str]]]]) -> List[Tuple[str, Optional[str]]]:
+        joined = []
+        for index, template in enumerate(templates):
+            if index:
+                joined.append(("\n\n", None))
+            joined.extend(template)
+        return joined
+
+    def _render(self, index: int, values: Dict[str, str]) -> str:
+        if self.static[index] is not None:
+            return self.static[index]
+        return "".join(part + (values[field] if field else "") for part, field in self.templates[index])
+
+    def render(self, **kwargs) -> Union[List[Dict[str, str]], str]:
+        """
+        Substitute the fields - same output as ModelProviderConfig.format_messages for this api
+        """
+        missing = [field for field in self.fields if field not in kwargs]
+        if missing:
+            raise KeyError(f"Prompt {self.path} is missing values for {missing}")
+        values = {field: str(kwargs[field]) for field in self.fields}
+        if self.api == "google_ai":
+            return self._render(0, values)
+        return [{"role": role, "content": self._render(index, values)} for index, role in enumerate(self.roles)]
+
+    def token_count(self, encode: Callable[[str], List[int]]) -> int:
+        """
+        Tokens of the prompt without the substituted fields, counted once
+        """
+        if self._token_count is None:
+            self._token_count = sum(
+                len(encode(part)) for template in self.templates for part, _ in template if part
+            )
+        return self._token_count
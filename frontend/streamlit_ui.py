@@ -5,8 +5,7 @@ import asyncio
 from config.config import AIAgentOnboardRequest
 from onboard_workflow.onboard import GenerateDataSnapshot
 from onboard_workflow.onboard import DataUploader
-import json
-import torch
+from utils.snapshot import write_snapshot
 import urllib.response
 import random
 import logging
@@ -16,7 +15,12 @@ from pydantic_core import PydanticSerializationUnexpectedValue
 
 st.set_page_config(layout="wide")
 
-torch.classes.__path__ = []
+# torch is only imported once the embedding model loads - patch torch.classes for the file watcher when it is there
+def patch_torch_classes():
+  if "torch" in sys.modules:
+    sys.modules["torch"].classes.__path__ = []
+
+patch_torch_classes()
 # warnings.filterwarnings("ignore", category=PydanticSerializationUnexpectedValue, module="pydantic_core")
 
 # function to generate data snapshot
@@ -51,15 +55,11 @@ async def generate_data_snapshot(valid_urls, selected_llm):
 
   generator = GenerateDataSnapshot(test_request, llm_choice=selected_llm)
   responses = await generator.get_data()
-  response_dicts = [response.model_dump() for response in responses]
-
-  # Save the data to a JSON file
-  with warnings.catch_warnings():
-    warnings.simplefilter('ignore', PydanticSerializationUnexpectedValue)
-    output_file = f"data/data_snapshot_clean_{selected_llm}.json"
-    with open(output_file, "w") as f:
-      json.dump(response_dicts, f, indent=4)
-      
+
+  # Save the data as a binary snapshot - replay it later with DataUploader.upload_snapshot
+  output_file = f"data/data_snapshot_clean_{selected_llm}.snap"
+  write_snapshot(output_file, responses)
+
   st.success(f"Scraping finished! Data saved to {output_file}")
 
   # Instantiate and call
@@ -177,6 +177,7 @@ with col_scrape:
       with st.spinner(f"Scraping and processing with {llm_to_use}..."):
         try:
           asyncio.run(generate_data_snapshot(valid_urls, llm_to_use))
+          patch_torch_classes()
         except Exception as e:
           st.error(f"An error occurred during scraping: {e}")
 
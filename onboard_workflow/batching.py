@@ -0,0 +1,113 @@
+from bisect import bisect_left, bisect_right
+from typing import List, Tuple
+import re
+
+# split points by preference - structural markdown boundaries first, sentence ends last
+# each pattern matches right where a new batch may begin
+HEADING, PARAGRAPH, LINE, SENTENCE = 3, 2, 1, 0
+BOUNDARY_PATTERNS = {
+    HEADING: re.compile(r"^(?=#{1,6}\s)", re.MULTILINE),
+    PARAGRAPH: re.compile(r"(?<=\n\n)(?=[^\n])"),
+    LINE: re.compile(r"^(?=\s*(?:[-*+]|\d+[.)])\s|\||```)", re.MULTILINE),
+    SENTENCE: re.compile(r"(?<=[.!?][ \t])(?=\S)"),
+}
+
+
+class TokenBatcher:
+    """
+    Splits a document into batches of at most max_tokens tokens
+    The document is tokenized once; candidate boundaries (headings, paragraphs, list items, table rows,
+    sentence ends) are mapped from character offsets to token positions, each batch ends on the best
+    boundary that fits and segments with no usable boundary are hard split on a token boundary
+    """
+    def __init__(self, tokenizer, max_tokens: int, overlap_tokens: int = 0, min_fill: float = 0.5):
+        if overlap_tokens >= max_tokens:
+            raise ValueError("overlap_tokens must be smaller than max_tokens")
+        self.tokenizer = tokenizer
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self.min_fill = min_fill
+
+    def _token_offsets(self, text: str) -> List[int]:
+        """
+        Character offset at which every token starts
+        """
+        tokens = self.tokenizer.encode(text)
+        _, offsets = self.tokenizer.decode_with_offsets(tokens)
+        return offsets
+
+    def _boundaries(self, text: str, offsets: List[int]) -> List[List[int]]:
+        """
+        Sorted token positions of candidate boundaries, one list per priority level
+        """
+        boundaries = []
+        for priority in sorted(BOUNDARY_PATTERNS):
+            # a token straddling the boundary goes with the text after it
+            positions = {bisect_right(offsets, match.start()) - 1 for match in BOUNDARY_PATTERNS[priority].finditer(text)}
+            boundaries.append(sorted(position for position in positions if 0 < position < len(offsets)))
+        return boundaries
+
+    def _best_boundary(self, boundaries: List[List[int]], low: int, high: int) -> int:
+        """
+        Latest boundary in (low, high] of the highest priority, or -1 when there is none
+        """
+        for positions in reversed(boundaries):
+            index = bisect_right(positions, high) - 1
+            if index >= 0 and positions[index] > low:
+                return positions[index]
+        return -1
+
+    def _first_boundary(self, boundaries: List[List[int]], low: int, high: int) -> int:
+        """
+        Earliest boundary of any priority in [low, high), or -1 when there is none
+        """
+        first = -1
+        for positions in boundaries:
+            index = bisect_left(positions, low)
+            if index < len(positions) and positions[index] < high and (first < 0 or positions[index] < first):
+                first = positions[index]
+        return first
+
+    def split_spans(self, text: str) -> List[Tuple[int, int]]:
+        """
+        (start, end) character spans of the batches
+        """
+        if not text:
+            return []
+        offsets = self._token_offsets(text)
+        num_tokens = len(offsets)
+        if num_tokens <= self.max_tokens:
+            return [(0, len(text))]
+        boundaries = self._boundaries(text, offsets)
+
+        def char_offset(token_index: int) -> int:
+            return offsets[token_index] if token_index < num_tokens else len(text)
+
+        spans = []
+        start = 0
+        while start < num_tokens:
+            limit = start + self.max_tokens
+            if limit >= num_tokens:
+                end = num_tokens
+            else:
+                # prefer a well-filled batch, only fall back to a short one when nothing fits later
+                end = self._best_boundary(boundaries, start + int(self.max_tokens * self.min_fill), limit)
+                if end < 0:
+                    end = self._best_boundary(boundaries, start, limit)
+                if end < 0:
+                    end = limit  # oversize segment - hard split
+            spans.append((char_offset(start), char_offset(end)))
+            if end >= num_tokens:
+                break
+
+            next_start = end
+            if self.overlap_tokens:
+                # the earliest boundary keeps as much of the overlap as fits in overlap_tokens
+                next_start = self._first_boundary(boundaries, end - self.overlap_tokens, end)
+                if next_start < 0:
+                    next_start = end - self.overlap_tokens
+            start = max(next_start, start + 1)
+        return spans
+
+    def split(self, text: str) -> List[str]:
+        return [text[start:end] for start, end in self.split_spans(text)]
@@ -0,0 +1,103 @@
+from typing import Any, Dict, List, Optional
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+
+class ChunkCache:
+    """
+    Persistent content-addressed cache for LLM chunking results, backed by SQLite
+    Keys hash the prompt, model params and batch text so any change to them is a miss
+    Total stored size is bounded and least recently used entries are evicted first
+    """
+    EVICT_TO = 0.9  # share of max_bytes a full cache is trimmed down to
+    def __init__(self, path: str, max_bytes: int = 512 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, last_access REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_chunks_last_access ON chunks (last_access)")
+        self.conn.commit()
+        # running total of stored bytes, so a put doesn't have to sum the whole table
+        self._total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM chunks").fetchone()[0]
+
+    @staticmethod
+    def make_key(prompt: str, params: Dict[str, Any], content: str) -> str:
+        """
+        Hash of prompt file contents, model params and batch text
+        """
+        digest = hashlib.sha256()
+        for part in (prompt, json.dumps(params, sort_keys=True, default=str), content):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[List[Dict[str, str]]]:
+        with self._lock:
+            row = self.conn.execute("SELECT value FROM chunks WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.conn.execute("UPDATE chunks SET last_access = ? WHERE key = ?", (time.time(), key))
+            self.conn.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, chunks: List[Dict[str, str]]):
+        value = json.dumps(chunks)
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            logging.warning(f"Chunk cache entry of {size} bytes exceeds cache size, not caching")
+            return
+        with self._lock:
+            row = self.conn.execute("SELECT size FROM chunks WHERE key = ?", (key,)).fetchone()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO chunks (key, value, size, last_access) VALUES (?, ?, ?, ?)",
+                (key, value, size, time.time()),
+            )
+            self._total += size - (row[0] if row else 0)
+            if self._total > self.max_bytes:
+                self._evict()
+            self.conn.commit()
+
+    def _evict(self):
+        """
+        Drop least recently used entries until the cache fits in EVICT_TO of max_bytes
+        Evicting below the limit means a full cache evicts once per many puts instead of on every one
+        """
+        # other processes may share the file - resync the running total before deciding what to drop
+        self._total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM chunks").fetchone()[0]
+        target = int(self.max_bytes * self.EVICT_TO)
+        if self._total <= self.max_bytes:
+            return
+        count, freed = 0, 0
+        # walks the last_access index and stops as soon as enough is freed
+        for (size,) in self.conn.execute("SELECT size FROM chunks ORDER BY last_access"):
+            if self._total - freed <= target:
+                break
+            count += 1
+            freed += size
+        self.conn.execute(
+            "DELETE FROM chunks WHERE key IN (SELECT key FROM chunks ORDER BY last_access LIMIT ?)", (count,)
+        )
+        self._total -= freed
+        logging.info(f"Evicted {count} entries from chunk cache")
+
+    def __len__(self):
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
@@ -1,8 +1,14 @@
-from typing import List, Dict
-from config.config import AIAgentOnboardingDataResponse
+from typing import AsyncIterator, List, Dict, Optional
+from config.config import AIAgentOnboardingDataResponse, onboardconfig
 from config.model_provider_config import ModelProviderConfig
+from onboard_workflow.chunk_cache import ChunkCache
+from onboard_workflow.batching import TokenBatcher
+from onboard_workflow.rule_chunker import RuleBasedChunker
+from utils.json_stream import JSONObjectStream
 import asyncio
 import json
+import os
+import uuid
 import tiktoken
 from pydantic import BaseModel, ValidationError
 import logging
@@ -13,7 +19,7 @@ class MiniChunk(BaseModel):
 	overview: str
 
 class DataChunker:
-	def __init__(self, llm_config: ModelProviderConfig):
+	def __init__(self, llm_config: ModelProviderConfig, cache: Optional[ChunkCache] = None, chunking_mode: str = "llm"):
 		self.llm_client_config = llm_config
 		self.llm_provider_client = self.llm_client_config.initialize_model_provider()
 		if not self.llm_provider_client:
@@ -21,32 +27,42 @@ class DataChunker:
 
 		self.tokenizer = tiktoken.get_encoding("cl100k_base")  # GPT-4o token encoding
 		self.max_tokens_per_request = 10000
-		self.semaphore = asyncio.Semaphore(3)  # Controls concurrent LLM calls
+		self.batcher = TokenBatcher(
+			self.tokenizer, self.max_tokens_per_request, overlap_tokens=onboardconfig.BATCH_OVERLAP_TOKENS
+		)
+		self.scheduler = self.llm_client_config.get_scheduler()  # Paces LLM calls against the provider quota
 
-	def split_into_batches(self, content: str) -> List[str]:
+		if cache is None and onboardconfig.CHUNK_CACHE_ENABLED:
+			cache = ChunkCache(onboardconfig.CHUNK_CACHE_PATH, max_bytes=onboardconfig.CHUNK_CACHE_MAX_BYTES)
+		self.cache = cache
+		self.llm_client_config.get_prompt()  # compile and validate the prompt up front
+
+		# "llm" always calls the model, "rules" always uses the rule chunker, "auto" uses it for structured pages
+		self.chunking_mode = chunking_mode
+		self.rule_chunker = RuleBasedChunker()
+
+	def _rule_chunks(self, content: str) -> Optional[List[Dict[str, str]]]:
 		"""
-		Splits content into token-sized chunks, ensuring sentence boundaries are respected.
+		Chunks from the rule-based chunker, or None when the content should go to the LLM.
+		Falls back to the LLM when the rules produce nothing so no page ends up without chunks.
 		"""
-		sentences = content.split(". ")  # Naive sentence boundary split
-		batches = []
-		current_batch = []
-		current_token_count = 0
+		if self.chunking_mode == "rules":
+			chunks = self.rule_chunker.chunk(content)
+		elif self.chunking_mode == "auto":
+			chunks = self.rule_chunker.try_chunk(content)
+		else:
+			return None
+		if not chunks:
+			logging.info("Rule chunker found no structure, falling back to the LLM")
+			return None
+		return chunks
 
-		for sentence in sentences:
-			token_count = len(self.tokenizer.encode(sentence))
-			if current_token_count + token_count > self.max_tokens_per_request:
-				if current_batch:
-					batches.append(". ".join(current_batch))
-				current_batch = [sentence]
-				current_token_count = token_count
-			else:
-				current_batch.append(sentence)
-				current_token_count += token_count
-
-		if current_batch:
-			batches.append(". ".join(current_batch))  # Add last batch
-		
-		return batches
+	def split_into_batches(self, content: str) -> List[str]:
+		"""
+		Splits content into token-sized chunks on markdown structure and sentence boundaries.
+		See TokenBatcher - the content is tokenized once and oversize segments are hard split.
+		"""
+		return self.batcher.split(content)
 	
 	def _parse_chunks(self, parsed_data: str) -> List[Dict[str, str]]:
 		"""
@@ -72,37 +88,110 @@ class DataChunker:
 		# At this point, parsed_data should be a list of dicts
 		if isinstance(parsed_data, list):
 			for chunk in parsed_data:
-				try:
-					validated_chunk = MiniChunk(**chunk)
-					valid_chunks.append(validated_chunk.dict())
-				except ValidationError as e:
-					logging.warning(f"Skipping invalid chunk: {chunk}, Error: {e}")
+				validated_chunk = self._validate_chunk(chunk)
+				if validated_chunk is not None:
+					valid_chunks.append(validated_chunk)
 
 		logging.debug(valid_chunks)
 		return valid_chunks
+
+	@staticmethod
+	def _validate_chunk(chunk) -> Optional[Dict[str, str]]:
+		try:
+			return MiniChunk(**chunk).dict()
+		except (TypeError, ValidationError) as e:
+			logging.warning(f"Skipping invalid chunk: {chunk}, Error: {e}")
+			return None
 	
 	async def call_llm(self, content: str) -> List[Dict[str, str]]:
 		"""
 		Calls LLM asynchronously to refine content into structured mini-chunks.
-		Delegates parsing logic to `parse_chunks`.
+		Collects iter_llm_chunks - see there for caching, scheduling and parsing.
 		"""
-		async with self.semaphore:
-			msg_structure = self.llm_client_config.get_messages_from_yaml(self.llm_client_config.messages)
-			msg_input = self.llm_client_config.format_messages(msg_structure, content=content)
+		return [chunk async for chunk in self.iter_llm_chunks(content)]
 
-			response = await self.llm_client_config.send_request(self.llm_provider_client, msg_input)
+	async def iter_llm_chunks(self, content: str) -> AsyncIterator[Dict[str, str]]:
+		"""
+		Streams the completion and yields each mini-chunk as soon as its JSON object closes.
+		Unchanged batches are served from the chunk cache without calling the LLM.
+		Requests go through the provider scheduler, which paces and retries them.
+		A truncated or failed stream keeps every chunk completed before the cut, but isn't cached.
+		"""
+		cache_key = self._cache_key(content)
+		if cache_key is not None:
+			cached_chunks = self.cache.get(cache_key)
+			if cached_chunks is not None:
+				logging.info("Chunk cache hit, skipping LLM call")
+				for chunk in cached_chunks:
+					yield chunk
+				return
+
+		prompt = self.llm_client_config.get_prompt()
+		msg_input = prompt.render(content=content)
+		# Prompt and batch tokens in, roughly the batch again out
+		content_tokens = len(self.tokenizer.encode(content))
+		prompt_tokens = prompt.token_count(self.tokenizer.encode)
+
+		parser = JSONObjectStream()
+		# raw deltas for the fallback parse - the parser only keeps the object it is scanning
+		deltas: List[str] = []
+		chunks, complete = [], True
+		try:
+			async for delta in self.scheduler.stream(
+				lambda: self.llm_client_config.open_stream(self.llm_provider_client, msg_input),
+				tokens=prompt_tokens + 2 * content_tokens,
+			):
+				deltas.append(delta)
+				for obj in parser.feed(delta):
+					chunk = self._validate_chunk(obj)
+					if chunk is not None:
+						chunks.append(chunk)
+						yield chunk
+		except Exception as e:
+			logging.error(f"LLM request failed: {e}")
+			complete = False
+
+		if not parser.objects_found:
+			# no chunk objects in the stream - fall back to parsing the whole response
+			if complete:
+				for chunk in self._parse_response("".join(deltas), cache_key):
+					yield chunk
+			return
+		if parser.truncated or not complete:
+			logging.warning(f"LLM response cut off, salvaged {len(chunks)} chunks")
+		elif cache_key is not None and chunks:
+			self.cache.put(cache_key, chunks)
+
+	def _cache_key(self, content: str) -> Optional[str]:
+		if self.cache is None:
+			return None
+		# the prompt source is part of the key, prompt edits invalidate cached chunks
+		prompt_text = self.llm_client_config.get_prompt().source
+		return ChunkCache.make_key(self.llm_client_config.api + prompt_text, self.llm_client_config.params, content)
 
+	def _parse_response(self, response: str, cache_key: Optional[str]) -> List[Dict[str, str]]:
+		"""
+		Parse the raw LLM text into mini-chunks and cache them - used for batch results and as the
+		fallback for streamed responses. Complete objects are salvaged from truncated output.
+		"""
+		parser = JSONObjectStream()
+		chunks = [chunk for chunk in map(self._validate_chunk, parser.feed(response)) if chunk is not None]
+		if not chunks:
 			try:
 				# Clean and parse JSON response
 				message_content = response.replace("```json", "").replace("```", "").strip()
 				logging.info(message_content)
-				parsed_data = json.loads(message_content)
-
-				return self._parse_chunks(parsed_data)
-
+				chunks = self._parse_chunks(json.loads(message_content))
 			except json.JSONDecodeError:
 				logging.error("Error decoding JSON from LLM response")
 				return []
+		elif parser.truncated:
+			logging.warning(f"LLM response cut off, salvaged {len(chunks)} chunks")
+			return chunks
+
+		if cache_key is not None and chunks:
+			self.cache.put(cache_key, chunks)
+		return chunks
 
 	async def process_entry(self, raw_entry: AIAgentOnboardingDataResponse) -> List[AIAgentOnboardingDataResponse]:
 		"""
@@ -112,9 +201,13 @@ class DataChunker:
 		# meta = raw_entry.get("meta_data", {})
 		meta = raw_entry.meta_data
 		
-		content_batches = self.split_into_batches(content)
-		tasks = [self.call_llm(batch) for batch in content_batches]
-		mini_chunks_list = await asyncio.gather(*tasks)
+		rule_chunks = self._rule_chunks(content)
+		if rule_chunks is not None:
+			mini_chunks_list = [rule_chunks]
+		else:
+			content_batches = self.split_into_batches(content)
+			tasks = [self.call_llm(batch) for batch in content_batches]
+			mini_chunks_list = await asyncio.gather(*tasks)
 
 		cleaned_data = []
 		for mini_chunks in mini_chunks_list:
@@ -129,11 +222,151 @@ class DataChunker:
 
 		return cleaned_data
 
-	async def chunk_and_clean(self, raw_data: List[AIAgentOnboardingDataResponse]) -> List[AIAgentOnboardingDataResponse]:
+	async def chunk_and_clean(self, raw_data: List[AIAgentOnboardingDataResponse], offline: bool = False) -> List[AIAgentOnboardingDataResponse]:
 		"""
 		Processes raw data asynchronously with controlled concurrency.
+		offline=True sends the LLM batches as a provider batch job instead, see chunk_and_clean_offline.
 		"""
+		if offline:
+			return await self.chunk_and_clean_offline(raw_data)
 		# tasks = [self.process_entry(entry) for entry in raw_data if "content" in entry]
 		tasks = [self.process_entry(entry) for entry in raw_data if entry.content]
 		results = await asyncio.gather(*tasks)
-		return [item for sublist in results for item in sublist] 
\ No newline at end of file
+		logging.info(f"LLM scheduler limits: {self.scheduler.limits()}")
+		return [item for sublist in results for item in sublist] 
+
+	async def _run_batch_jobs(self, requests: List[Dict], poll_interval: float) -> Dict[str, str]:
+		"""
+		Write requests to JSONL files of at most BATCH_MAX_REQUESTS lines, submit one batch job per file
+		and wait for all of them. Returns custom_id -> response text.
+		"""
+		os.makedirs(onboardconfig.BATCH_JOBS_DIR, exist_ok=True)
+		client = self.llm_provider_client
+		config = self.llm_client_config
+
+		async def run_job(job_requests):
+			jsonl_path = os.path.join(onboardconfig.BATCH_JOBS_DIR, f"{uuid.uuid4().hex}.jsonl")
+			with open(jsonl_path, "w") as file:
+				for request in job_requests:
+					file.write(json.dumps(request) + "\n")
+			batch_id = await config.submit_batch(client, jsonl_path, onboardconfig.BATCH_COMPLETION_WINDOW)
+			batch = await config.wait_for_batch(client, batch_id, poll_interval)
+			return await config.get_batch_results(client, batch)
+
+		size = onboardconfig.BATCH_MAX_REQUESTS
+		jobs = [run_job(requests[i:i + size]) for i in range(0, len(requests), size)]
+		responses = {}
+		for job_responses in await asyncio.gather(*jobs):
+			responses.update(job_responses)
+		return responses
+
+	async def chunk_and_clean_offline(
+		self, raw_data: List[AIAgentOnboardingDataResponse], poll_interval: Optional[float] = None
+	) -> List[AIAgentOnboardingDataResponse]:
+		"""
+		Bulk variant of chunk_and_clean for backfills - every uncached batch becomes one line of a provider
+		batch job (cheaper and not rate limited like live calls) and results are mapped back by custom_id.
+		Requests the batch job didn't complete are retried live so no entry is silently dropped.
+		"""
+		poll_interval = onboardconfig.BATCH_POLL_SECONDS if poll_interval is None else poll_interval
+		entries = [entry for entry in raw_data if entry.content]
+		prompt = self.llm_client_config.get_prompt()
+
+		entry_chunks = []  # per entry, the mini-chunks of each batch in order
+		requests, pending = [], {}
+		for i, entry in enumerate(entries):
+			rule_chunks = self._rule_chunks(entry.content)
+			if rule_chunks is not None:
+				entry_chunks.append([rule_chunks])
+				continue
+			batches = self.split_into_batches(entry.content)
+			entry_chunks.append([None] * len(batches))
+			for j, batch in enumerate(batches):
+				cache_key = self._cache_key(batch)
+				cached_chunks = self.cache.get(cache_key) if cache_key is not None else None
+				if cached_chunks is not None:
+					entry_chunks[i][j] = cached_chunks
+					continue
+				custom_id = f"{i}-{j}"
+				pending[custom_id] = (i, j, batch, cache_key)
+				msg_input = prompt.render(content=batch)
+				requests.append(self.llm_client_config.batch_request(custom_id, msg_input))
+
+		logging.info(f"Offline chunking: {len(requests)} batch requests, {len(entries)} entries")
+		responses = await self._run_batch_jobs(requests, poll_interval) if requests else {}
+
+		missing = []
+		for custom_id, (i, j, batch, cache_key) in pending.items():
+			if custom_id in responses:
+				entry_chunks[i][j] = self._parse_response(responses[custom_id], cache_key)
+			else:
+				missing.append((i, j, batch))
+		if missing:
+			logging.warning(f"{len(missing)} batch requests did not complete, retrying them live")
+			retried = await asyncio.gather(*[self.call_llm(batch) for _, _, batch in missing])
+			for (i, j, _), mini_chunks in zip(missing, retried):
+				entry_chunks[i][j] = mini_chunks
+
+		return [
+			AIAgentOnboardingDataResponse(meta_data=entry.meta_data, content=chunk["content"], overview=chunk["overview"])
+			for entry, batch_chunks in zip(entries, entry_chunks)
+			for mini_chunks in batch_chunks
+			for chunk in mini_chunks
+		]
+
+	async def stream_chunks(self, raw_entries: AsyncIterator[AIAgentOnboardingDataResponse]) -> AsyncIterator[AIAgentOnboardingDataResponse]:
+		"""
+		Streaming variant of chunk_and_clean - an entry's batches go to the LLM as soon as the entry arrives
+		and its clean chunks are yielded as soon as each one closes in the streamed LLM response.
+		At most STREAM_MAX_PENDING_BATCHES batches are in flight or waiting to be consumed, which also
+		pauses pulling new raw entries so memory stays bounded.
+		"""
+		pending = asyncio.Semaphore(onboardconfig.STREAM_MAX_PENDING_BATCHES)
+		results = asyncio.Queue()
+		tasks = []
+
+		def to_responses(meta, mini_chunks):
+			return [
+				AIAgentOnboardingDataResponse(meta_data=meta, content=chunk["content"], overview=chunk["overview"])
+				for chunk in mini_chunks
+			]
+
+		async def chunk_batch(meta, batch):
+			try:
+				async for chunk in self.iter_llm_chunks(batch):
+					await results.put((to_responses(meta, [chunk]), False))
+			finally:
+				await results.put(([], True))  # batch done, frees its pending slot
+
+		async def feed():
+			async for raw_entry in raw_entries:
+				if not raw_entry.content:
+					continue
+				rule_chunks = self._rule_chunks(raw_entry.content)
+				if rule_chunks is not None:
+					await pending.acquire()
+					await results.put((to_responses(raw_entry.meta_data, rule_chunks), True))
+					continue
+				for batch in self.split_into_batches(raw_entry.content):
+					await pending.acquire()
+					tasks.append(asyncio.create_task(chunk_batch(raw_entry.meta_data, batch)))
+			await asyncio.gather(*tasks)
+
+		feed_task = asyncio.create_task(feed())
+		try:
+			while not (feed_task.done() and results.empty()):
+				get_task = asyncio.ensure_future(results.get())
+				done, _ = await asyncio.wait({get_task, feed_task}, return_when=asyncio.FIRST_COMPLETED)
+				if get_task not in done:
+					get_task.cancel()
+					continue
+				responses, batch_done = get_task.result()
+				if batch_done:
+					pending.release()
+				for chunk in responses:
+					yield chunk
+			feed_task.result()  # surface crawl/LLM errors
+		finally:
+			feed_task.cancel()
+			for task in tasks:
+				task.cancel()
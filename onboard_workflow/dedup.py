@@ -0,0 +1,135 @@
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Set
+from config.config import AIAgentOnboardingDataResponse, onboardconfig
+import hashlib
+import logging
+import re
+import numpy as np
+
+NON_WORD = re.compile(r"[^\w\s]+")
+
+
+def lsh_params(threshold: float, num_perm: int):
+    """
+    Pick (bands, rows) with bands * rows == num_perm whose LSH threshold (1/bands)^(1/rows) is closest below
+    `threshold` - erring low favours recall, candidates are verified with exact Jaccard anyway
+    """
+    options = [(num_perm // rows, rows) for rows in range(1, num_perm + 1) if num_perm % rows == 0]
+    below = [option for option in options if (1 / option[0]) ** (1 / option[1]) <= threshold]
+    return max(below or options[:1], key=lambda option: (1 / option[0]) ** (1 / option[1]))
+
+
+class ChunkDeduplicator:
+    """
+    Drops exact and near-duplicate chunks (repeated nav text, footers, FAQ answers shared across pages)
+    Exact copies are caught by a hash of the normalized text, near copies by MinHash signatures over word
+    shingles bucketed in an LSH index and confirmed with exact Jaccard similarity >= threshold.
+    The first copy survives and collects the URLs of every dropped copy in meta_data.source_urls.
+    Chunks are only compared within the same session.
+    """
+    def __init__(
+        self,
+        threshold: Optional[float] = None,
+        num_perm: Optional[int] = None,
+        shingle_size: Optional[int] = None,
+        seed: int = 1,
+    ):
+        self.threshold = onboardconfig.DEDUP_THRESHOLD if threshold is None else threshold
+        self.num_perm = num_perm or onboardconfig.DEDUP_NUM_PERM
+        self.shingle_size = shingle_size or onboardconfig.DEDUP_SHINGLE_SIZE
+        self.bands, self.rows = lsh_params(self.threshold, self.num_perm)
+        rng = np.random.default_rng(seed)
+        # h(x) = a * x + b mod 2^64 with odd a - a cheap family of permutations of the 64 bit shingle hashes
+        self._a = rng.integers(1, 2 ** 63, self.num_perm, dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, 2 ** 63, self.num_perm, dtype=np.uint64)
+
+        self.kept: List[AIAgentOnboardingDataResponse] = []
+        self._kept_shingles: List[Set[str]] = []
+        self._exact: Dict[str, int] = {}
+        self._buckets: List[Dict[bytes, List[int]]] = [{} for _ in range(self.bands)]
+        self.exact_duplicates = 0
+        self.near_duplicates = 0
+
+    @staticmethod
+    def _tokens(text: str) -> List[str]:
+        return NON_WORD.sub(" ", text.lower()).split()
+
+    def _shingles(self, tokens: List[str]) -> Set[str]:
+        k = self.shingle_size
+        if len(tokens) <= k:
+            return {" ".join(tokens)}
+        return {" ".join(tokens[i:i + k]) for i in range(len(tokens) - k + 1)}
+
+    def _signature(self, shingles: Set[str]) -> np.ndarray:
+        hashes = np.fromiter(
+            (int.from_bytes(hashlib.blake2b(shingle.encode(), digest_size=8).digest(), "little") for shingle in shingles),
+            dtype=np.uint64,
+            count=len(shingles),
+        )
+        return (np.outer(self._a, hashes) + self._b[:, None]).min(axis=1)
+
+    def _merge(self, index: int, duplicate: AIAgentOnboardingDataResponse):
+        """
+        Record the dropped copy's URLs on the surviving chunk (meta_data is shared per page, so copy it)
+        """
+        kept = self.kept[index]
+        urls = list(kept.meta_data.source_urls or ([kept.meta_data.url] if kept.meta_data.url else []))
+        for url in duplicate.meta_data.source_urls or [duplicate.meta_data.url]:
+            if url and url not in urls:
+                urls.append(url)
+        kept.meta_data = kept.meta_data.model_copy(update={"source_urls": urls})
+
+    def add(self, chunk: AIAgentOnboardingDataResponse) -> Optional[AIAgentOnboardingDataResponse]:
+        """
+        Returns the chunk if it is new, None if it duplicates one already kept
+        """
+        session = chunk.meta_data.session_id
+        tokens = self._tokens(chunk.content)
+        exact_key = hashlib.sha1(f"{session}\0{' '.join(tokens)}".encode()).hexdigest()
+        if exact_key in self._exact:
+            self.exact_duplicates += 1
+            self._merge(self._exact[exact_key], chunk)
+            return None
+
+        shingles = self._shingles(tokens)
+        signature = self._signature(shingles)
+        band_keys = [
+            session.encode() + signature[band * self.rows:(band + 1) * self.rows].tobytes() for band in range(self.bands)
+        ]
+        candidates = set()
+        for buckets, key in zip(self._buckets, band_keys):
+            candidates.update(buckets.get(key, ()))
+        for index in sorted(candidates):
+            kept_shingles = self._kept_shingles[index]
+            if len(shingles & kept_shingles) / len(shingles | kept_shingles) >= self.threshold:
+                self.near_duplicates += 1
+                self._merge(index, chunk)
+                return None
+
+        index = len(self.kept)
+        self.kept.append(chunk)
+        self._kept_shingles.append(shingles)
+        self._exact[exact_key] = index
+        for buckets, key in zip(self._buckets, band_keys):
+            buckets.setdefault(key, []).append(index)
+        return chunk
+
+    def dedupe(self, chunks: Iterable[AIAgentOnboardingDataResponse]) -> List[AIAgentOnboardingDataResponse]:
+        unique = [chunk for chunk in chunks if self.add(chunk) is not None]
+        logging.info(f"Dedup: {self.stats()}")
+        return unique
+
+    async def dedupe_stream(self, chunks: AsyncIterator[AIAgentOnboardingDataResponse]) -> AsyncIterator[AIAgentOnboardingDataResponse]:
+        """
+        Streaming variant - URLs of copies seen after a chunk was yielded only reach it if it wasn't consumed yet
+        """
+        async for chunk in chunks:
+            if self.add(chunk) is not None:
+                yield chunk
+        logging.info(f"Dedup: {self.stats()}")
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "kept": len(self.kept),
+            "exact_duplicates": self.exact_duplicates,
+            "near_duplicates": self.near_duplicates,
+        }
@@ -1,46 +1,92 @@
 import json
 import asyncio
-from config.config import mistralai_config
+import mimetypes
+import urllib.request
+from urllib.parse import urlparse
+from config.config import mistralai_config, onboardconfig
+from utils.rate_limiter import TokenBucket
 import logging
 
+# shared across FileProcessor instances so parallel onboarding requests respect one OCR quota
+ocr_rate_limiter = TokenBucket(rate=onboardconfig.OCR_REQUESTS_PER_SECOND, capacity=onboardconfig.OCR_MAX_CONCURRENT)
+
 
 class FileProcessor:
-    def __init__(self, files, max_concurrent=3):
+    def __init__(self, files, max_concurrent=None):
         self.files = files
-        self.semaphore = asyncio.Semaphore(max_concurrent)  # throttle concurrency
+        self.semaphore = asyncio.Semaphore(max_concurrent or onboardconfig.OCR_MAX_CONCURRENT)  # throttle concurrency
+        self.rate_limiter = ocr_rate_limiter
         self.app = mistralai_config
 
+    def _get_content_type(self, url: str) -> str:
+        """
+        Guess the file content type from the url, falls back to a HEAD request
+        """
+        content_type, _ = mimetypes.guess_type(urlparse(url).path)
+        if content_type:
+            return content_type
+        try:
+            request = urllib.request.Request(url, method="HEAD")
+            with urllib.request.urlopen(request, timeout=10) as response:
+                return response.info().get_content_type()
+        except Exception as e:
+            logging.warning(f"Could not determine content type for {url}: {e}")
+            return ""
+
+    async def _get_document(self, url: str) -> dict:
+        """
+        Images go to OCR as image_url, everything else (pdf, docs) as document_url
+        """
+        content_type = await asyncio.to_thread(self._get_content_type, url)
+        if content_type.startswith("image/"):
+            return {"type": "image_url", "image_url": url}
+        return {"type": "document_url", "document_url": url}
+
     async def _perform_ocr(self, url: str):
         """
         Performs OCR for PDF and image files
         """
         logging.info(f"Performing OCR on file: {url}")
-        async with self.semaphore:
-            for attempt in range(3):
+        document = await self._get_document(url)
+        attempts = max(1, onboardconfig.OCR_MAX_RETRIES)
+        for attempt in range(attempts):
+            # reserve the rate budget first - waiting on it must not hold a concurrency slot
+            await self.rate_limiter.acquire()
+            async with self.semaphore:
                 try:
-                    response = self.app.ocr.process(
+                    response = await self.app.ocr.process_async(
                         model="mistral-ocr-latest",
-                        document={"type": "document_url", "document_url": url}
+                        document=document
                     )
                     return json.loads(response.model_dump_json())
 
-                except Exception as e1:
-                    try:
-                        response = self.app.ocr.process(
-                            model="mistral-ocr-latest",
-                            document={"type": "image_url", "image_url": url}
-                        )
-                        return json.loads(response.model_dump_json())
-
-                    except Exception as e2:
-                        if "429" in str(e2) and attempt < 2:
-                            await asyncio.sleep(2 ** attempt)
-                        else:
-                            return str(e2)
+                except Exception as e:
+                    rate_limited = getattr(e, "status_code", None) == 429 or "429" in str(e)
+                    if not rate_limited or attempt == attempts - 1:
+                        logging.error(f"Error performing OCR on file {url}: {e}")
+                        return {}
+            logging.warning(f"OCR rate limited for {url}, backing off")
+            self.rate_limiter.penalize(onboardconfig.OCR_RATE_LIMIT_BACKOFF)
+        return {}
 
     async def process_files(self):
         """
         Async task to help process multiple files at once without exceeding rate limits
         """
         tasks = [self._perform_ocr(url) for url in self.files]
-        return await asyncio.gather(*tasks)
\ No newline at end of file
+        return await asyncio.gather(*tasks)
+
+    async def iter_processed_files(self):
+        """
+        Streaming variant of process_files - yields (url, ocr result) pairs as soon as each file is done
+        """
+        tasks = {asyncio.create_task(self._perform_ocr(url)): url for url in self.files}
+        try:
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield tasks[task], task.result()
+        finally:
+            for task in tasks:
+                task.cancel()
@@ -0,0 +1,127 @@
+from typing import Dict, Iterable, List, Tuple
+import hashlib
+import os
+import sqlite3
+import threading
+
+
+class FingerprintStore:
+    """
+    SQLite record of what was onboarded per session - a content fingerprint per (url, page)
+    and the fingerprint and primary key of every chunk inserted for that page
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS pages (session_id TEXT, url TEXT, page INTEGER, fingerprint TEXT, "
+            "PRIMARY KEY (session_id, url, page))"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunks (session_id TEXT, url TEXT, page INTEGER, fingerprint TEXT, "
+            "record_id INTEGER, PRIMARY KEY (session_id, record_id))"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_chunks_page ON chunks (session_id, url, page)")
+        self.conn.commit()
+
+    @staticmethod
+    def fingerprint(*parts: str) -> str:
+        digest = hashlib.sha256()
+        for part in parts:
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def get_pages(self, session_id: str) -> Dict[Tuple[str, int], str]:
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT url, page, fingerprint FROM pages WHERE session_id = ?", (session_id,)
+            ).fetchall()
+        return {(url, page): fingerprint for url, page, fingerprint in rows}
+
+    def get_chunks(self, session_id: str, url: str, page: int) -> Dict[str, List[int]]:
+        """
+        Chunk fingerprint -> record ids stored for one page
+        """
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT fingerprint, record_id FROM chunks WHERE session_id = ? AND url = ? AND page = ?",
+                (session_id, url, page),
+            ).fetchall()
+        chunks: Dict[str, List[int]] = {}
+        for fingerprint, record_id in rows:
+            chunks.setdefault(fingerprint, []).append(record_id)
+        return chunks
+
+    def set_page(self, session_id: str, url: str, page: int, fingerprint: str):
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO pages (session_id, url, page, fingerprint) VALUES (?, ?, ?, ?)",
+                (session_id, url, page, fingerprint),
+            )
+            self.conn.commit()
+
+    def remove_page(self, session_id: str, url: str, page: int):
+        with self._lock:
+            self.conn.execute(
+                "DELETE FROM pages WHERE session_id = ? AND url = ? AND page = ?", (session_id, url, page)
+            )
+            self.conn.execute(
+                "DELETE FROM chunks WHERE session_id = ? AND url = ? AND page = ?", (session_id, url, page)
+            )
+            self.conn.commit()
+
+    def add_chunks(self, session_id: str, chunks: Iterable[Tuple[str, int, str, int]]):
+        """
+        Record (url, page, chunk fingerprint, record id) rows for inserted chunks
+        """
+        with self._lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO chunks (session_id, url, page, fingerprint, record_id) VALUES (?, ?, ?, ?, ?)",
+                [(session_id, *chunk) for chunk in chunks],
+            )
+            self.conn.commit()
+
+    def remove_chunks(self, session_id: str, record_ids: List[int]):
+        with self._lock:
+            self.conn.executemany(
+                "DELETE FROM chunks WHERE session_id = ? AND record_id = ?",
+                [(session_id, record_id) for record_id in record_ids],
+            )
+            self.conn.commit()
+
+    def remap_record_ids(self, session_id: str, mapping: Dict[int, int]):
+        """
+        Point chunk rows at new primary keys after the session's collection was copied (see migrate_collection)
+        Chunks whose record isn't in mapping no longer exist and are dropped
+        """
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT url, page, fingerprint, record_id FROM chunks WHERE session_id = ?", (session_id,)
+            ).fetchall()
+            # delete and re-insert - updating in place could collide with another row's old id
+            self.conn.execute("DELETE FROM chunks WHERE session_id = ?", (session_id,))
+            self.conn.executemany(
+                "INSERT INTO chunks (session_id, url, page, fingerprint, record_id) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (session_id, url, page, fingerprint, mapping[record_id])
+                    for url, page, fingerprint, record_id in rows
+                    if record_id in mapping
+                ],
+            )
+            self.conn.commit()
+
+    def clear_session(self, session_id: str):
+        """
+        Forget everything stored for a session - its next incremental run re-onboards every page
+        """
+        with self._lock:
+            self.conn.execute("DELETE FROM pages WHERE session_id = ?", (session_id,))
+            self.conn.execute("DELETE FROM chunks WHERE session_id = ?", (session_id,))
+            self.conn.commit()
+
+    def close(self):
+        self.conn.close()
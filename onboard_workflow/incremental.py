@@ -0,0 +1,125 @@
+from onboard_workflow.onboard import GenerateDataSnapshot, DataUploader
+from onboard_workflow.fingerprints import FingerprintStore
+from config.config import AIAgentOnboardRequest, AIAgentOnboardingDataResponse, onboardconfig
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import logging
+
+
+class IncrementalOnboarder:
+    """
+    Re-onboards a session by only chunking, embedding and inserting what changed since the last run
+    Unchanged pages are skipped, rows of removed pages and of chunks that disappeared from changed pages
+    are deleted by primary key, and chunks that survived a page edit keep their existing rows
+    """
+    def __init__(
+        self,
+        request: AIAgentOnboardRequest,
+        llm_choice: str = "openai",
+        store: Optional[FingerprintStore] = None,
+        uploader: Optional[DataUploader] = None,
+    ):
+        self.session_id = request.session_id
+        self.generator = GenerateDataSnapshot(request, llm_choice=llm_choice)
+        self.store = store or FingerprintStore(onboardconfig.FINGERPRINT_DB_PATH)
+        self.uploader = uploader or DataUploader()
+
+    @staticmethod
+    def _page_key(entry: AIAgentOnboardingDataResponse) -> Tuple[str, int]:
+        return entry.meta_data.url or "", entry.meta_data.page or 0
+
+    @staticmethod
+    def _from_failed_source(key: Tuple[str, int], failed_sources: List[str]) -> bool:
+        """
+        Whether a stored page came from a url/file that failed this run - a crawl can return pages below its url
+        """
+        url = key[0].rstrip("/")
+        for source in failed_sources:
+            source = source.rstrip("/")
+            if url == source or url.startswith(source + "/"):
+                return True
+        return False
+
+    @staticmethod
+    def _chunk_fingerprint(chunk: AIAgentOnboardingDataResponse) -> str:
+        return FingerprintStore.fingerprint(chunk.content, chunk.overview)
+
+    async def run(self):
+        """
+        Crawl/OCR everything, then chunk and upload only the delta against the fingerprint store
+        """
+        raw_data = await self.generator.assign_tasks()
+        stored_pages = self.store.get_pages(self.session_id)
+
+        current_pages: Dict[Tuple[str, int], AIAgentOnboardingDataResponse] = {}
+        for entry in raw_data:
+            current_pages[self._page_key(entry)] = entry
+        page_fingerprints = {
+            key: FingerprintStore.fingerprint(entry.content) for key, entry in current_pages.items()
+        }
+        changed = [entry for key, entry in current_pages.items() if stored_pages.get(key) != page_fingerprints[key]]
+        # pages of sources whose crawl/OCR failed this run are unknown, not removed - keep their rows;
+        # a run that produced nothing is treated as a failed crawl rather than an emptied site
+        failed_sources = self.generator.failed_sources
+        removed = [
+            key for key in stored_pages
+            if key not in current_pages and not self._from_failed_source(key, failed_sources)
+        ] if raw_data else []
+        logging.info(
+            f"Session {self.session_id}: {len(current_pages) - len(changed)} unchanged, "
+            f"{len(changed)} new or changed, {len(removed)} removed pages, {len(failed_sources)} failed sources"
+        )
+
+        chunks = await self.generator.data_chunker.chunk_and_clean(changed)
+        new_chunks: Dict[Tuple[str, int], List[AIAgentOnboardingDataResponse]] = {}
+        for chunk in chunks:
+            new_chunks.setdefault(self._page_key(chunk), []).append(chunk)
+
+        to_insert: List[AIAgentOnboardingDataResponse] = []
+        to_delete: List[int] = []
+        updated_pages: List[Tuple[str, int]] = []
+        for entry in changed:
+            key = self._page_key(entry)
+            if entry.content and not new_chunks.get(key):
+                # chunking failed - keep the old rows and retry on the next run
+                logging.warning(f"No chunks produced for {key}, keeping previous version")
+                continue
+            old_chunks = self.store.get_chunks(self.session_id, *key)
+            for chunk in new_chunks.get(key, []):
+                old_ids = old_chunks.get(self._chunk_fingerprint(chunk))
+                if old_ids:
+                    old_ids.pop()  # identical chunk already stored - keep its row
+                else:
+                    to_insert.append(chunk)
+            to_delete.extend(record_id for ids in old_chunks.values() for record_id in ids)
+            updated_pages.append(key)
+        for key in removed:
+            to_delete.extend(
+                record_id for ids in self.store.get_chunks(self.session_id, *key).values() for record_id in ids
+            )
+
+        def record_inserted(session_id, records, ids):
+            self.store.add_chunks(session_id, [
+                (*self._page_key(record), self._chunk_fingerprint(record), record_id)
+                for record, record_id in zip(records, ids)
+            ])
+
+        # insert before delete so an interrupted run leaves duplicates rather than gaps
+        if to_insert:
+            await self.uploader.upload_data(to_insert, on_inserted=record_inserted)
+        if to_delete:
+            await asyncio.to_thread(self.uploader.vector_db.delete_records, self.session_id, to_delete)
+            self.store.remove_chunks(self.session_id, to_delete)
+        for key in updated_pages:
+            self.store.set_page(self.session_id, *key, page_fingerprints[key])
+        for key in removed:
+            self.store.remove_page(self.session_id, *key)
+
+        return {
+            "status_code": 200,
+            "unchanged_pages": len(current_pages) - len(changed),
+            "changed_pages": len(updated_pages),
+            "removed_pages": len(removed),
+            "inserted": len(to_insert),
+            "deleted": len(to_delete),
+        }
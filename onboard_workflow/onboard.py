@@ -1,14 +1,16 @@
 from onboard_workflow.url_processor import URLProcessor
 from onboard_workflow.file_processor import FileProcessor
 from onboard_workflow.clean_and_chunk import DataChunker
+from onboard_workflow.dedup import ChunkDeduplicator
 from config.config import (
-    AIAgentOnboardRequest, AIAgentOnboardingDataResponse, metaData, zillizconfig,
+    AIAgentOnboardRequest, AIAgentOnboardingDataResponse, metaData, zillizconfig, onboardconfig,
     chunk_and_clean_task_app, gemma_chunk_and_clean_task_app
 )
 
-from typing import List
-from utils.services import EmbeddingService
-from collection_creator.create_zilliz_collection import ZillizClient
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+from utils.streams import merge_streams, micro_batches
+from utils.chunk_batch import ChunkBatch, fit_embeddings
+from utils.snapshot import Snapshot
 from fastapi import HTTPException
 import asyncio
 import logging
@@ -32,7 +34,9 @@ class GenerateDataSnapshot:
             logging.warning(f"Warning: Unknown LLM choice '{llm_choice}'. Defaulting to OpenAI")
             selected_llm_config = chunk_and_clean_task_app
         
-        self.data_chunker = DataChunker(llm_config=selected_llm_config)
+        self.data_chunker = DataChunker(llm_config=selected_llm_config, chunking_mode=request.chunking_mode)
+        # urls/files whose crawl or OCR failed in the last assign_tasks run (the processors return {} on errors)
+        self.failed_sources: List[str] = []
         logger.info(f"GenerateDataSnapshot initialized for session {self.request.session_id} with LLM: {llm_choice}")
 
     async def assign_tasks(self):
@@ -40,61 +44,209 @@ class GenerateDataSnapshot:
         Asyncronously runs tasks for different processes - assigns urls to url processor, files to file processing
         retreives and returns output as AIAgentOnboardingDataResponse object for adding to collection curator
         """
-        url_results = self.url_processor.get_scraped_data()
+        url_task = asyncio.create_task(self.url_processor.get_scraped_data())
         file_task = asyncio.create_task(self.file_processor.process_files())
         logging.info("Waiting for URL and file processing tasks to complete...")
-        [file_results] = await asyncio.gather(
-            file_task
+        url_results, file_results = await asyncio.gather(
+            url_task, file_task
         )
         
-        responses = []
+        self.failed_sources = [
+            source for source, result in zip([*(self.request.urls or []), *(self.request.files or [])], [*url_results, *file_results])
+            if not result
+        ]
+        if self.failed_sources:
+            logging.warning(f"Crawl/OCR failed for {self.failed_sources}")
 
-        # Process URL data
+        responses = []
         for url_result in url_results:
-            for data_item in url_result.get("data", []):
-                responses.append(AIAgentOnboardingDataResponse(
-                    meta_data=metaData(
-                        session_id=self.request.session_id,
-                        source="web",
-                        url=data_item.get("metadata", {}).get("url", "")
-                    ),
-                    content=data_item.get("markdown", ""),
-                    overview=""
-                ))
-        
-        # Process file data
+            responses.extend(self._url_responses(url_result))
         for file_result, file_url in zip(file_results, self.request.files or []):
-            for page in file_result.get("pages", []): 
-                responses.append(AIAgentOnboardingDataResponse(
-                    meta_data=metaData(
-                        session_id=self.request.session_id,
-                        source="KB",
-                        url=file_url
-                    ),
-                    content=page.get("markdown", ""), 
-                    overview="",
-                ))
+            responses.extend(self._file_responses(file_result, file_url))
 
         return responses
 
-    async def get_data(self):
+    def _url_responses(self, url_result) -> List[AIAgentOnboardingDataResponse]:
+        """
+        One raw entry per crawled page
+        """
+        return [
+            AIAgentOnboardingDataResponse(
+                meta_data=metaData(
+                    session_id=self.request.session_id,
+                    source="web",
+                    url=data_item.get("metadata", {}).get("url", ""),
+                    page=0
+                ),
+                content=data_item.get("markdown", ""),
+                overview=""
+            )
+            for data_item in url_result.get("data", [])
+        ]
+
+    def _file_responses(self, file_result, file_url) -> List[AIAgentOnboardingDataResponse]:
         """
-        This is the initally called method that initialised and assigns responses"""
+        One raw entry per OCR'd file page
+        """
+        return [
+            AIAgentOnboardingDataResponse(
+                meta_data=metaData(
+                    session_id=self.request.session_id,
+                    source="KB",
+                    url=file_url,
+                    page=page_number
+                ),
+                content=page.get("markdown", ""),
+                overview="",
+            )
+            for page_number, page in enumerate(file_result.get("pages", []))
+        ]
+
+    async def stream_raw_data(self) -> AsyncIterator[AIAgentOnboardingDataResponse]:
+        """
+        Yields raw entries as soon as each crawl or OCR job finishes instead of waiting for all of them
+        """
+        async def url_entries():
+            async for _, url_result in self.url_processor.iter_scraped_data():
+                for response in self._url_responses(url_result):
+                    yield response
+
+        async def file_entries():
+            async for file_url, file_result in self.file_processor.iter_processed_files():
+                for response in self._file_responses(file_result, file_url):
+                    yield response
+
+        async for response in merge_streams(url_entries(), file_entries(), maxsize=onboardconfig.STREAM_QUEUE_SIZE):
+            yield response
+
+    async def get_data(self, offline: bool = False):
+        """
+        This is the initally called method that initialised and assigns responses
+        offline=True chunks through a provider batch job - for large backfills that can wait"""
         raw_data = await self.assign_tasks()
 
         logging.info("Received raw data --> Now processing clean")
 
-        clean_data = await self.data_chunker.chunk_and_clean(raw_data)
+        clean_data = await self.data_chunker.chunk_and_clean(raw_data, offline=offline)
+        if onboardconfig.DEDUP_ENABLED:
+            clean_data = ChunkDeduplicator().dedupe(clean_data)
         return clean_data
 
+    def stream_data(self) -> AsyncIterator[AIAgentOnboardingDataResponse]:
+        """
+        Streaming variant of get_data - every page flows into chunking as soon as it is crawled or OCR'd
+        and clean chunks are yielded as soon as their LLM call returns"""
+        chunks = self.data_chunker.stream_chunks(self.stream_raw_data())
+        if onboardconfig.DEDUP_ENABLED:
+            chunks = ChunkDeduplicator().dedupe_stream(chunks)
+        return chunks
+
 class DataUploader:
-    def __init__(self):
-        self.vector_db = ZillizClient()
+    def __init__(self, dimensions: Optional[Dict[str, int]] = None):
+        """
+        dimensions overrides zillizconfig.VECTOR_DIMENSIONS per vector field for collections this uploader creates
+        """
+        # deferred so importing the onboarding workflow doesn't pull in pymilvus/torch
+        from utils.services import EmbeddingService
+        from collection_creator.vector_backend import get_vector_client
+
+        self.vector_db = get_vector_client()
         self.embedding_service = EmbeddingService()
+        self.dimensions = dimensions
+
+    async def _run_stage(self, in_queue: asyncio.Queue, out_queue: Optional[asyncio.Queue], handler):
+        """
+        Pipeline stage - pulls items, runs handler and passes results downstream until the None sentinel
+        Bounded queues give backpressure so a slow stage pauses the stages before it
+        """
+        while True:
+            item = await in_queue.get()
+            if item is None:
+                break
+            result = await handler(*item)
+            if out_queue is not None:
+                await out_queue.put(result)
+        if out_queue is not None:
+            await out_queue.put(None)
 
-    async def upload_data(self, scraped_data:List[AIAgentOnboardingDataResponse]):
+    async def _run_upload_pipeline(
+        self,
+        batches: AsyncIterator[Tuple[str, List[AIAgentOnboardingDataResponse]]],
+        on_inserted: Optional[Callable[[str, List[AIAgentOnboardingDataResponse], list], None]] = None,
+    ) -> int:
+        """
+        Overlaps local jina encode, OpenAI embedding and Milvus insert of consecutive (session_id, batch) pairs
+        batch i+1 encodes while batch i is embedded by OpenAI and batch i-1 is inserted
+        on_inserted(session_id, records, ids) is called with the primary keys of every inserted batch
+        Returns the number of inserted records
+        """
+        depth = onboardconfig.UPLOAD_PIPELINE_DEPTH
+        encode_queue, openai_queue, insert_queue = (asyncio.Queue(maxsize=depth) for _ in range(3))
+        inserted = 0
+        # vector field dims of each session's collection, read back after create_collection
+        dimensions: Dict[str, Dict[str, int]] = {}
+
+        async def encode(session_id, start, records):
+            logging.info(f"Processing records {start} to {start + len(records)} for session {session_id}")
+            dims = dimensions[session_id]
+            # snapshot replays arrive as ChunkBatches and may already carry their embeddings,
+            # possibly at another collection's dims - padded legacy vectors are cut back, native ones truncated
+            batch = records if isinstance(records, ChunkBatch) else ChunkBatch(records)
+            for field in list(batch.vectors):
+                if batch.dimension(field) != dims[field]:
+                    batch.set_vectors(field, fit_embeddings(batch.vectors[field], dims[field]))
+            texts = [record.content for record in batch.records]
+            if "vector" not in batch.vectors:
+                batch.set_vectors("vector", await self.embedding_service.embed_passages(texts, dims["vector"]))
+            return session_id, batch, texts
+
+        async def embed_openai(session_id, batch, texts):
+            if "vector_openai" not in batch.vectors:
+                batch.set_vectors(
+                    "vector_openai", await self.embedding_service.embed_openai(texts, dimensions[session_id]["vector_openai"])
+                )
+            logging.info(f"Generated {len(batch)} embeddings for session {session_id}")
+            return session_id, batch
+
+        async def insert(session_id, batch):
+            nonlocal inserted
+            if any(batch.dimension(field) != dimensions[session_id][field] for field in batch.vectors):
+                raise HTTPException(status_code=500, detail="Incorrect embedding dimension")
+
+            ids = await asyncio.to_thread(self.vector_db.insert_records, session_id, batch)
+            inserted += len(batch)
+            if on_inserted is not None:
+                on_inserted(session_id, batch.records, ids)
+
+        async def produce():
+            offsets = {}
+            async for session_id, batch in batches:
+                if session_id not in offsets:
+                    await asyncio.to_thread(self.vector_db.create_collection, session_id, self.dimensions)
+                    dimensions[session_id] = await asyncio.to_thread(self.vector_db.get_dimensions, session_id)
+                    offsets[session_id] = 0
+                await encode_queue.put((session_id, offsets[session_id], batch))
+                offsets[session_id] += len(batch)
+            await encode_queue.put(None)
+
+        tasks = [
+            asyncio.create_task(produce()),
+            asyncio.create_task(self._run_stage(encode_queue, openai_queue, encode)),
+            asyncio.create_task(self._run_stage(openai_queue, insert_queue, embed_openai)),
+            asyncio.create_task(self._run_stage(insert_queue, None, insert)),
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        except Exception:
+            for task in tasks:
+                task.cancel()
+            raise
+        return inserted
+
+    async def upload_data(self, scraped_data:List[AIAgentOnboardingDataResponse], on_inserted=None):
         """
         Uploads data to collection curator
+        on_inserted(session_id, records, ids) receives the primary keys of each inserted batch
         """
         logging.info("Received campaign data in upload function.")
         collection_records = {}
@@ -103,26 +255,46 @@ class DataUploader:
             collection_records.setdefault(session_id, []).append(record)
         logging.debug(collection_records)
 
-        for session_id, records in collection_records.items():
-            self.vector_db.create_collection(session_id)
-            batch_size = zillizconfig.ZILLIZ_INSERTION_BATCH_SIZE
-
-            for i in range(0, len(records), batch_size):
-                logging.info(f"Processing records {i} to {i + batch_size} for session {session_id}")
-                batch = records[i:i + batch_size]
-                texts = [record.content for record in batch]
-
-                vectors = await self.embedding_service.get_embeddings(texts)
-                vectors_openai = await self.embedding_service.get_openaiembeddings(texts)
-                logging.info(f"Generated {len(vectors)} embeddings for session {session_id}")
-
-                chunks_to_be_pushed = []
-                for chunk, vector, vector_openai in zip(batch, vectors, vectors_openai):
-                    if len(vector) != zillizconfig.VECTOR_DIMENSION or len(vector_openai) != zillizconfig.VECTOR_DIMENSION :
-                        raise HTTPException(status_code=500, detail="Incorrect embedding dimension")
-                    chunk.vector = vector
-                    chunk.vector_openai = vector_openai
-                    chunks_to_be_pushed.append(chunk)
-
-                self.vector_db.insert_records(session_id, chunks_to_be_pushed)
-        return {"status_code": 200, "message": "Data uploaded successfully!"}    
+        batch_size = zillizconfig.ZILLIZ_INSERTION_BATCH_SIZE
+
+        async def batches():
+            for session_id, records in collection_records.items():
+                for i in range(0, len(records), batch_size):
+                    yield session_id, records[i:i + batch_size]
+
+        await self._run_upload_pipeline(batches(), on_inserted)
+        return {"status_code": 200, "message": "Data uploaded successfully!"}
+
+    async def upload_snapshot(self, path: str, session_id: Optional[str] = None, url: Optional[str] = None):
+        """
+        Replays a binary snapshot (see utils.snapshot) into its collections one row group at a time
+        Embeddings stored in the snapshot are reused, only chunks without them are embedded
+        """
+        snapshot = Snapshot(path)
+        batch_size = zillizconfig.ZILLIZ_INSERTION_BATCH_SIZE
+
+        async def batches():
+            for snapshot_session in ([session_id] if session_id else snapshot.sessions()):
+                for batch in snapshot.iter_batches(snapshot_session, url):
+                    for i in range(0, len(batch), batch_size):
+                        yield snapshot_session, batch.slice(i, i + batch_size)
+
+        inserted = await self._run_upload_pipeline(batches())
+        logging.info(f"Replayed {inserted} records from snapshot {path}")
+        return {"status_code": 200, "message": "Data uploaded successfully!", "records": inserted}
+
+    async def upload_stream(self, chunks: AsyncIterator[AIAgentOnboardingDataResponse]):
+        """
+        Uploads chunks as they arrive - a micro-batcher groups them per session and flushes full batches
+        (or partial ones after STREAM_FLUSH_SECONDS) straight into the embed/insert pipeline
+        """
+        logging.info("Streaming chunks into upload pipeline.")
+        batches = micro_batches(
+            chunks,
+            batch_size=zillizconfig.ZILLIZ_INSERTION_BATCH_SIZE,
+            max_wait=onboardconfig.STREAM_FLUSH_SECONDS,
+            key=lambda record: record.meta_data.session_id,
+        )
+        inserted = await self._run_upload_pipeline(batches)
+        logging.info(f"Streamed {inserted} records into the vector store")
+        return {"status_code": 200, "message": "Data uploaded successfully!", "records": inserted}    
@@ -0,0 +1,130 @@
+from typing import Dict, List, Optional
+import re
+
+HEADING = re.compile(r"^#{1,6}\s+(.*?)\s*#*\s*$")
+IMAGE = re.compile(r"!\[[^\]]*\]\([^)]*\)")
+LINK = re.compile(r"\[([^\]]*)\]\([^)]*\)")
+EMPHASIS = re.compile(r"(\*\*|__|\*|_|`)(.+?)\1")
+WHITESPACE = re.compile(r"\s+")
+
+
+def clean_markdown(text: str) -> str:
+    """
+    Strip images, link targets and emphasis markers and collapse whitespace
+    """
+    text = IMAGE.sub("", text)
+    text = LINK.sub(r"\1", text)
+    text = EMPHASIS.sub(r"\2", text)
+    return WHITESPACE.sub(" ", text).strip()
+
+
+class RuleBasedChunker:
+    """
+    Deterministic chunker for well-structured markdown such as FAQ pages
+    Every question (a standalone line or heading ending in '?') or heading opens a section and the
+    paragraphs that follow are its answer - each section becomes one {content, overview} chunk
+    """
+    def __init__(self, min_sections: int = 3, min_coverage: float = 0.6, max_chunk_chars: int = 2000):
+        self.min_sections = min_sections
+        self.min_coverage = min_coverage
+        self.max_chunk_chars = max_chunk_chars
+
+    @staticmethod
+    def _paragraphs(content: str) -> List[str]:
+        return [paragraph.strip() for paragraph in re.split(r"\n\s*\n", content) if paragraph.strip()]
+
+    @staticmethod
+    def _is_question(paragraph: str) -> bool:
+        cleaned = clean_markdown(paragraph)
+        return "\n" not in paragraph.strip() and cleaned.endswith("?") and len(cleaned) <= 200
+
+    def _sections(self, content: str) -> List[Dict[str, object]]:
+        """
+        Group paragraphs under their question or heading - the preamble before the first one has no title
+        """
+        sections = [{"heading": None, "title": None, "body": []}]
+        heading = None
+        for paragraph in self._paragraphs(content):
+            heading_match = HEADING.match(paragraph) if "\n" not in paragraph else None
+            if heading_match and not heading_match.group(1).endswith("?"):
+                heading = clean_markdown(heading_match.group(1))
+                sections.append({"heading": heading, "title": heading, "body": []})
+            elif heading_match:
+                sections.append({"heading": heading, "title": clean_markdown(heading_match.group(1)), "body": []})
+            elif self._is_question(paragraph):
+                sections.append({"heading": heading, "title": clean_markdown(paragraph), "body": []})
+            else:
+                sections[-1]["body"].append(clean_markdown(paragraph))
+        return sections
+
+    def structure_score(self, content: str) -> float:
+        """
+        Share of body text that sits under a question with an answer
+        """
+        sections = self._sections(content)
+        total = sum(len(text) for section in sections for text in section["body"])
+        answered = sum(
+            len(text) for section in sections
+            if section["title"] and section["title"] != section["heading"] for text in section["body"]
+        )
+        return answered / total if total else 0.0
+
+    def is_structured(self, content: str) -> bool:
+        sections = [
+            section for section in self._sections(content)
+            if section["title"] and section["title"] != section["heading"] and section["body"]
+        ]
+        return len(sections) >= self.min_sections and self.structure_score(content) >= self.min_coverage
+
+    def _split(self, title: Optional[str], body: List[str], overview: str) -> List[Dict[str, str]]:
+        """
+        Chunks of one section, long bodies split on paragraph boundaries
+        """
+        chunks = []
+        prefix = f"{title} " if title else ""
+        part: List[str] = []
+        for text in body:
+            if part and len(" ".join(part + [text])) > self.max_chunk_chars:
+                chunks.append({"content": f"{prefix}{' '.join(part)}", "overview": overview})
+                part = []
+            part.append(text)
+        chunks.append({"content": f"{prefix}{' '.join(part)}", "overview": overview})
+        return chunks
+
+    @staticmethod
+    def _preamble_overview(sections: List[Dict[str, object]], preamble: List[str]) -> str:
+        """
+        Overview for the untitled text before the first question - the page's first heading, else its first sentence
+        """
+        for section in sections[1:]:
+            if section["heading"]:
+                return section["heading"]
+        return re.split(r"(?<=[.!?])\s", preamble[0], maxsplit=1)[0][:200]
+
+    def chunk(self, content: str) -> List[Dict[str, str]]:
+        """
+        One chunk per titled section with a body, long answers split on paragraph boundaries
+        Text before the first question or heading (a page intro) becomes its own untitled chunk
+        """
+        chunks = []
+        sections = self._sections(content)
+        for section in sections:
+            title, body = section["title"], [text for text in section["body"] if text]
+            if not body:
+                continue
+            if not title:
+                chunks.extend(self._split(None, body, self._preamble_overview(sections, body)))
+                continue
+            overview = title
+            if section["heading"] and section["heading"] != title:
+                overview = f"{section['heading']}: {title}"
+            chunks.extend(self._split(title, body, overview))
+        return chunks
+
+    def try_chunk(self, content: str) -> Optional[List[Dict[str, str]]]:
+        """
+        Chunks when the content looks structured, None when it should go to the LLM instead
+        """
+        if not self.is_structured(content):
+            return None
+        return self.chunk(content) or None
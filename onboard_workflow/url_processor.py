@@ -1,10 +1,20 @@
-from config.config import firecrawl_config
-import json
+from config.config import firecrawl_config, onboardconfig
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import logging
+import time
 
 class URLProcessor:
-    def __init__(self, urls):
+    def __init__(self, urls, max_concurrent=None, max_per_host=None, host_delay=None):
         self.urls = urls
         self.app = firecrawl_config
+        self.max_concurrent = max_concurrent or onboardconfig.MAX_CONCURRENT_CRAWLS
+        self.semaphore = asyncio.Semaphore(self.max_concurrent)  # max in-flight crawls
+        self.max_per_host = max_per_host or onboardconfig.MAX_CRAWLS_PER_HOST
+        self.host_delay = onboardconfig.CRAWL_HOST_DELAY if host_delay is None else host_delay
+        self._host_semaphores = {}
+        self._host_last_start = {}
 
     def get_crawled_results(self, url, limit):
         """
@@ -15,13 +25,63 @@ class URLProcessor:
         })
         return crawl_result
 
-    def get_scraped_data(self):
-        """
-        Inital call to generate data - can be async and can be used to tune in number of pages to scrape"""
-        results = []
-        
-        for url in self.urls:
-            result = self.get_crawled_results(url, 1)
-            results.append(result)
-        
-        return results
\ No newline at end of file
+    async def _wait_for_host_slot(self, host: str):
+        """
+        Politeness delay - spaces out crawl starts against the same host
+        """
+        if self.host_delay <= 0:
+            return
+        last_start = self._host_last_start.get(host)
+        now = time.monotonic()
+        if last_start is not None and now - last_start < self.host_delay:
+            wait = self.host_delay - (now - last_start)
+            self._host_last_start[host] = last_start + self.host_delay
+            await asyncio.sleep(wait)
+        else:
+            self._host_last_start[host] = now
+
+    async def _crawl(self, executor, url, limit):
+        """
+        Runs a single blocking firecrawl crawl in a worker thread, bounded globally and per host
+        """
+        host = urlparse(url).netloc
+        host_semaphore = self._host_semaphores.setdefault(host, asyncio.Semaphore(self.max_per_host))
+        # host slot and politeness delay first, so a crawl waiting on its host doesn't hold a global slot
+        async with host_semaphore:
+            await self._wait_for_host_slot(host)
+            async with self.semaphore:
+                logging.info(f"Crawling URL: {url}")
+                try:
+                    loop = asyncio.get_running_loop()
+                    return await loop.run_in_executor(executor, self.get_crawled_results, url, limit)
+                except Exception as e:
+                    logging.error(f"Error crawling URL {url}: {e}")
+                    return {}
+
+    async def get_scraped_data(self, limit=1):
+        """
+        Inital call to generate data - crawls all urls concurrently, results keep the order of self.urls
+        limit can be used to tune in number of pages to scrape"""
+        executor = ThreadPoolExecutor(max_workers=self.max_concurrent)
+        try:
+            tasks = [self._crawl(executor, url, limit) for url in self.urls]
+            return await asyncio.gather(*tasks)
+        finally:
+            # don't block the event loop on crawls still running when the caller gives up
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    async def iter_scraped_data(self, limit=1):
+        """
+        Streaming variant of get_scraped_data - yields (url, result) pairs as soon as each crawl finishes"""
+        executor = ThreadPoolExecutor(max_workers=self.max_concurrent)
+        tasks = {asyncio.create_task(self._crawl(executor, url, limit)): url for url in self.urls}
+        try:
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield tasks[task], task.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+            executor.shutdown(wait=False, cancel_futures=True)
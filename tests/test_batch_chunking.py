@@ -0,0 +1,185 @@
+import asyncio
+import json
+import os
+import tempfile
+import threading
+from email.parser import BytesParser
+from email.policy import default
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from config.config import AIAgentOnboardingDataResponse, OpenAIConfig, metaData, onboardconfig
+from onboard_workflow.chunk_cache import ChunkCache
+from onboard_workflow.clean_and_chunk import DataChunker
+
+
+def fake_completion(messages):
+    """
+    Echo the end of the user message back as a single chunk
+    """
+    content = messages[-1]["content"][-80:]
+    return json.dumps({"chunks": [{"content": content, "overview": "fake overview"}]})
+
+
+class FakeBatchHandler(BaseHTTPRequestHandler):
+    """
+    Minimal OpenAI files + batches API - a batch stays in_progress for one poll, then completes
+    Requests whose custom_id is in `fail_ids` come back with an error so the live fallback is exercised
+    """
+    lock = threading.Lock()
+    files = {}
+    batches = {}
+    polls = {}
+    fail_ids = {"1-0"}
+    live_requests = 0
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_stream(self, model, content, delta_size=16):
+        """
+        Streamed chat completion as server-sent events, a few characters per event
+        """
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        for i in range(0, len(content), delta_size):
+            event = {"id": "chatcmpl-live", "object": "chat.completion.chunk", "created": 0, "model": model,
+                     "choices": [{"index": 0, "delta": {"content": content[i:i + delta_size]}, "finish_reason": None}]}
+            self.wfile.write(f"data: {json.dumps(event)}\n\n".encode())
+        self.wfile.write(b"data: [DONE]\n\n")
+
+    def _body(self):
+        return self.rfile.read(int(self.headers["Content-Length"]))
+
+    def _batch(self, batch_id):
+        return {
+            "id": batch_id,
+            "object": "batch",
+            "endpoint": "/v1/chat/completions",
+            "completion_window": "24h",
+            "created_at": 0,
+            "request_counts": {"total": 0, "completed": 0, "failed": 0},
+            **FakeBatchHandler.batches[batch_id],
+        }
+
+    def _complete(self, batch_id):
+        batch = FakeBatchHandler.batches[batch_id]
+        lines = []
+        for line in FakeBatchHandler.files[batch["input_file_id"]].splitlines():
+            request = json.loads(line)
+            if request["custom_id"] in FakeBatchHandler.fail_ids:
+                response = {"status_code": 500, "body": {"error": {"message": "server error"}}}
+            else:
+                content = fake_completion(request["body"]["messages"])
+                response = {"status_code": 200, "body": {"choices": [{"index": 0, "message": {"role": "assistant", "content": content}}]}}
+            lines.append(json.dumps({"id": f"resp-{request['custom_id']}", "custom_id": request["custom_id"], "response": response}))
+        output_file_id = f"file-out-{batch_id}"
+        FakeBatchHandler.files[output_file_id] = "\n".join(lines)
+        batch.update(status="completed", output_file_id=output_file_id)
+
+    def do_POST(self):
+        cls = FakeBatchHandler
+        if self.path == "/v1/files":
+            message = BytesParser(policy=default).parsebytes(
+                f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode() + self._body()
+            )
+            for part in message.iter_parts():
+                if part.get_param("name", header="content-disposition") == "file":
+                    content = part.get_payload(decode=True).decode()
+            with cls.lock:
+                file_id = f"file-{len(cls.files)}"
+                cls.files[file_id] = content
+            self._send_json({"id": file_id, "object": "file", "bytes": len(content), "created_at": 0,
+                             "filename": "requests.jsonl", "purpose": "batch", "status": "processed"})
+        elif self.path == "/v1/batches":
+            payload = json.loads(self._body())
+            with cls.lock:
+                batch_id = f"batch-{len(cls.batches)}"
+                cls.batches[batch_id] = {"input_file_id": payload["input_file_id"], "status": "in_progress",
+                                         "output_file_id": None, "error_file_id": None}
+            self._send_json(self._batch(batch_id))
+        elif self.path == "/v1/chat/completions":
+            payload = json.loads(self._body())
+            with cls.lock:
+                cls.live_requests += 1
+            self._send_stream(payload["model"], fake_completion(payload["messages"]))
+        else:
+            self._send_json({"error": {"message": "not found"}}, status=404)
+
+    def do_GET(self):
+        cls = FakeBatchHandler
+        parts = self.path.strip("/").split("/")
+        if parts[1] == "batches":
+            batch_id = parts[2]
+            with cls.lock:
+                cls.polls[batch_id] = cls.polls.get(batch_id, 0) + 1
+                if cls.polls[batch_id] > 1 and cls.batches[batch_id]["status"] == "in_progress":
+                    self._complete(batch_id)
+            self._send_json(self._batch(batch_id))
+        elif parts[1] == "files" and parts[-1] == "content":
+            body = cls.files[parts[2]].encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/jsonl")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self._send_json({"error": {"message": "not found"}}, status=404)
+
+    def log_message(self, *args):
+        pass
+
+async def check_batch_chunking():
+    """
+    Test offline chunking end to end against a local fake batch server
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeBatchHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    tmp_dir = tempfile.mkdtemp()
+    onboardconfig.BATCH_JOBS_DIR = os.path.join(tmp_dir, "batch_jobs")
+    onboardconfig.BATCH_MAX_REQUESTS = 2  # force several batch jobs
+    onboardconfig.BATCH_POLL_SECONDS = 0.05
+
+    llm_config = OpenAIConfig(
+        messages="config/prompts/message_chunk_openai_v2.yaml",
+        base_url=f"http://127.0.0.1:{server.server_port}/v1",
+        api_key="sk-test",
+    )
+    data_chunker = DataChunker(llm_config, cache=ChunkCache(os.path.join(tmp_dir, "chunks.sqlite")))
+    raw_data = [
+        AIAgentOnboardingDataResponse(
+            meta_data=metaData(session_id="batch-test", source="web", url=f"https://example.com/{i}"),
+            content=f"Page {i} talks about topic {i}.",
+            overview="",
+        )
+        for i in range(5)
+    ]
+
+    chunks = await data_chunker.chunk_and_clean(raw_data, offline=True)
+    server.shutdown()
+
+    assert [chunk.meta_data.url for chunk in chunks] == [entry.meta_data.url for entry in raw_data]
+    assert all(chunk.content.endswith(f"Page {i} talks about topic {i}.") for i, chunk in enumerate(chunks))
+    assert len(os.listdir(onboardconfig.BATCH_JOBS_DIR)) == 3
+    assert FakeBatchHandler.live_requests == len(FakeBatchHandler.fail_ids)
+
+    # everything is cached now, a second offline run submits nothing
+    again = await data_chunker.chunk_and_clean(raw_data, offline=True)
+    assert [chunk.content for chunk in again] == [chunk.content for chunk in chunks]
+    assert len(os.listdir(onboardconfig.BATCH_JOBS_DIR)) == 3
+    print(f"Chunked {len(raw_data)} entries through {len(FakeBatchHandler.batches)} batch jobs")
+
+def test_batch_chunking():
+    original = onboardconfig.BATCH_JOBS_DIR, onboardconfig.BATCH_MAX_REQUESTS, onboardconfig.BATCH_POLL_SECONDS
+    try:
+        asyncio.run(check_batch_chunking())
+    finally:
+        onboardconfig.BATCH_JOBS_DIR, onboardconfig.BATCH_MAX_REQUESTS, onboardconfig.BATCH_POLL_SECONDS = original
+
+if __name__ == "__main__":
+    test_batch_chunking()
@@ -0,0 +1,89 @@
+import numpy as np
+import tempfile
+import tracemalloc
+
+from config.config import AIAgentOnboardingDataResponse, metaData
+from collection_creator.local_vector_store import LocalVectorClient
+from utils.chunk_batch import ChunkBatch, fit_dimension
+
+DIM = 3072
+
+
+def make_records(n, with_vectors=False):
+    return [
+        AIAgentOnboardingDataResponse(
+            meta_data=metaData(session_id="batch", source="web", url=f"https://example.com/{i}"),
+            content=f"content {i}",
+            overview=f"overview {i}",
+            **({"vector": [0.5] * DIM, "vector_openai": [0.25] * DIM} if with_vectors else {}),
+        )
+        for i in range(n)
+    ]
+
+
+def test_fit_dimension():
+    matrix = np.random.rand(4, DIM + 10).astype(np.float32)
+    truncated = fit_dimension(matrix, DIM)
+    assert truncated.shape == (4, DIM) and np.shares_memory(truncated, matrix)
+    padded = fit_dimension(np.ones((4, 1024), dtype=np.float32), DIM)
+    assert padded.shape == (4, DIM) and padded[:, 1024:].sum() == 0 and padded[:, :1024].sum() == 4 * 1024
+
+
+def test_batch_entities_and_memory():
+    records = make_records(50)
+    jina = np.random.rand(50, 1024).astype(np.float32)
+
+    tracemalloc.start()
+    batch = ChunkBatch(records)
+    batch.set_vectors("vector", jina, dim=DIM)
+    batch.set_vectors("vector_openai", np.random.rand(50, DIM).astype(np.float32))
+    batch_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    lists = [fit_dimension(row, DIM)[0].tolist() for row in jina]
+    lists_openai = [row.tolist() for row in batch.vectors["vector_openai"]]
+    list_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"50 chunks: {batch_bytes / 1e6:.2f} MB as float32 matrices, {list_bytes / 1e6:.2f} MB as float lists")
+    assert list_bytes > 4 * batch_bytes
+
+    entities = batch.to_entities()
+    assert entities[3]["url"] == "https://example.com/3"
+    assert entities[3]["vector"].dtype == np.float32 and entities[3]["vector"].shape == (DIM,)
+    assert np.array_equal(entities[3]["vector"][:1024], jina[3])
+
+
+def test_from_records():
+    batch = ChunkBatch.from_records(make_records(3, with_vectors=True))
+    assert batch.vectors["vector"].shape == (3, DIM) and batch.vectors["vector_openai"][0, 0] == 0.25
+    assert batch.records[0].vector == ""
+
+
+def test_source_urls_round_trip():
+    """
+    Deduplicated chunks keep the urls of their dropped copies through insert and iter_collection
+    """
+    records = make_records(3)
+    records[1].meta_data = records[1].meta_data.model_copy(
+        update={"source_urls": ["https://example.com/1", "https://mirror.example.com/1"]}
+    )
+    batch = ChunkBatch(records, {"vector": np.ones((3, 8), dtype=np.float32), "vector_openai": np.ones((3, 8), dtype=np.float32)})
+    assert batch.to_entities()[1]["source_urls"] == "https://example.com/1\nhttps://mirror.example.com/1"
+    # collections created before the source_urls field get rows without it
+    assert "source_urls" not in batch.to_entities({"content", "overview", "source", "url"})[1]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        client = LocalVectorClient(tmp_dir)
+        client.create_collection("batch", dims={"vector": 8, "vector_openai": 8})
+        client.insert_records("batch", batch)
+        stored = [record for page in client.iter_collection("batch") for record in page.records]
+    assert stored[1].meta_data.source_urls == ["https://example.com/1", "https://mirror.example.com/1"]
+    assert stored[0].meta_data.source_urls == []
+
+
+if __name__ == "__main__":
+    test_fit_dimension()
+    test_batch_entities_and_memory()
+    test_from_records()
+    test_source_urls_round_trip()
@@ -0,0 +1,64 @@
+import os
+import tempfile
+from onboard_workflow.chunk_cache import ChunkCache
+
+def test_chunk_cache_roundtrip_and_eviction():
+    """
+    Test chunk cache hits on identical inputs, misses on changed prompt/params and evicts LRU entries
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache = ChunkCache(os.path.join(tmp_dir, "chunks.sqlite"), max_bytes=400)
+        params = {"model": "gpt-4o-mini", "temperature": 0}
+        chunks = [{"content": "Q: Can I attend online? A: Yes.", "overview": "Online attendance"}]
+
+        key = ChunkCache.make_key("prompt v1", params, "batch text")
+        assert cache.get(key) is None
+        cache.put(key, chunks)
+        assert cache.get(key) == chunks
+
+        assert ChunkCache.make_key("prompt v2", params, "batch text") != key
+        assert ChunkCache.make_key("prompt v1", {**params, "model": "gpt-4o"}, "batch text") != key
+        assert ChunkCache.make_key("prompt v1", dict(reversed(params.items())), "batch text") == key
+
+        # fill past max_bytes - the first key was touched last so an older entry goes first
+        other_keys = [ChunkCache.make_key("prompt v1", params, f"batch {i}") for i in range(4)]
+        for other_key in other_keys[:2]:
+            cache.put(other_key, chunks)
+        cache.get(key)
+        for other_key in other_keys[2:]:
+            cache.put(other_key, chunks)
+
+        assert cache.get(key) == chunks
+        assert cache.get(other_keys[0]) is None
+        assert cache.hits == 3
+        cache.close()
+
+def test_chunk_cache_running_total():
+    """
+    The running byte total tracks replaced and evicted entries, a full cache is trimmed below max_bytes
+    """
+    def stored_bytes(cache):
+        return cache.conn.execute("SELECT COALESCE(SUM(size), 0) FROM chunks").fetchone()[0]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "chunks.sqlite")
+        cache = ChunkCache(path, max_bytes=2000)
+        chunks = [{"content": "x" * 50, "overview": "o"}]
+        cache.put("a", chunks)
+        cache.put("a", chunks * 2)  # replacing an entry doesn't count it twice
+        assert cache._total == stored_bytes(cache)
+
+        for i in range(100):
+            cache.put(f"key {i}", chunks)
+            assert cache._total == stored_bytes(cache) <= cache.max_bytes
+        assert cache.get("key 99") == chunks and cache.get("key 0") is None
+        cache.close()
+
+        # the total is rebuilt from the stored rows on reopen
+        reopened = ChunkCache(path, max_bytes=2000)
+        assert reopened._total == stored_bytes(reopened)
+        reopened.close()
+
+if __name__ == "__main__":
+    test_chunk_cache_roundtrip_and_eviction()
+    test_chunk_cache_running_total()
@@ -1,23 +1,20 @@
-import json
-from config.config import AIAgentOnboardingDataResponse
+import os
 from onboard_workflow.onboard import DataUploader
+from utils.snapshot import convert_json_snapshot
 import asyncio
 
 async def test_upload_data_from_json():
     """
     dTest creating a query collection
     """
-    # Load test data from JSON file
-    data_path = "data/data_snapshot_clean_llm_project.json"
-    with open(data_path, "r", encoding="utf-8") as f:
-        raw_data = json.load(f)
-
-    # Convert to model instances
-    model_data = [AIAgentOnboardingDataResponse(**item) for item in raw_data]
+    # Replay the binary snapshot, converting the checked in JSON snapshot on first run
+    data_path = "data/data_snapshot_clean_llm_project.snap"
+    if not os.path.exists(data_path):
+        convert_json_snapshot("data/data_snapshot_clean_llm_project.json", data_path)
 
     # Instantiate and call
     uploader = DataUploader()
-    result = await uploader.upload_data(model_data)
+    result = await uploader.upload_snapshot(data_path)
 
     # Assertions
     assert result["status_code"] == 200
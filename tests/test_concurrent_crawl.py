@@ -0,0 +1,138 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+from firecrawl import FirecrawlApp
+from onboard_workflow.url_processor import URLProcessor
+
+CRAWL_LATENCY = 0.3
+
+class StubFirecrawlHandler(BaseHTTPRequestHandler):
+    """
+    Minimal firecrawl v1 crawl API - every crawl takes CRAWL_LATENCY seconds and returns one page
+    """
+    lock = threading.Lock()
+    in_flight = 0
+    max_in_flight = 0
+    host_in_flight = {}
+    max_host_in_flight = {}
+    jobs = {}
+
+    def _send_json(self, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        url = payload["url"]
+        host = urlparse(url).netloc
+        cls = StubFirecrawlHandler
+        with cls.lock:
+            cls.in_flight += 1
+            cls.max_in_flight = max(cls.max_in_flight, cls.in_flight)
+            cls.host_in_flight[host] = cls.host_in_flight.get(host, 0) + 1
+            cls.max_host_in_flight[host] = max(cls.max_host_in_flight.get(host, 0), cls.host_in_flight[host])
+        time.sleep(CRAWL_LATENCY)
+        with cls.lock:
+            cls.in_flight -= 1
+            cls.host_in_flight[host] -= 1
+            job_id = str(len(cls.jobs))
+            cls.jobs[job_id] = url
+        self._send_json({"success": True, "id": job_id})
+
+    def do_GET(self):
+        url = StubFirecrawlHandler.jobs[self.path.rsplit("/", 1)[-1]]
+        self._send_json({
+            "status": "completed",
+            "data": [{"markdown": f"# {url}", "metadata": {"url": url}}],
+        })
+
+    def log_message(self, *args):
+        pass
+
+async def check_concurrent_crawl():
+    """
+    Test URL Processor crawls concurrently against a local stub firecrawl server
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubFirecrawlHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    urls = [f"https://site{i % 4}.example.com/page{i}" for i in range(12)]
+    url_processor = URLProcessor(urls, max_concurrent=6, max_per_host=2, host_delay=0)
+    url_processor.app = FirecrawlApp(api_key="fc-test", api_url=f"http://127.0.0.1:{server.server_port}")
+
+    start = time.perf_counter()
+    results = await url_processor.get_scraped_data()
+    elapsed = time.perf_counter() - start
+    server.shutdown()
+
+    assert [result["data"][0]["metadata"]["url"] for result in results] == urls
+    assert StubFirecrawlHandler.max_in_flight <= 6
+    assert max(StubFirecrawlHandler.max_host_in_flight.values()) <= 2
+    assert elapsed < len(urls) * CRAWL_LATENCY / 2
+    print(f"Crawled {len(urls)} urls in {elapsed:.2f}s (max in flight: {StubFirecrawlHandler.max_in_flight})")
+
+async def check_host_delay_holds_no_global_slot():
+    """
+    A crawl sitting out its host's politeness delay must not keep other hosts from using the global slot
+    """
+    finished = {}
+    url_processor = URLProcessor(
+        ["https://a.example.com/1", "https://a.example.com/2", "https://b.example.com/1"],
+        max_concurrent=1, max_per_host=1, host_delay=0.5,
+    )
+    start = time.perf_counter()
+
+    def get_crawled_results(url, limit):
+        time.sleep(0.01)
+        finished[url] = time.perf_counter() - start
+        return {"data": [{"markdown": url}]}
+
+    url_processor.get_crawled_results = get_crawled_results
+    await url_processor.get_scraped_data()
+    assert finished["https://b.example.com/1"] < 0.2
+    assert finished["https://a.example.com/2"] >= 0.5
+
+
+def test_concurrent_crawl():
+    asyncio.run(check_concurrent_crawl())
+
+
+def test_host_delay_holds_no_global_slot():
+    asyncio.run(check_host_delay_holds_no_global_slot())
+
+async def check_early_close_does_not_wait_for_crawls():
+    """
+    Closing the stream early returns right away instead of waiting out crawls still running in threads
+    """
+    url_processor = URLProcessor(
+        ["https://fast.example.com/", "https://slow.example.com/1", "https://slow.example.com/2"],
+        max_concurrent=2, host_delay=0,
+    )
+
+    def get_crawled_results(url, limit):
+        time.sleep(0.01 if "fast" in url else 1.0)
+        return {"data": [{"markdown": url}]}
+
+    url_processor.get_crawled_results = get_crawled_results
+    stream = url_processor.iter_scraped_data()
+    url, _ = await stream.__anext__()
+    assert url == "https://fast.example.com/"
+    start = time.perf_counter()
+    await stream.aclose()
+    assert time.perf_counter() - start < 0.5
+
+
+def test_early_close_does_not_wait_for_crawls():
+    asyncio.run(check_early_close_does_not_wait_for_crawls())
+
+if __name__ == "__main__":
+    test_concurrent_crawl()
+    test_host_delay_holds_no_global_slot()
+    test_early_close_does_not_wait_for_crawls()
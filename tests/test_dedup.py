@@ -0,0 +1,65 @@
+import json
+import time
+
+from config.config import AIAgentOnboardingDataResponse, metaData
+from onboard_workflow.dedup import ChunkDeduplicator, lsh_params
+
+FOOTER = "Copyright 2025 Example Inc. All rights reserved. Privacy Policy | Terms of Service | Contact us at hello@example.com"
+ANSWER = "Refunds are available up to 14 days before the event starts, after that tickets can be transferred to a colleague at no cost."
+
+
+def chunk(content, url, session_id="dedup"):
+    return AIAgentOnboardingDataResponse(
+        meta_data=metaData(session_id=session_id, source="web", url=url), content=content, overview=""
+    )
+
+
+def test_exact_and_near_duplicates():
+    chunks = [
+        chunk(ANSWER, "https://example.com/faq"),
+        chunk(FOOTER, "https://example.com/faq"),
+        chunk(FOOTER, "https://example.com/pricing"),  # exact copy
+        chunk(FOOTER.upper().replace("|", "-"), "https://example.com/about"),  # same after normalization
+        chunk(ANSWER + " Questions? Email us.", "https://example.com/tickets"),  # near copy
+        chunk("Parking is not included in the ticket price.", "https://example.com/faq"),
+        chunk(FOOTER, "https://example.com/faq", session_id="other"),  # other session, kept
+    ]
+    deduplicator = ChunkDeduplicator(threshold=0.8)
+    unique = deduplicator.dedupe(chunks)
+
+    assert [c.content for c in unique] == [ANSWER, FOOTER, chunks[5].content, FOOTER]
+    assert deduplicator.stats() == {"kept": 4, "exact_duplicates": 2, "near_duplicates": 1}
+    assert unique[0].meta_data.source_urls == ["https://example.com/faq", "https://example.com/tickets"]
+    assert unique[1].meta_data.source_urls == [
+        "https://example.com/faq", "https://example.com/pricing", "https://example.com/about"
+    ]
+    # chunks of one page share meta_data - provenance must not leak onto siblings
+    assert unique[2].meta_data.source_urls == []
+
+
+def test_lsh_params():
+    bands, rows = lsh_params(0.85, 128)
+    assert bands * rows == 128 and (1 / bands) ** (1 / rows) <= 0.85
+
+
+def test_snapshot_dedup():
+    with open("data/data_snapshot_clean_OpenAI.json") as f:
+        raw_data = json.load(f)
+    chunks = [
+        AIAgentOnboardingDataResponse(meta_data=item["meta_data"], content=item["content"], overview=item["overview"])
+        for item in raw_data
+    ]
+    # simulate the same FAQ crawled from two mirrors
+    mirrored = chunks + [
+        chunk(c.content, c.meta_data.url.replace("https://", "https://mirror."), c.meta_data.session_id) for c in chunks
+    ]
+    start = time.perf_counter()
+    unique = ChunkDeduplicator().dedupe(mirrored)
+    print(f"{len(mirrored)} chunks -> {len(unique)} in {time.perf_counter() - start:.3f}s")
+    assert len(unique) <= len(chunks)
+
+
+if __name__ == "__main__":
+    test_exact_and_near_duplicates()
+    test_lsh_params()
+    test_snapshot_dedup()
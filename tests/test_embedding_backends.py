@@ -0,0 +1,67 @@
+import csv
+import json
+import time
+import numpy as np
+import pytest
+
+from utils.embedding_backends import load_embedding_model
+
+MODEL_NAME = "jinaai/jina-embeddings-v3"
+TOP_K = 5
+
+
+def load_queries():
+    with open("data/faq_test_queries.csv", "r", encoding="utf-8") as f:
+        return [row["query"] for row in csv.DictReader(f)]
+
+
+def load_passages():
+    with open("data/data_snapshot_clean_OpenAI.json", "r", encoding="utf-8") as f:
+        return list(dict.fromkeys(item["content"] for item in json.load(f)))
+
+
+def top_k(queries: np.ndarray, passages: np.ndarray) -> np.ndarray:
+    return np.argsort(-(queries @ passages.T), axis=1)[:, :TOP_K]
+
+
+def encode_with(backend, queries, passages):
+    model = load_embedding_model(MODEL_NAME, backend)
+    passage_vectors = model.encode(passages, task="retrieval.passage", prompt_name="retrieval.passage", normalize_embeddings=True)
+    start = time.perf_counter()
+    query_vectors = np.stack([
+        model.encode([query], task="retrieval.query", prompt_name="retrieval.query", normalize_embeddings=True)[0]
+        for query in queries
+    ])
+    per_query = (time.perf_counter() - start) / len(queries)
+    return np.asarray(query_vectors, dtype=np.float32), np.asarray(passage_vectors, dtype=np.float32), per_query
+
+
+@pytest.mark.parametrize("backend", ["onnx", "onnx-int8"])
+def test_backend_recall_against_torch(backend):
+    """
+    The onnx backends must find (nearly) the same top-k passages for the FAQ queries as the torch model
+    """
+    pytest.importorskip("sentence_transformers")
+    pytest.importorskip("onnxruntime")
+    queries, passages = load_queries(), load_passages()
+
+    torch_queries, torch_passages, torch_latency = encode_with("torch", queries, passages)
+    query_vectors, passage_vectors, latency = encode_with(backend, queries, passages)
+
+    expected, found = top_k(torch_queries, torch_passages), top_k(query_vectors, passage_vectors)
+    recall = np.mean([len(set(e) & set(f)) / TOP_K for e, f in zip(expected, found)])
+    cosine = np.mean(np.sum(torch_queries * query_vectors, axis=1))
+    print(f"{backend}: recall@{TOP_K} {recall:.3f}, query cosine {cosine:.4f}, "
+          f"{latency * 1000:.1f}ms/query vs torch {torch_latency * 1000:.1f}ms")
+    assert recall >= 0.9
+    assert cosine >= 0.98
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        load_embedding_model(MODEL_NAME, "tensorrt")
+
+
+if __name__ == "__main__":
+    test_backend_recall_against_torch("onnx")
+    test_backend_recall_against_torch("onnx-int8")
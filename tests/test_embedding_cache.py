@@ -0,0 +1,32 @@
+import tempfile
+import numpy as np
+from utils.embedding_cache import LRUEmbeddingCache, MmapEmbeddingCache
+
+def test_embedding_cache_layers():
+    """
+    Test in-memory LRU cache over the persistent memory-mapped store, including reopening the store
+    """
+    texts = ["Where is the venue?", "Is there parking?", "Where is the venue?"]
+    vectors = np.random.default_rng(0).standard_normal((2, 1024)).astype(np.float32)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache = LRUEmbeddingCache(max_entries=1, backend=MmapEmbeddingCache(tmp_dir))
+        assert cache.get_many("jina", "retrieval.passage", texts) == [None, None, None]
+        cache.put_many("jina", "retrieval.passage", texts[:2], vectors)
+
+        cached = cache.get_many("jina", "retrieval.passage", texts)
+        np.testing.assert_array_equal(np.stack(cached), vectors[[0, 1, 0]])
+        assert cache.get_many("jina", "retrieval.query", texts[:1]) == [None]
+        assert cache.stats()["hits"] == 3
+        assert cache.stats()["backend_hits"] >= 1
+
+        reopened = MmapEmbeddingCache(tmp_dir)
+        np.testing.assert_array_equal(reopened.get_many("jina", "retrieval.passage", texts[1:2])[0], vectors[1])
+
+        reopened.put_many("openai", "default", ["Is there parking?"], np.ones((1, 3072), dtype=np.float32))
+        assert reopened.get_many("openai", "default", ["Is there parking?"])[0].shape == (3072,)
+        reopened.close()
+        cache.backend.close()
+
+if __name__ == "__main__":
+    test_embedding_cache_layers()
@@ -0,0 +1,77 @@
+import glob
+import json
+import os
+import time
+import numpy as np
+import pytest
+
+from utils.embedding_pool import CPUEmbeddingPool
+
+
+class LengthModel:
+    """
+    Stand-in model - the vector encodes the text length and the batch it was padded into
+    """
+    def encode(self, texts, batch_size=32, **kwargs):
+        longest = max(len(text) for text in texts)
+        return np.asarray([[len(text), longest, os.getpid()] for text in texts], dtype=np.float32)
+
+
+def length_model(model_name):
+    return LengthModel()
+
+
+def load_snapshot_texts():
+    texts = []
+    for path in sorted(glob.glob("data/data_snapshot_clean_*.json")):
+        with open(path, "r", encoding="utf-8") as f:
+            texts.extend(item["content"] for item in json.load(f))
+    return texts
+
+
+def test_pool_keeps_order_and_buckets_lengths():
+    texts = [f"chunk {'x' * (i * 37 % 500)}" for i in range(300)]
+    pool = CPUEmbeddingPool("fake", num_workers=3, batch_size=16, model_factory=length_model)
+    try:
+        pool.start()
+        vectors = pool.encode(texts, "retrieval.passage")
+    finally:
+        pool.close()
+
+    assert vectors.dtype == np.float32 and vectors.shape == (300, 3)
+    assert vectors[:, 0].tolist() == [len(text) for text in texts]
+    # sorted by length, each batch is padded to barely more than its own texts
+    padding = (vectors[:, 1] - vectors[:, 0]).sum() / vectors[:, 0].sum()
+    assert padding < 0.1
+
+
+def test_benchmark_snapshot_embedding():
+    pytest.importorskip("sentence_transformers")
+    from config.config import embeddingconfig
+    from utils.embedding_backends import load_embedding_model
+
+    texts = load_snapshot_texts()
+    model = load_embedding_model(embeddingconfig.JINA_MODEL_NAME)
+    start = time.perf_counter()
+    single = model.encode(texts, task="retrieval.passage", prompt_name="retrieval.passage", normalize_embeddings=True)
+    single_seconds = time.perf_counter() - start
+
+    pool = CPUEmbeddingPool(embeddingconfig.JINA_MODEL_NAME, num_workers=max(2, (os.cpu_count() or 2) // 2))
+    try:
+        pool.start()
+        pool.tune_batch_size(texts[:256], "retrieval.passage")
+        start = time.perf_counter()
+        pooled = pool.encode(texts, "retrieval.passage")
+        pooled_seconds = time.perf_counter() - start
+    finally:
+        pool.close()
+
+    print(f"{len(texts)} chunks: in-process {single_seconds:.1f}s, {pool.num_workers} workers "
+          f"{pooled_seconds:.1f}s (batch size {pool.batch_size})")
+    assert pooled.dtype == np.float32 and pooled.shape == single.shape
+    assert np.allclose(pooled, single, atol=1e-3)
+
+
+if __name__ == "__main__":
+    test_pool_keeps_order_and_buckets_lengths()
+    test_benchmark_snapshot_embedding()
@@ -0,0 +1,112 @@
+import asyncio
+import json
+import time
+import types
+
+from config.config import onboardconfig
+from onboard_workflow.file_processor import FileProcessor
+from utils.rate_limiter import TokenBucket
+
+
+class RateLimited(Exception):
+    status_code = 429
+
+
+class FakeOCR:
+    """
+    Stands in for mistral's ocr client - every call takes `latency` seconds, the first `fail_first` calls get a 429
+    """
+    def __init__(self, latency=0.1, fail_first=0):
+        self.latency = latency
+        self.fail_first = fail_first
+        self.calls = []
+        self.active = 0
+        self.peak = 0
+
+    async def process_async(self, model, document):
+        self.calls.append((document["document_url"], time.perf_counter()))
+        if len(self.calls) <= self.fail_first:
+            raise RateLimited("429 Too Many Requests")
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.active -= 1
+        pages = [{"index": 0, "markdown": document["document_url"]}]
+        return types.SimpleNamespace(model_dump_json=lambda: json.dumps({"pages": pages}))
+
+
+def make_processor(files, ocr, rate=100.0, max_concurrent=3):
+    processor = FileProcessor(files, max_concurrent=max_concurrent)
+    processor.rate_limiter = TokenBucket(rate=rate, capacity=max_concurrent)  # not the shared module limiter
+    processor.app = types.SimpleNamespace(ocr=ocr)
+    return processor
+
+
+async def check_files_overlap():
+    ocr = FakeOCR(latency=0.1)
+    files = [f"https://files.example.com/{i}.pdf" for i in range(3)]
+    start = time.perf_counter()
+    results = await make_processor(files, ocr).process_files()
+    elapsed = time.perf_counter() - start
+    assert [result["pages"][0]["markdown"] for result in results] == files
+    assert ocr.peak == 3
+    assert elapsed < 0.25
+
+
+async def check_rate_limit_backs_off():
+    ocr = FakeOCR(latency=0.01, fail_first=1)
+    result = await make_processor(["https://files.example.com/a.pdf"], ocr, rate=10.0).process_files()
+    assert result[0]["pages"][0]["markdown"] == "https://files.example.com/a.pdf"
+    assert len(ocr.calls) == 2
+    # the 429 drained the bucket for OCR_RATE_LIMIT_BACKOFF seconds before the retry
+    assert ocr.calls[1][1] - ocr.calls[0][1] >= onboardconfig.OCR_RATE_LIMIT_BACKOFF
+
+
+async def check_budget_wait_holds_no_slot():
+    # one slot, budget for one request now and the next 0.5s later
+    ocr = FakeOCR(latency=0.01)
+    processor = make_processor(["https://files.example.com/a.pdf"], ocr, rate=2.0, max_concurrent=1)
+    processor.rate_limiter.tokens = 1
+    waiting = asyncio.create_task(processor.process_files())
+    await asyncio.sleep(0.05)
+    other = asyncio.create_task(processor._perform_ocr("https://files.example.com/b.pdf"))
+    await asyncio.sleep(0.1)
+    # b waits for budget without taking the only slot
+    assert not processor.semaphore.locked()
+    await asyncio.gather(waiting, other)
+
+
+def test_files_overlap():
+    asyncio.run(check_files_overlap())
+
+
+def test_rate_limit_backs_off():
+    original = onboardconfig.OCR_RATE_LIMIT_BACKOFF
+    onboardconfig.OCR_RATE_LIMIT_BACKOFF = 0.2
+    try:
+        asyncio.run(check_rate_limit_backs_off())
+    finally:
+        onboardconfig.OCR_RATE_LIMIT_BACKOFF = original
+
+
+def test_budget_wait_holds_no_slot():
+    asyncio.run(check_budget_wait_holds_no_slot())
+
+
+def test_no_retries_configured():
+    original = onboardconfig.OCR_MAX_RETRIES
+    onboardconfig.OCR_MAX_RETRIES = 0
+    try:
+        ocr = FakeOCR(latency=0.01, fail_first=1)
+        assert asyncio.run(make_processor(["https://files.example.com/a.pdf"], ocr).process_files()) == [{}]
+    finally:
+        onboardconfig.OCR_MAX_RETRIES = original
+
+
+if __name__ == "__main__":
+    test_files_overlap()
+    test_rate_limit_backs_off()
+    test_budget_wait_holds_no_slot()
+    test_no_retries_configured()
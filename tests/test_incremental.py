@@ -0,0 +1,148 @@
+import asyncio
+import os
+import tempfile
+import types
+import numpy as np
+
+from config.config import AIAgentOnboardingDataResponse, metaData
+from collection_creator.local_vector_store import LocalVectorClient
+from collection_creator.migrate_dimensions import migrate_collection
+from onboard_workflow.fingerprints import FingerprintStore
+from onboard_workflow.incremental import IncrementalOnboarder
+from onboard_workflow.onboard import DataUploader
+
+SESSION = "session_inc"
+
+
+def page(url, content, page_number=0):
+    return AIAgentOnboardingDataResponse(
+        meta_data=metaData(session_id=SESSION, source="web", url=url, page=page_number), content=content, overview=""
+    )
+
+
+class FakeGenerator:
+    """
+    Stands in for GenerateDataSnapshot - fixed crawl results, one chunk per paragraph
+    """
+    def __init__(self):
+        self.pages = []
+        self.failed_sources = []
+        self.data_chunker = types.SimpleNamespace(chunk_and_clean=self.chunk_and_clean)
+
+    async def assign_tasks(self):
+        return list(self.pages)
+
+    async def chunk_and_clean(self, entries):
+        return [
+            AIAgentOnboardingDataResponse(meta_data=entry.meta_data, content=paragraph, overview="")
+            for entry in entries
+            for paragraph in entry.content.split("\n\n")
+        ]
+
+
+class FakeEmbeddingService:
+    def __init__(self):
+        self.embedded = []
+
+    async def embed_passages(self, texts, dim=None):
+        self.embedded.extend(texts)
+        return np.ones((len(texts), dim), dtype=np.float32)
+
+    async def embed_openai(self, texts, dim=None):
+        return np.ones((len(texts), dim), dtype=np.float32)
+
+
+def make_onboarder(directory):
+    uploader = DataUploader.__new__(DataUploader)
+    uploader.vector_db = LocalVectorClient(os.path.join(directory, "store"))
+    uploader.embedding_service = FakeEmbeddingService()
+    uploader.dimensions = {"vector": 8, "vector_openai": 8}
+
+    onboarder = IncrementalOnboarder.__new__(IncrementalOnboarder)
+    onboarder.session_id = SESSION
+    onboarder.generator = FakeGenerator()
+    onboarder.store = FingerprintStore(os.path.join(directory, "fingerprints.sqlite"))
+    onboarder.uploader = uploader
+    return onboarder
+
+
+def live_contents(client):
+    return sorted(record.content for batch in client.iter_collection(SESSION) for record in batch.records)
+
+
+async def check_incremental_run():
+    """
+    Second run: a unchanged, b edited (one paragraph kept), c gone, d's OCR failed - d must keep its rows
+    """
+    directory = tempfile.mkdtemp()
+    onboarder = make_onboarder(directory)
+    generator, uploader = onboarder.generator, onboarder.uploader
+
+    generator.pages = [
+        page("https://a.com/", "a1\n\na2"),
+        page("https://b.com/", "b1\n\nb2"),
+        page("https://c.com/", "c1"),
+        page("https://files.com/d.pdf", "d1", 0),
+        page("https://files.com/d.pdf", "d2", 1),
+    ]
+    first = await onboarder.run()
+    assert first["inserted"] == 7 and first["deleted"] == 0
+    assert live_contents(uploader.vector_db) == ["a1", "a2", "b1", "b2", "c1", "d1", "d2"]
+
+    uploader.embedding_service.embedded.clear()
+    generator.pages = [page("https://a.com/", "a1\n\na2"), page("https://b.com/", "b1\n\nb3")]
+    generator.failed_sources = ["https://files.com/d.pdf"]
+    second = await onboarder.run()
+
+    assert second["unchanged_pages"] == 1 and second["changed_pages"] == 1 and second["removed_pages"] == 1
+    assert second["inserted"] == 1 and second["deleted"] == 2
+    assert uploader.embedding_service.embedded == ["b3"]
+    assert live_contents(uploader.vector_db) == ["a1", "a2", "b1", "b3", "d1", "d2"]
+    pages = onboarder.store.get_pages(SESSION)
+    assert ("https://c.com/", 0) not in pages
+    assert ("https://files.com/d.pdf", 0) in pages and ("https://files.com/d.pdf", 1) in pages
+
+    # once d is crawled again and really gone it is removed
+    generator.failed_sources = []
+    third = await onboarder.run()
+    assert third["removed_pages"] == 2 and third["inserted"] == 0
+    assert live_contents(uploader.vector_db) == ["a1", "a2", "b1", "b3"]
+    onboarder.store.close()
+
+
+def test_incremental_run():
+    asyncio.run(check_incremental_run())
+
+
+async def check_run_after_migration():
+    """
+    A migration re-packs primary keys - the next run must still delete exactly the rows of edited pages
+    """
+    directory = tempfile.mkdtemp()
+    onboarder = make_onboarder(directory)
+    generator, uploader = onboarder.generator, onboarder.uploader
+
+    generator.pages = [page("https://a.com/", "a1\n\na2"), page("https://b.com/", "b1\n\nb2"), page("https://c.com/", "c1")]
+    await onboarder.run()
+    generator.pages = generator.pages[1:]  # a removed - its rows are tombstoned
+    await onboarder.run()
+
+    migrate_collection(
+        uploader.vector_db, SESSION, dims={"vector": 4, "vector_openai": 8}, replace=True, fingerprints=onboarder.store
+    )
+    assert live_contents(uploader.vector_db) == ["b1", "b2", "c1"]
+
+    generator.pages = [page("https://b.com/", "b1\n\nb3")]
+    result = await onboarder.run()
+    assert result["inserted"] == 1 and result["deleted"] == 2
+    assert live_contents(uploader.vector_db) == ["b1", "b3"]
+    onboarder.store.close()
+
+
+def test_run_after_migration():
+    asyncio.run(check_run_after_migration())
+
+
+if __name__ == "__main__":
+    test_incremental_run()
+    test_run_after_migration()
@@ -0,0 +1,55 @@
+import json
+
+from utils.json_stream import JSONObjectStream
+
+
+CHUNKS = [
+    {"content": "Refunds are available up to 14 days before the event.", "overview": "Refund policy"},
+    {"content": "Braces { and } and \"quotes\" inside strings are fine.", "overview": "Escaping"},
+    {"content": "Parking is not included.", "overview": "Parking"},
+]
+
+
+def test_objects_emitted_as_they_close():
+    text = "```json\n" + json.dumps({"chunks": CHUNKS}) + "\n```"
+    parser = JSONObjectStream()
+    emitted = []
+    for i in range(0, len(text), 7):  # feed in small deltas like a streamed completion
+        emitted.extend(parser.feed(text[i:i + 7]))
+    assert emitted == CHUNKS
+    assert not parser.truncated
+
+
+def test_truncated_output_salvaged():
+    text = json.dumps(CHUNKS)
+    cut = text[:text.index("Parking") + 4]
+    parser = JSONObjectStream()
+    assert parser.feed(cut) == CHUNKS[:2]
+    assert parser.truncated
+
+
+def test_first_chunk_before_end():
+    text = json.dumps({"chunks": CHUNKS})
+    parser = JSONObjectStream()
+    first_close = text.index("}") + 1
+    assert parser.feed(text[:first_close]) == CHUNKS[:1]
+
+
+def test_consumed_text_dropped():
+    chunks = [{"content": f"Answer number {i}. " * 5, "overview": f"Question {i}"} for i in range(2000)]
+    text = json.dumps({"chunks": chunks})
+    parser = JSONObjectStream()
+    emitted, longest = [], 0
+    for i in range(0, len(text), 16):
+        emitted.extend(parser.feed(text[i:i + 16]))
+        longest = max(longest, len(parser.buffer))
+    assert emitted == chunks
+    # only the object being streamed is held, not the whole response
+    assert longest < 2 * len(json.dumps(chunks[0]))
+
+
+if __name__ == "__main__":
+    test_objects_emitted_as_they_close()
+    test_truncated_output_salvaged()
+    test_first_chunk_before_end()
+    test_consumed_text_dropped()
@@ -0,0 +1,118 @@
+import asyncio
+import tempfile
+import time
+import types
+import numpy as np
+from config.config import AIAgentOnboardingDataResponse, metaData, zillizconfig
+from collection_creator.local_vector_store import LocalVectorClient, LocalVectorSearch
+
+def make_records(vectors, vectors_openai):
+    return [
+        AIAgentOnboardingDataResponse(
+            meta_data=metaData(session_id="session_local", source="web", url=f"https://example.com/{i}"),
+            content=f"content {i}",
+            overview=f"overview {i}",
+            vector=vector.tolist(),
+            vector_openai=vector_openai.tolist(),
+        )
+        for i, (vector, vector_openai) in enumerate(zip(vectors, vectors_openai))
+    ]
+
+def test_local_vector_store():
+    """
+    Test the local backend end to end - create, insert, exact cosine search and hybrid search
+    """
+    rng = np.random.default_rng(0)
+    dim, dim_openai = zillizconfig.VECTOR_DIMENSIONS["vector"], zillizconfig.VECTOR_DIMENSIONS["vector_openai"]
+    vectors = rng.standard_normal((200, dim)).astype(np.float32)
+    vectors_openai = rng.standard_normal((200, dim_openai)).astype(np.float32)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        client = LocalVectorClient(path=tmp_dir)
+        client.create_collection("session_local")
+        ids = client.insert_records("session_local", make_records(vectors[:150], vectors_openai[:150]))
+        ids += client.insert_records("session_local", make_records(vectors[150:], vectors_openai[150:]))
+        assert ids == list(range(200))
+
+        search = LocalVectorSearch(path=tmp_dir)
+        search.load_collection("session_local")
+
+        start = time.perf_counter()
+        hits = search.search(vectors[[3, 170]] * 2.0, vector_field="vector", top_k=5)
+        elapsed = time.perf_counter() - start
+        assert [query_hits[0]["id"] for query_hits in hits] == [3, 170]
+        assert abs(hits[0][0]["distance"] - 1.0) < 1e-5
+        assert hits[0][0]["content"] == "content 3"
+        assert all(a["distance"] >= b["distance"] for a, b in zip(hits[0], hits[0][1:]))
+
+        fused = search.hybrid_search({"vector": vectors[[42]], "vector_openai": vectors_openai[[42]]}, top_k=3)
+        assert fused[0][0]["id"] == 42
+        weighted = search.hybrid_search(
+            {"vector": vectors[[7]], "vector_openai": vectors_openai[[8]]}, top_k=2, ranker="weighted", weights=[0.9, 0.1]
+        )
+        assert weighted[0][0]["id"] == 7
+        print(f"Searched 200 x {dim} local collection in {elapsed * 1000:.2f}ms")
+
+def test_local_deletes():
+    """
+    Unknown and repeated ids are ignored - search keeps working and returns every live row
+    """
+    rng = np.random.default_rng(1)
+    vectors = rng.standard_normal((5, 8)).astype(np.float32)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        client = LocalVectorClient(path=tmp_dir)
+        client.create_collection("session_local", dims={"vector": 8, "vector_openai": 8})
+        client.insert_records("session_local", make_records(vectors, vectors))
+        client.delete_records("session_local", [1, 1, 99, -3])
+        client.delete_records("session_local", [1, 2])
+
+        search = LocalVectorSearch(path=tmp_dir)
+        search.load_collection("session_local")
+        hits = search.search(vectors[[0]], vector_field="vector", top_k=10)
+        assert sorted(hit["id"] for hit in hits[0]) == [0, 3, 4]
+        assert list(search.collection.deleted) == [1, 2]
+
+        # a stray tombstone past the last row (e.g. from an older version) must not break search
+        with open(f"{tmp_dir}/session_local/deleted.i64", "ab") as f:
+            f.write(np.asarray([7], dtype=np.int64).tobytes())
+        search.load_collection("session_local")
+        assert sorted(hit["id"] for hit in search.search(vectors[[0]], vector_field="vector", top_k=10)[0]) == [0, 3, 4]
+
+class SlowLocalVectorSearch(LocalVectorSearch):
+    """
+    Local search with the round trip latency of a remote vector store
+    """
+    def search(self, *args, **kwargs):
+        time.sleep(0.3)
+        return super().search(*args, **kwargs)
+
+
+async def check_search_many_fields_concurrently():
+    async def encode(queries, dim=None):
+        await asyncio.sleep(0.2)
+        return np.ones((len(queries), dim), dtype=np.float32).tolist()
+
+    service = types.SimpleNamespace(get_many_query_embeddings=encode, get_openaiembeddings=encode)
+    vectors = np.random.default_rng(2).standard_normal((4, 8)).astype(np.float32)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        client = LocalVectorClient(path=tmp_dir)
+        client.create_collection("session_local", dims={"vector": 8, "vector_openai": 8})
+        client.insert_records("session_local", make_records(vectors, vectors))
+        search = SlowLocalVectorSearch(path=tmp_dir, embedding_service=service)
+        search.load_collection("session_local")
+
+        start = time.perf_counter()
+        results = await search.search_many(["a", "b"], fields=["vector", "vector_openai"], top_k=2)
+        elapsed = time.perf_counter() - start
+    assert results["vector"]["id"].shape == results["vector_openai"]["id"].shape == (2, 2)
+    # one encode and one search round trip (0.5s), not a search per field (0.8s)
+    assert elapsed < 0.7
+
+
+def test_search_many_fields_concurrently():
+    asyncio.run(check_search_many_fields_concurrently())
+
+if __name__ == "__main__":
+    test_local_vector_store()
+    test_local_deletes()
+    test_search_many_fields_concurrently()
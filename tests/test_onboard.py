@@ -1,7 +1,7 @@
 import asyncio
 from config.config import AIAgentOnboardRequest
 from onboard_workflow.onboard import GenerateDataSnapshot
-import json
+from utils.snapshot import write_snapshot
 
 async def generate_data_snapshot():
     """
@@ -17,12 +17,7 @@ async def generate_data_snapshot():
 
     responses = await generator.get_data()
 
-    response_dicts = [response.model_dump() for response in responses]
-
-    
-    
-    with open("data/data_snapshot_clean_llm_project.json", "w") as f:
-        json.dump(response_dicts, f, indent=4)
+    write_snapshot("data/data_snapshot_clean_llm_project.snap", responses)
 
 
 # Run the test
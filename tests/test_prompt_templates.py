@@ -0,0 +1,51 @@
+import os
+import tempfile
+import time
+
+from config.config import chunk_and_clean_task_app, gemma_chunk_and_clean_task_app, OpenAIConfig
+
+
+def test_render_matches_format_messages():
+    for llm_config in [chunk_and_clean_task_app, gemma_chunk_and_clean_task_app]:
+        messages = llm_config.get_messages_from_yaml(llm_config.messages)
+        content = "Some {braced} page content"
+        compiled = llm_config.render_messages(content=content)
+        assert content in str(compiled)
+        if llm_config.api == "openai":
+            assert compiled == llm_config.format_messages(messages, content=content)
+            # system prompt is the same object every call - a byte-stable prefix
+            assert compiled[0]["content"] is llm_config.render_messages(content="other")[0]["content"]
+
+
+def test_hot_reload():
+    prompt_path = os.path.join(tempfile.mkdtemp(), "prompt.yaml")
+    with open(prompt_path, "w") as file:
+        file.write("system: |\n    Chunk it.\nuser: |\n    <content>: {content}\n")
+    llm_config = OpenAIConfig(messages=prompt_path, api_key="sk-test")
+    first = llm_config.get_prompt()
+    assert llm_config.get_prompt() is first
+
+    with open(prompt_path, "w") as file:
+        file.write("system: |\n    Chunk it carefully.\nuser: |\n    <content>: {content}\n")
+    os.utime(prompt_path, ns=(time.time_ns(), first.mtime + 1_000_000))
+    assert llm_config.render_messages(content="x")[0]["content"] == "Chunk it carefully.\n"
+
+
+def test_compiled_prompt_speed():
+    llm_config = chunk_and_clean_task_app
+    start = time.perf_counter()
+    for _ in range(1000):
+        llm_config.format_messages(llm_config.get_messages_from_yaml(llm_config.messages), content="page")
+    yaml_elapsed = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(1000):
+        llm_config.render_messages(content="page")
+    compiled_elapsed = time.perf_counter() - start
+    print(f"1000 prompts: yaml {yaml_elapsed:.3f}s, compiled {compiled_elapsed:.3f}s")
+    assert compiled_elapsed < yaml_elapsed
+
+
+if __name__ == "__main__":
+    test_render_matches_format_messages()
+    test_hot_reload()
+    test_compiled_prompt_speed()
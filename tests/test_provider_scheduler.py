@@ -0,0 +1,97 @@
+import asyncio
+import time
+
+from utils.rate_limiter import ProviderScheduler
+
+
+class FakeRateLimit(Exception):
+    pass
+
+
+def classify(exc):
+    return "rate_limit" if isinstance(exc, FakeRateLimit) else None
+
+
+async def check_aimd_backoff_and_retry():
+    scheduler = ProviderScheduler(
+        requests_per_minute=6000, tokens_per_minute=10**7, max_concurrency=8,
+        backoff=0.05, max_backoff=0.2, classify=classify,
+    )
+    active, peak, calls = 0, 0, 0
+
+    async def call():
+        nonlocal active, peak, calls
+        calls += 1
+        attempt = calls
+        active += 1
+        peak = max(peak, active)
+        try:
+            await asyncio.sleep(0.01)
+            if attempt == 5:
+                raise FakeRateLimit()
+            return "ok"
+        finally:
+            active -= 1
+
+    results = await asyncio.gather(*[scheduler.run(call, tokens=10) for _ in range(20)])
+    limits = scheduler.limits()
+    assert results == ["ok"] * 20
+    assert peak <= 8
+    assert limits["throttled"] == 1 and limits["retries"] == 1
+    assert limits["concurrency"] < 8  # halved on the 429
+
+
+async def check_non_retryable_raises():
+    scheduler = ProviderScheduler(requests_per_minute=600, tokens_per_minute=10**6, max_concurrency=2, classify=classify)
+
+    async def call():
+        raise ValueError("bad request")
+
+    try:
+        await scheduler.run(call)
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+    assert scheduler.limits()["in_flight"] == 0
+
+
+async def check_token_budget_paces_requests():
+    # 6000 tokens per minute = 100 per second with a 6 second burst
+    scheduler = ProviderScheduler(requests_per_minute=6000, tokens_per_minute=6000, max_concurrency=4, burst_seconds=1)
+
+    async def call():
+        return "ok"
+
+    start = time.perf_counter()
+    await asyncio.gather(*[scheduler.run(call, tokens=50) for _ in range(4)])
+    elapsed = time.perf_counter() - start
+    print(f"4 x 50 tokens at 100 tokens/s: {elapsed:.2f}s")
+    assert elapsed >= 0.9
+
+
+async def check_budget_wait_holds_no_slot():
+    # 100 tokens per second with a 1 second burst, one slot
+    scheduler = ProviderScheduler(requests_per_minute=6000, tokens_per_minute=6000, max_concurrency=1, burst_seconds=1)
+
+    async def call():
+        return "ok"
+
+    large = asyncio.create_task(scheduler.run(call, tokens=150))  # waits 0.5s for its tokens
+    await asyncio.sleep(0.05)
+    assert scheduler.limits()["in_flight"] == 0
+    start = time.perf_counter()
+    assert await scheduler.run(call) == "ok"
+    # the small request doesn't queue behind the one still waiting for budget
+    assert time.perf_counter() - start < 0.2 and not large.done()
+    assert await large == "ok"
+
+
+def test_scheduler():
+    asyncio.run(check_aimd_backoff_and_retry())
+    asyncio.run(check_non_retryable_raises())
+    asyncio.run(check_token_budget_paces_requests())
+    asyncio.run(check_budget_wait_holds_no_slot())
+
+
+if __name__ == "__main__":
+    test_scheduler()
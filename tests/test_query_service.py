@@ -0,0 +1,162 @@
+import asyncio
+import tempfile
+import numpy as np
+from fastapi.testclient import TestClient
+
+from config.config import AIAgentOnboardingDataResponse, metaData, queryserviceconfig, zillizconfig
+from collection_creator import query_service
+from collection_creator.local_vector_store import LocalVectorClient
+from collection_creator.migrate_dimensions import migrate_collection
+from collection_creator.query_service import LatencyMetrics, SearchBatcher, create_app
+from utils.chunk_batch import ChunkBatch
+
+DIMS = {"vector": 64, "vector_openai": 64}
+
+
+class FakeEmbeddingService:
+    """
+    "query <i>" embeds to the one-hot vector i, so record i is its only exact match
+    """
+    def __init__(self):
+        self.batches = []
+
+    def _encode(self, queries, dim):
+        self.batches.append(len(queries))
+        vectors = np.zeros((len(queries), dim), dtype=np.float32)
+        for row, query in enumerate(queries):
+            vectors[row, int(query.split()[-1])] = 1.0
+        return vectors.tolist()
+
+    async def get_many_query_embeddings(self, queries, dim=None):
+        await asyncio.sleep(0.01)
+        return self._encode(queries, dim)
+
+    async def get_openaiembeddings(self, queries, dim=None):
+        return self._encode(queries, dim)
+
+
+def make_store(path):
+    zillizconfig.VECTOR_BACKEND = "local"
+    zillizconfig.LOCAL_VECTOR_STORE_PATH = path
+    records = [
+        AIAgentOnboardingDataResponse(
+            meta_data=metaData(session_id="session_q", source="web", url=f"https://example.com/{i}"),
+            content=f"content {i}",
+            overview=f"overview {i}",
+        )
+        for i in range(64)
+    ]
+    client = LocalVectorClient(path)
+    client.create_collection("session_q", dims={"vector": 64, "vector_openai": 64})
+    client.insert_records("session_q", ChunkBatch(records, {field: np.eye(64, dim, dtype=np.float32) for field, dim in DIMS.items()}))
+    return client
+
+
+async def check_micro_batching():
+    """
+    Concurrent queries share one encode and one search instead of one each
+    """
+    service = FakeEmbeddingService()
+    batcher = SearchBatcher(service, batch_size=16, max_wait=0.02, metrics=LatencyMetrics(100))
+    batcher.start()
+    results = await asyncio.gather(*[batcher.search("session_q", f"query {i}", ["vector"], 2) for i in range(40)])
+    await batcher.stop()
+
+    assert [result["vector"][0]["content"] for result in results] == [f"content {i}" for i in range(40)]
+    assert results[3]["vector"][0]["distance"] > results[3]["vector"][1]["distance"]
+    assert sum(service.batches) == 40 and len(service.batches) <= 4
+    assert batcher.metrics.summary()["mean_batch_size"] >= 10
+
+
+def test_micro_batching():
+    original = zillizconfig.VECTOR_BACKEND, zillizconfig.LOCAL_VECTOR_STORE_PATH
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            make_store(tmp_dir)
+            asyncio.run(check_micro_batching())
+    finally:
+        zillizconfig.VECTOR_BACKEND, zillizconfig.LOCAL_VECTOR_STORE_PATH = original
+
+
+def test_query_service_endpoints():
+    original = zillizconfig.VECTOR_BACKEND, zillizconfig.LOCAL_VECTOR_STORE_PATH
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            make_store(tmp_dir)
+            with TestClient(create_app(FakeEmbeddingService())) as client:
+                response = client.post(
+                    "/collections/session_q/search", json={"query": "query 5", "fields": ["vector", "vector_openai"], "top_k": 3}
+                )
+                assert response.status_code == 200
+                body = response.json()
+                assert body["results"]["vector"][0]["content"] == "content 5"
+                assert body["results"]["vector_openai"][0]["overview"] == "overview 5"
+                assert len(body["results"]["vector"]) == 3
+
+                assert client.post("/collections/missing/search", json={"query": "query 1"}).status_code == 404
+                assert client.post("/collections/session_q/search", json={"query": "query 1", "fields": ["sparse"]}).status_code == 400
+                assert client.get("/health").json()["collections"] == ["session_q"]
+
+                metrics = client.get("/metrics").json()
+                assert metrics["requests"] == 1 and metrics["errors"] == 1
+                assert 0 < metrics["p50_ms"] <= metrics["p99_ms"]
+    finally:
+        zillizconfig.VECTOR_BACKEND, zillizconfig.LOCAL_VECTOR_STORE_PATH = original
+
+
+async def check_searcher_reload(store):
+    """
+    A cached search client is reloaded when its collection was migrated under it, and once its TTL is up
+    """
+    batcher = SearchBatcher(FakeEmbeddingService(), batch_size=4, max_wait=0.01, metrics=LatencyMetrics(100))
+    batcher.start()
+    result = await batcher.search("session_q", "query 7", ["vector"], 1)
+    assert result["vector"][0]["content"] == "content 7"
+    first = batcher.searchers["session_q"]
+
+    # replaced by a copy with a smaller vector field - the stale client's dims and files no longer match
+    migrate_collection(store, "session_q", dims={"vector": 32, "vector_openai": 64}, replace=True)
+    result = await batcher.search("session_q", "query 7", ["vector"], 1)
+    assert result["vector"][0]["content"] == "content 7"
+    assert batcher.searchers["session_q"] is not first
+    assert batcher.searchers["session_q"].dimensions["vector"] == 32
+
+    second = batcher.searchers["session_q"]
+    original = queryserviceconfig.QUERY_SEARCHER_TTL_SECONDS
+    queryserviceconfig.QUERY_SEARCHER_TTL_SECONDS = 0.0
+    try:
+        await batcher.search("session_q", "query 3", ["vector"], 1)
+    finally:
+        queryserviceconfig.QUERY_SEARCHER_TTL_SECONDS = original
+    assert batcher.searchers["session_q"] is not second
+    await batcher.stop()
+
+
+def test_searcher_reload():
+    original = zillizconfig.VECTOR_BACKEND, zillizconfig.LOCAL_VECTOR_STORE_PATH
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            asyncio.run(check_searcher_reload(make_store(tmp_dir)))
+    finally:
+        zillizconfig.VECTOR_BACKEND, zillizconfig.LOCAL_VECTOR_STORE_PATH = original
+
+
+def test_vector_store_unavailable():
+    def unreachable(**kwargs):
+        raise ConnectionError("Could not connect to Zilliz Cloud")
+
+    original = query_service.get_vector_search
+    query_service.get_vector_search = unreachable
+    try:
+        with TestClient(create_app(FakeEmbeddingService())) as client:
+            response = client.post("/collections/session_q/search", json={"query": "query 1"})
+            assert response.status_code == 503
+    finally:
+        query_service.get_vector_search = original
+
+
+if __name__ == "__main__":
+    test_micro_batching()
+    test_query_service_endpoints()
+    test_searcher_reload()
+    test_vector_store_unavailable()
@@ -0,0 +1,76 @@
+import json
+
+from onboard_workflow.rule_chunker import RuleBasedChunker
+
+
+FAQ = """# Help Center
+
+## Tickets
+
+Can I get a refund?
+
+Refunds are available up to 14 days before the event.
+
+How do I transfer my ticket?
+
+Email [support](https://example.com/support) with the new attendee's name.
+
+### Is parking included?
+
+Parking is **not** included in the ticket price.
+"""
+
+
+def test_faq_chunks():
+    chunker = RuleBasedChunker()
+    assert chunker.is_structured(FAQ)
+    chunks = chunker.chunk(FAQ)
+    assert [chunk["overview"] for chunk in chunks] == [
+        "Tickets: Can I get a refund?",
+        "Tickets: How do I transfer my ticket?",
+        "Tickets: Is parking included?",
+    ]
+    assert chunks[1]["content"] == "How do I transfer my ticket? Email support with the new attendee's name."
+    assert chunks[2]["content"] == "Is parking included? Parking is not included in the ticket price."
+    # deterministic - same input, same chunks
+    assert chunker.chunk(FAQ) == chunks
+
+
+def test_intro_is_kept():
+    chunker = RuleBasedChunker()
+    page = "Our venue opens at 9am and the first talk starts at 10am.\n\n" + FAQ
+    assert chunker.is_structured(page)
+    chunks = chunker.chunk(page)
+    assert chunks[0] == {
+        "content": "Our venue opens at 9am and the first talk starts at 10am.",
+        "overview": "Help Center",
+    }
+    assert [chunk["overview"] for chunk in chunks[1:]] == [chunk["overview"] for chunk in chunker.chunk(FAQ)]
+
+    # without any heading the intro's first sentence is its overview
+    no_heading = "Welcome to the summit. Doors open at 9am.\n\n" + FAQ.split("## Tickets\n\n", 1)[1]
+    assert chunker.chunk(no_heading)[0]["overview"] == "Welcome to the summit."
+
+
+def test_unstructured_falls_back():
+    chunker = RuleBasedChunker()
+    prose = "\n\n".join(f"Paragraph {i} about the product without any questions." for i in range(10))
+    assert not chunker.is_structured(prose)
+    assert chunker.try_chunk(prose) is None
+
+
+def test_scraped_faq_pages():
+    with open("data/scraped_data_firecrawl_project_data.json") as f:
+        pages = [page for result in json.load(f) for page in result["data"]]
+    chunker = RuleBasedChunker()
+    for page in pages:
+        chunks = chunker.try_chunk(page["markdown"])
+        print(f"{page['metadata']['url']}: {len(chunks or [])} chunks")
+        assert chunks
+
+
+if __name__ == "__main__":
+    test_faq_chunks()
+    test_intro_is_kept()
+    test_unstructured_falls_back()
+    test_scraped_faq_pages()
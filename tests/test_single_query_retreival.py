@@ -15,7 +15,7 @@ async def run_query():
         client = ZillizVectorSearch()
         client.load_collection(collection_name)
         
-        emb = await embedding_service.get_query_embeddings(query=query)
+        emb = await embedding_service.get_query_embeddings(query=query, dim=client.dimensions["vector"])
         hits = client.search(emb, vector_field="vector", top_k=3)  
 
         print(hits)
@@ -0,0 +1,97 @@
+import asyncio
+import json
+import os
+import tempfile
+import numpy as np
+
+from config.config import AIAgentOnboardingDataResponse, metaData, zillizconfig
+from utils.chunk_batch import ChunkBatch
+from utils.snapshot import Snapshot, convert_json_snapshot, write_snapshot
+
+DIM = zillizconfig.VECTOR_DIMENSION
+
+
+def make_batch(session_id, start, n):
+    records = [
+        AIAgentOnboardingDataResponse(
+            meta_data=metaData(session_id=session_id, source="web", url=f"https://example.com/{i % 3}", page=i),
+            content=f"content {i} ünïcode",
+            overview=f"overview {i}",
+        )
+        for i in range(start, start + n)
+    ]
+    vectors = np.random.rand(n, DIM).astype(np.float32)
+    return ChunkBatch(records, {"vector": vectors, "vector_openai": vectors * 2})
+
+
+def test_snapshot_round_trip():
+    path = os.path.join(tempfile.mkdtemp(), "snapshot.snap")
+    batches = [make_batch("session_a", 0, 70), make_batch("session_b", 70, 50)]
+    assert write_snapshot(path, batches, row_group_size=32) == 120
+
+    snapshot = Snapshot(path)
+    assert len(snapshot) == 120 and len(snapshot.row_groups) == 4
+    assert snapshot.sessions() == ["session_a", "session_b"]
+
+    records = list(snapshot.iter_records())
+    assert [record.content for record in records] == [f"content {i} ünïcode" for i in range(120)]
+    assert records[5].meta_data.page == 5 and records[5].vector == ""
+
+    session_b = list(snapshot.iter_batches(session_id="session_b"))
+    assert sum(len(batch) for batch in session_b) == 50
+    stored = np.concatenate([batch.vectors["vector"] for batch in session_b])
+    assert np.array_equal(stored, batches[1].vectors["vector"])
+
+    by_url = list(snapshot.iter_records(session_id="session_a", url="https://example.com/1"))
+    assert [record.overview for record in by_url] == [f"overview {i}" for i in range(1, 70, 3)]
+
+
+def test_convert_json_snapshot():
+    directory = tempfile.mkdtemp()
+    json_path = os.path.join(directory, "snapshot.json")
+    with open(json_path, "w") as f:
+        json.dump([
+            {"meta_data": {"session_id": "s", "source": "web", "url": "https://example.com"},
+             "content": f"content {i}", "overview": "overview", "vector": "", "vector_openai": ""}
+            for i in range(5)
+        ], f)
+    snapshot_path = os.path.join(directory, "snapshot.snap")
+    assert convert_json_snapshot(json_path, snapshot_path) == 5
+    snapshot = Snapshot(snapshot_path)
+    assert [record.content for record in snapshot.iter_records()] == [f"content {i}" for i in range(5)]
+    assert not snapshot.row_groups[0]["vectors"]
+
+
+async def check_upload_snapshot():
+    """
+    Replaying a snapshot with stored embeddings into the local backend doesn't embed anything again
+    """
+    from collection_creator.local_vector_store import LocalVectorClient, LocalVectorSearch
+    from onboard_workflow.onboard import DataUploader
+
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "snapshot.snap")
+    write_snapshot(path, [make_batch("session_a", 0, 70)], row_group_size=32)
+
+    uploader = DataUploader.__new__(DataUploader)
+    uploader.vector_db = LocalVectorClient(os.path.join(directory, "store"))
+    uploader.embedding_service = None  # any embedding call would fail
+    uploader.dimensions = None
+    result = await uploader.upload_snapshot(path)
+    assert result["records"] == 70
+
+    search = LocalVectorSearch(os.path.join(directory, "store"))
+    search.load_collection("session_a")
+    # stored 3072-d vectors are truncated to the collection's per-field dims instead of re-embedded
+    assert search.collection.vectors("vector").shape == (70, zillizconfig.VECTOR_DIMENSIONS["vector"])
+    assert search.collection.vectors("vector_openai").shape == (70, zillizconfig.VECTOR_DIMENSIONS["vector_openai"])
+
+
+def test_upload_snapshot():
+    asyncio.run(check_upload_snapshot())
+
+
+if __name__ == "__main__":
+    test_snapshot_round_trip()
+    test_convert_json_snapshot()
+    test_upload_snapshot()
@@ -0,0 +1,91 @@
+import json
+import re
+import time
+import tiktoken
+from onboard_workflow.batching import TokenBatcher
+
+MAX_TOKENS = 1000
+
+def naive_split(tokenizer, content, max_tokens):
+    """
+    Previous DataChunker.split_into_batches - split on ". " and encode every sentence separately
+    """
+    batches, current_batch, current_token_count = [], [], 0
+    for sentence in content.split(". "):
+        token_count = len(tokenizer.encode(sentence))
+        if current_token_count + token_count > max_tokens:
+            if current_batch:
+                batches.append(". ".join(current_batch))
+            current_batch, current_token_count = [sentence], token_count
+        else:
+            current_batch.append(sentence)
+            current_token_count += token_count
+    if current_batch:
+        batches.append(". ".join(current_batch))
+    return batches
+
+class WordTokenizer:
+    """
+    Offline stand-in for a tiktoken encoding - every word with its trailing whitespace is one token
+    """
+    def encode(self, text):
+        return [(match.start(), match.group()) for match in re.finditer(r"\S+\s*", text)]
+
+    def decode_with_offsets(self, tokens):
+        return "".join(token for _, token in tokens), [start for start, _ in tokens]
+
+
+def overlaps(batches):
+    return [len(set(a.split()) & set(b.split())) for a, b in zip(batches, batches[1:])]
+
+
+def test_overlap_starts_at_earliest_boundary():
+    # 5-word sentences, so sentence boundaries fall every 5 tokens
+    text = "".join(f"w{i} w{i + 1} w{i + 2} w{i + 3} w{i + 4}. " for i in range(0, 100, 5))
+    batches = TokenBatcher(WordTokenizer(), max_tokens=30, overlap_tokens=12).split(text)
+    assert len(batches[0].split()) == 30
+    # the earliest sentence start within the last 12 tokens is 10 tokens back, not the latest one 5 back
+    assert overlaps(batches) == [10] * (len(batches) - 1)
+
+
+def test_overlap_hard_split():
+    text = " ".join(f"w{i}" for i in range(100))
+    batches = TokenBatcher(WordTokenizer(), max_tokens=30, overlap_tokens=12).split(text)
+    assert [len(batch.split()) for batch in batches][:-1] == [30] * (len(batches) - 1)
+    # no boundary to snap to - the overlap is exactly overlap_tokens
+    assert overlaps(batches) == [12] * (len(batches) - 1)
+    assert batches[-1].split()[-1] == "w99"
+
+
+def test_split_batches_benchmark():
+    """
+    Benchmark the token batcher against the naive splitter on scraped firecrawl pages
+    """
+    with open("data/scraped_data_firecrawl.json", "r", encoding="utf-8") as f:
+        pages = [item["markdown"] for result in json.load(f) for item in result.get("data", [])]
+    tokenizer = tiktoken.get_encoding("cl100k_base")
+    batcher = TokenBatcher(tokenizer, MAX_TOKENS)
+
+    start = time.perf_counter()
+    naive_batches = [batch for page in pages for batch in naive_split(tokenizer, page, MAX_TOKENS)]
+    naive_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batches = [batch for page in pages for batch in batcher.split(page)]
+    batcher_time = time.perf_counter() - start
+
+    naive_sizes = [len(tokenizer.encode(batch)) for batch in naive_batches]
+    sizes = [len(tokenizer.encode(batch)) for batch in batches]
+    print(f"naive:   {len(naive_batches)} batches in {naive_time * 1000:.1f}ms, "
+          f"max {max(naive_sizes)} tokens, {sum(size > MAX_TOKENS for size in naive_sizes)} oversize")
+    print(f"batcher: {len(batches)} batches in {batcher_time * 1000:.1f}ms, "
+          f"max {max(sizes)} tokens, {sum(size > MAX_TOKENS for size in sizes)} oversize")
+
+    # re-encoding a batch on its own can shift a few tokens at the cut edges
+    assert max(sizes) <= MAX_TOKENS + 5
+    assert "".join(batches) == "".join(pages)
+
+if __name__ == "__main__":
+    test_overlap_starts_at_earliest_boundary()
+    test_overlap_hard_split()
+    test_split_batches_benchmark()
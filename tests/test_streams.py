@@ -0,0 +1,147 @@
+import asyncio
+import pytest
+
+from utils.streams import merge_streams, micro_batches
+
+
+async def timed(items, delay, start=0.0):
+    """
+    Yields items `delay` seconds apart, the first after `start` seconds
+    """
+    await asyncio.sleep(start)
+    for i, item in enumerate(items):
+        if i:
+            await asyncio.sleep(delay)
+        yield item
+
+
+async def failing(items, error):
+    for item in items:
+        yield item
+    await asyncio.sleep(0.01)
+    raise error
+
+
+async def endless(state):
+    """
+    Counts what it produced and records when it is closed
+    """
+    try:
+        while True:
+            state["produced"] += 1
+            yield state["produced"]
+            await asyncio.sleep(0)
+    finally:
+        state["closed"] = True
+
+
+async def collect(stream):
+    return [item async for item in stream]
+
+
+async def check_merge_interleaves():
+    merged = await collect(merge_streams(timed(["a0", "a1", "a2"], 0.04), timed(["b0", "b1"], 0.04, start=0.02)))
+    assert merged == ["a0", "b0", "a1", "b1", "a2"]
+
+
+async def check_merge_error():
+    state = {"produced": 0, "closed": False}
+    seen = []
+    with pytest.raises(ValueError, match="crawl failed"):
+        async for item in merge_streams(failing(["x"], ValueError("crawl failed")), endless(state), maxsize=4):
+            seen.append(item)
+    await asyncio.sleep(0.01)
+    assert "x" in seen
+    # the healthy stream's pump is cancelled with the merge
+    assert state["closed"]
+
+
+async def check_merge_backpressure_and_cancel():
+    state = {"produced": 0, "closed": False}
+    merged = merge_streams(endless(state), maxsize=2)
+    assert await merged.__anext__() == 1
+    await asyncio.sleep(0.05)
+    # a full queue holds the producer: 2 queued, 1 waiting on put, 1 consumed
+    assert state["produced"] <= 4
+
+    await merged.aclose()
+    await asyncio.sleep(0.01)
+    assert state["closed"]
+
+
+async def check_micro_batch_size():
+    batches = await collect(micro_batches(timed(range(10), 0), batch_size=4, max_wait=10))
+    assert batches == [(None, [0, 1, 2, 3]), (None, [4, 5, 6, 7]), (None, [8, 9])]
+
+
+async def check_micro_batch_deadline():
+    loop = asyncio.get_running_loop()
+
+    async def late_stream():
+        yield 0
+        yield 1
+        await asyncio.sleep(0.3)
+        yield 2
+
+    start = loop.time()
+    flushed = []
+    async for key, batch in micro_batches(late_stream(), batch_size=8, max_wait=0.05):
+        flushed.append((batch, loop.time() - start))
+    assert [batch for batch, _ in flushed] == [[0, 1], [2]]
+    # the partial batch goes out on its deadline, not when the next item or the end arrives
+    assert flushed[0][1] < 0.2
+
+
+async def check_micro_batch_keys():
+    batches = await collect(micro_batches(timed(range(6), 0), batch_size=2, max_wait=10, key=lambda item: item % 2))
+    assert batches == [(0, [0, 2]), (1, [1, 3]), (0, [4]), (1, [5])]
+
+
+async def check_micro_batch_error_and_cancel():
+    with pytest.raises(RuntimeError):
+        await collect(micro_batches(failing([1, 2], RuntimeError("boom")), batch_size=8, max_wait=10))
+
+    state = {"produced": 0, "closed": False}
+    batches = micro_batches(endless(state), batch_size=3, max_wait=10)
+    assert await batches.__anext__() == (None, [1, 2, 3])
+    await batches.aclose()
+    await asyncio.sleep(0.01)
+    assert state["closed"]
+
+
+def test_merge_interleaves():
+    asyncio.run(check_merge_interleaves())
+
+
+def test_merge_error():
+    asyncio.run(check_merge_error())
+
+
+def test_merge_backpressure_and_cancel():
+    asyncio.run(check_merge_backpressure_and_cancel())
+
+
+def test_micro_batch_size():
+    asyncio.run(check_micro_batch_size())
+
+
+def test_micro_batch_deadline():
+    asyncio.run(check_micro_batch_deadline())
+
+
+def test_micro_batch_keys():
+    asyncio.run(check_micro_batch_keys())
+
+
+def test_micro_batch_error_and_cancel():
+    asyncio.run(check_micro_batch_error_and_cancel())
+
+
+if __name__ == "__main__":
+    test_merge_interleaves()
+    test_merge_error()
+    test_merge_backpressure_and_cancel()
+    test_micro_batch_size()
+    test_micro_batch_deadline()
+    test_micro_batch_keys()
+    test_micro_batch_error_and_cancel()
@@ -0,0 +1,130 @@
+import asyncio
+import os
+import tempfile
+import numpy as np
+import pytest
+
+from config.config import AIAgentOnboardingDataResponse, metaData, onboardconfig
+from collection_creator.local_vector_store import LocalVectorClient
+from onboard_workflow.onboard import DataUploader
+
+SESSION = "session_upload"
+DIMS = {"vector": 8, "vector_openai": 8}
+
+
+def make_batches(num_batches, batch_size=4):
+    return [
+        [
+            AIAgentOnboardingDataResponse(
+                meta_data=metaData(session_id=SESSION, source="web", url=f"https://example.com/{b}"),
+                content=f"batch {b} chunk {i}",
+                overview="",
+            )
+            for i in range(batch_size)
+        ]
+        for b in range(num_batches)
+    ]
+
+
+class FakeEmbeddingService:
+    """
+    Slow encoders that log (stage, batch, start, end) - fail_batch makes the OpenAI stage raise on that batch
+    """
+    def __init__(self, delay=0.03, fail_batch=None):
+        self.delay = delay
+        self.fail_batch = fail_batch
+        self.intervals = []
+
+    async def _encode(self, stage, texts, dim):
+        batch = int(texts[0].split()[1])
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await asyncio.sleep(self.delay)
+        if stage == "openai" and batch == self.fail_batch:
+            raise RuntimeError(f"openai failed on batch {batch}")
+        self.intervals.append((stage, batch, start, loop.time()))
+        return np.ones((len(texts), dim), dtype=np.float32)
+
+    async def embed_passages(self, texts, dim=None):
+        return await self._encode("jina", texts, dim)
+
+    async def embed_openai(self, texts, dim=None):
+        return await self._encode("openai", texts, dim)
+
+
+def make_uploader(directory, embedding_service):
+    uploader = DataUploader.__new__(DataUploader)
+    uploader.vector_db = LocalVectorClient(os.path.join(directory, "store"))
+    uploader.embedding_service = embedding_service
+    uploader.dimensions = DIMS
+    return uploader
+
+
+async def stream(batches, produced=None):
+    for batch in batches:
+        if produced is not None:
+            produced.append(len(produced))
+        yield SESSION, batch
+
+
+async def check_pipeline_overlap():
+    """
+    Stages of consecutive batches run at the same time and every inserted id is reported
+    """
+    service = FakeEmbeddingService()
+    reported = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        uploader = make_uploader(tmp_dir, service)
+        inserted = await uploader._run_upload_pipeline(
+            stream(make_batches(6)), on_inserted=lambda session_id, records, ids: reported.extend(ids)
+        )
+        live = sum(len(batch) for batch in uploader.vector_db.iter_collection(SESSION))
+
+    assert inserted == 24 and live == 24
+    assert sorted(reported) == list(range(24))
+    spans = {(stage, batch): (start, end) for stage, batch, start, end in service.intervals}
+    # batch i+1 is jina-encoded while batch i is in the OpenAI stage
+    overlapping = [
+        batch for batch in range(5)
+        if spans[("jina", batch + 1)][0] < spans[("openai", batch)][1]
+    ]
+    assert len(overlapping) >= 3
+    # well under the 12 * delay a sequential upload needs
+    total = max(end for _, _, _, end in service.intervals) - min(start for _, _, start, _ in service.intervals)
+    assert total < 12 * service.delay * 0.75
+
+
+async def check_pipeline_failure():
+    """
+    A failing stage cancels the others instead of leaving the producer blocked on a full queue
+    """
+    service = FakeEmbeddingService(delay=0.01, fail_batch=2)
+    produced = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        uploader = make_uploader(tmp_dir, service)
+        with pytest.raises(RuntimeError, match="batch 2"):
+            await asyncio.wait_for(uploader._run_upload_pipeline(stream(make_batches(50), produced)), timeout=5)
+        await asyncio.sleep(0.05)
+
+    assert [task for task in asyncio.all_tasks() if task is not asyncio.current_task()] == []
+    # bounded queues stopped the producer long before the end of the stream
+    assert len(produced) < 50
+    assert ("openai", 3) not in {(stage, batch) for stage, batch, _, _ in service.intervals}
+
+
+def test_pipeline_overlap():
+    asyncio.run(check_pipeline_overlap())
+
+
+def test_pipeline_failure():
+    original = onboardconfig.UPLOAD_PIPELINE_DEPTH
+    onboardconfig.UPLOAD_PIPELINE_DEPTH = 1
+    try:
+        asyncio.run(check_pipeline_failure())
+    finally:
+        onboardconfig.UPLOAD_PIPELINE_DEPTH = original
+
+
+if __name__ == "__main__":
+    test_pipeline_overlap()
+    test_pipeline_failure()
@@ -0,0 +1,155 @@
+import asyncio
+import tempfile
+import types
+import numpy as np
+import pytest
+
+from config.config import AIAgentOnboardingDataResponse, metaData, zillizconfig
+from collection_creator.local_vector_store import LocalVectorClient, LocalVectorSearch
+from collection_creator.migrate_dimensions import migrate_collection
+from collection_creator.vector_backend import collection_dimensions
+from utils.chunk_batch import ChunkBatch, fit_embeddings
+
+LEGACY = zillizconfig.VECTOR_DIMENSION
+
+
+def normalize(matrix):
+    return matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+
+
+def make_records(n):
+    return [
+        AIAgentOnboardingDataResponse(
+            meta_data=metaData(session_id="legacy", source="web", url=f"https://example.com/{i}"),
+            content=f"content {i}",
+            overview=f"overview {i}",
+        )
+        for i in range(n)
+    ]
+
+
+def test_fit_embeddings():
+    matrix = normalize(np.random.default_rng(0).standard_normal((4, 1024)).astype(np.float32))
+    truncated = fit_embeddings(matrix, 256)
+    assert truncated.shape == (4, 256)
+    np.testing.assert_allclose(np.linalg.norm(truncated, axis=1), 1.0, rtol=1e-5)
+    np.testing.assert_allclose(truncated, normalize(matrix[:, :256]), rtol=1e-5)
+    padded = fit_embeddings(matrix, LEGACY)
+    assert padded.shape == (4, LEGACY) and not padded[:, 1024:].any()
+    # a padded legacy vector cut back to its native size is the original vector
+    np.testing.assert_allclose(fit_embeddings(padded, 1024), matrix, rtol=1e-5)
+
+
+def test_collection_dimensions():
+    assert collection_dimensions() == zillizconfig.VECTOR_DIMENSIONS
+    assert collection_dimensions({"vector": 256})["vector"] == 256
+    assert collection_dimensions({"vector": LEGACY, "vector_openai": LEGACY}) == {"vector": LEGACY, "vector_openai": LEGACY}
+    with pytest.raises(ValueError):
+        collection_dimensions({"vector": 2048})
+    with pytest.raises(ValueError):
+        collection_dimensions({"vector_sparse": 128})
+
+
+def test_migrate_legacy_collection():
+    """
+    A padded 3072/3072 collection migrates to 256/1024 dims without re-embedding and searches the same
+    """
+    rng = np.random.default_rng(1)
+    jina = normalize(rng.standard_normal((120, 1024)).astype(np.float32))
+    openai = normalize(rng.standard_normal((120, LEGACY)).astype(np.float32))
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        client = LocalVectorClient(path=tmp_dir)
+        client.create_collection("legacy", dims={"vector": LEGACY, "vector_openai": LEGACY})
+        client.insert_records(
+            "legacy", ChunkBatch(make_records(120), {"vector": fit_embeddings(jina, LEGACY), "vector_openai": openai})
+        )
+        client.delete_records("legacy", [5])
+
+        copied = migrate_collection(
+            client, "legacy", dims={"vector": 256, "vector_openai": 1024}, replace=True, batch_size=50
+        )
+        assert copied == 119
+        assert client.list_collections() == ["legacy"]
+        assert client.get_dimensions("legacy") == {"vector": 256, "vector_openai": 1024}
+
+        search = LocalVectorSearch(path=tmp_dir)
+        search.load_collection("legacy")
+        assert search.dimensions == {"vector": 256, "vector_openai": 1024}
+        stored = search.collection.vectors("vector")
+        np.testing.assert_allclose(stored[10], fit_embeddings(jina[11], 256)[0], rtol=1e-5)
+
+        hits = search.search(fit_embeddings(jina[[42]], 256), vector_field="vector", top_k=1)
+        assert hits[0][0]["content"] == "content 42"
+        hits = search.search(fit_embeddings(openai[[7]], 1024), vector_field="vector_openai", top_k=1)
+        assert hits[0][0]["content"] == "content 7"
+
+
+async def check_query_dims():
+    """
+    Query embeddings are fitted to the dims of the loaded collection
+    """
+    requested = {}
+
+    async def encode(queries, dim=None, native=1024):
+        requested[native] = dim
+        return fit_embeddings(np.ones((len(queries), native), dtype=np.float32), dim or LEGACY).tolist()
+
+    service = types.SimpleNamespace(
+        get_many_query_embeddings=encode,
+        get_openaiembeddings=lambda queries, dim=None: encode(queries, dim, native=3072),
+    )
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        client = LocalVectorClient(path=tmp_dir)
+        client.create_collection("session", dims={"vector": 512})
+        client.insert_records("session", ChunkBatch(make_records(3), {
+            "vector": np.ones((3, 512), dtype=np.float32), "vector_openai": np.ones((3, 3072), dtype=np.float32),
+        }))
+        search = LocalVectorSearch(path=tmp_dir, embedding_service=service)
+        search.load_collection("session")
+        results = await search.search_many(["where?"], top_k=2)
+        # a caller that embeds without dim gets the legacy padded layout, which search fits to the field
+        legacy_query = fit_embeddings(np.ones((1, 1024), dtype=np.float32), LEGACY).tolist()
+        hits = search.search(legacy_query, vector_field="vector", top_k=1)
+    assert requested == {1024: 512, 3072: 3072}
+    assert results["vector"]["id"].shape == (1, 2)
+    assert hits[0][0]["distance"] > 0.99
+
+
+def test_query_dims():
+    asyncio.run(check_query_dims())
+
+
+async def check_openai_dimensions():
+    """
+    Truncated OpenAI fields request `dimensions` and are cached apart from full size embeddings
+    """
+    from utils.embedding_cache import LRUEmbeddingCache
+    from utils.services import EmbeddingService
+
+    calls = []
+
+    def create(model, input, **kwargs):
+        calls.append(kwargs.get("dimensions"))
+        dim = kwargs.get("dimensions", 3072)
+        return types.SimpleNamespace(data=[types.SimpleNamespace(embedding=[1.0] * dim) for _ in input])
+
+    service = EmbeddingService(cache=LRUEmbeddingCache())
+    service.client = types.SimpleNamespace(embeddings=types.SimpleNamespace(create=create))
+    assert (await service.embed_openai(["a", "b"], dim=256)).shape == (2, 256)
+    assert (await service.embed_openai(["a"])).shape == (1, 3072)
+    assert (await service.embed_openai(["b"], dim=256)).shape == (1, 256)
+    assert len((await service.get_openaiembeddings("a", dim=3072))[0]) == 3072
+    assert calls == [256, None]
+
+
+def test_openai_dimensions():
+    asyncio.run(check_openai_dimensions())
+
+
+if __name__ == "__main__":
+    test_fit_embeddings()
+    test_collection_dimensions()
+    test_migrate_legacy_collection()
+    test_query_dims()
+    test_openai_dimensions()
@@ -0,0 +1,141 @@
+from typing import Any, Dict, Iterator, List, Optional, Set
+from config.config import AIAgentOnboardingDataResponse, metaData
+import numpy as np
+
+
+def fit_dimension(matrix: np.ndarray, dim: int) -> np.ndarray:
+    """
+    Truncate (a view, no copy) or zero-pad the rows of a (N, d) float32 matrix to `dim` columns
+    """
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if matrix.ndim == 1:
+        matrix = matrix.reshape(1, -1)
+    if matrix.shape[1] >= dim:
+        return matrix[:, :dim]
+    padded = np.zeros((matrix.shape[0], dim), dtype=np.float32)
+    padded[:, :matrix.shape[1]] = matrix
+    return padded
+
+
+def fit_embeddings(matrix: np.ndarray, dim: int) -> np.ndarray:
+    """
+    Fit embeddings to a field's `dim` - truncating keeps the leading Matryoshka dims and re-normalises the rows,
+    padding is only for legacy collections that store every field at VECTOR_DIMENSION
+    """
+    fitted = fit_dimension(matrix, dim)
+    if np.shape(matrix)[-1] > dim:
+        norms = np.linalg.norm(fitted, axis=1, keepdims=True)
+        fitted = fitted / np.where(norms == 0, 1.0, norms)
+    return fitted
+
+
+class ChunkBatch:
+    """
+    Columnar batch of chunks for the upload path
+    Metadata stays in the pydantic records (without vectors) while each embedding field is one contiguous
+    (N, dim) float32 matrix - 4 bytes per value instead of a boxed Python float in a list per record.
+    Rows of the matrices are numpy views, which pymilvus and the local store take without conversion.
+    """
+    def __init__(
+        self,
+        records: List[AIAgentOnboardingDataResponse],
+        vectors: Dict[str, np.ndarray] = None,
+        ids: Optional[List[int]] = None,
+    ):
+        self.records = records
+        # primary keys of rows read back from a collection, None for new chunks
+        self.ids = ids
+        self.vectors: Dict[str, np.ndarray] = {}
+        for field, matrix in (vectors or {}).items():
+            self.set_vectors(field, matrix)
+
+    @classmethod
+    def from_records(cls, records: List[AIAgentOnboardingDataResponse], fields=("vector", "vector_openai")) -> "ChunkBatch":
+        """
+        Build a batch from records that carry List[float] vectors, moving them into matrices
+        """
+        vectors = {
+            field: np.asarray([getattr(record, field) for record in records], dtype=np.float32)
+            for field in fields
+            if records and all(getattr(record, field) for record in records)
+        }
+        stripped = [record.model_copy(update={field: "" for field in fields}) for record in records]
+        return cls(stripped, vectors)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def set_vectors(self, field: str, matrix: np.ndarray, dim: int = None):
+        """
+        Attach a (N, d) embedding matrix, fitted to `dim` columns when given
+        """
+        matrix = np.asarray(matrix, dtype=np.float32)
+        if dim is not None:
+            matrix = fit_dimension(matrix, dim)
+        if matrix.shape[0] != len(self.records):
+            raise ValueError(f"{field} has {matrix.shape[0]} rows for {len(self.records)} records")
+        self.vectors[field] = matrix
+
+    def slice(self, start: int, stop: int) -> "ChunkBatch":
+        """
+        Rows start:stop - the vector matrices are views
+        """
+        return ChunkBatch(
+            self.records[start:stop],
+            {field: matrix[start:stop] for field, matrix in self.vectors.items()},
+            self.ids[start:stop] if self.ids is not None else None,
+        )
+
+    def dimension(self, field: str) -> int:
+        return self.vectors[field].shape[1]
+
+    @property
+    def nbytes(self) -> int:
+        return sum(matrix.nbytes for matrix in self.vectors.values())
+
+    def scalar_rows(self) -> Iterator[Dict[str, Any]]:
+        for record in self.records:
+            yield {
+                "content": record.content,
+                "overview": record.overview,
+                "source": record.meta_data.source,
+                "url": record.meta_data.url or "",
+                # newline joined like the snapshot column - urls never contain a newline
+                "source_urls": "\n".join(record.meta_data.source_urls),
+            }
+
+    def to_entities(self, scalar_fields: Optional[Set[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Milvus insert rows - vector values are float32 row views of the batch matrices
+        scalar_fields limits the scalar columns to those in the collection's schema (older collections lack some)
+        """
+        return [
+            {
+                **{name: value for name, value in row.items() if scalar_fields is None or name in scalar_fields},
+                **{field: matrix[i] for field, matrix in self.vectors.items()},
+            }
+            for i, row in enumerate(self.scalar_rows())
+        ]
+
+
+def rows_to_batch(session_id: str, rows: List[Dict[str, Any]], fields: List[str]) -> ChunkBatch:
+    """
+    Rebuild a ChunkBatch from stored collection rows (scalar_rows plus vector fields and the primary key),
+    e.g. for migrations
+    """
+    records = [
+        AIAgentOnboardingDataResponse(
+            meta_data=metaData(
+                session_id=session_id,
+                source=row["source"],
+                url=row["url"] or None,
+                source_urls=row["source_urls"].split("\n") if row.get("source_urls") else [],
+            ),
+            content=row["content"],
+            overview=row["overview"],
+        )
+        for row in rows
+    ]
+    vectors = {field: np.asarray([row[field] for row in rows], dtype=np.float32) for field in fields}
+    ids = [int(row["id"]) for row in rows] if all("id" in row for row in rows) else None
+    return ChunkBatch(records, vectors, ids)
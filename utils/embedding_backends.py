@@ -0,0 +1,120 @@
+from typing import Dict, List, Optional, Sequence
+import json
+import logging
+import os
+import numpy as np
+
+# Embedding backends - "torch" is the SentenceTransformer model, "onnx" runs the model's exported ONNX graph
+# with onnxruntime and "onnx-int8" a dynamically int8-quantized copy of it (built once, cached on disk).
+# Heavy imports stay inside the loaders so spawned pool workers only pay for the backend they use.
+EMBEDDING_BACKENDS = ("torch", "onnx", "onnx-int8")
+
+
+class OnnxEmbeddingModel:
+    """
+    jina-embeddings-v3 on onnxruntime, a drop-in for SentenceTransformer.encode
+    The exported graph takes the LoRA adapter as a task_id input, so retrieval.passage / retrieval.query
+    pick the same adapters as the torch model. Task prompts come from the model's sentence-transformers
+    config and pooling is the model's mean pooling over the attention mask.
+    """
+    def __init__(self, model_name: str, quantized: bool = False, cache_dir: str = "data/models", threads: Optional[int] = None):
+        try:
+            import onnxruntime
+            from huggingface_hub import snapshot_download
+            from tokenizers import Tokenizer
+        except ImportError as e:
+            raise ImportError("The onnx embedding backends need onnxruntime, tokenizers and huggingface_hub installed") from e
+
+        model_dir = snapshot_download(
+            model_name,
+            allow_patterns=["onnx/model.onnx*", "tokenizer.json", "config.json", "config_sentence_transformers.json"],
+        )
+        with open(os.path.join(model_dir, "config.json"), "r") as f:
+            config = json.load(f)
+        self.tasks: List[str] = config["lora_adaptations"]
+        self.max_length: int = min(config.get("max_position_embeddings", 8194) - 2, 8192)
+        self.prompts: Dict[str, str] = {}
+        prompts_path = os.path.join(model_dir, "config_sentence_transformers.json")
+        if os.path.exists(prompts_path):
+            with open(prompts_path, "r") as f:
+                self.prompts = json.load(f).get("prompts", {})
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(self.max_length)
+        self.tokenizer.enable_padding(pad_id=config.get("pad_token_id", 1), pad_token="<pad>")
+
+        model_path = os.path.join(model_dir, "onnx", "model.onnx")
+        if quantized:
+            model_path = self._quantize(model_path, os.path.join(cache_dir, model_name.replace("/", "__")))
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.intra_op_num_threads = threads or int(os.environ.get("OMP_NUM_THREADS", 0))
+        self.session = onnxruntime.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {node.name for node in self.session.get_inputs()}
+        logging.info(f"Loaded {model_name} onnx model from {model_path}")
+
+    @staticmethod
+    def _quantize(model_path: str, output_dir: str) -> str:
+        """
+        Dynamic int8 weights for the MatMul/Gemm ops - activations stay float and are quantized per call
+        """
+        output_path = os.path.join(output_dir, "model_int8.onnx")
+        if not os.path.exists(output_path):
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+            os.makedirs(output_dir, exist_ok=True)
+            logging.info(f"Quantizing {model_path} to {output_path}")
+            quantize_dynamic(
+                model_path, output_path, weight_type=QuantType.QInt8,
+                op_types_to_quantize=["MatMul", "Gemm"], use_external_data_format=True,
+            )
+        return output_path
+
+    def _run(self, texts: List[str], task_id: Optional[np.ndarray]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        inputs = {
+            "input_ids": np.asarray([encoding.ids for encoding in encodings], dtype=np.int64),
+            "attention_mask": np.asarray([encoding.attention_mask for encoding in encodings], dtype=np.int64),
+        }
+        if "task_id" in self.input_names and task_id is not None:
+            inputs["task_id"] = task_id
+        hidden = self.session.run(None, inputs)[0]
+        mask = inputs["attention_mask"][:, :, None].astype(np.float32)
+        return (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+
+    def encode(
+        self,
+        texts: Sequence[str],
+        task: Optional[str] = None,
+        prompt_name: Optional[str] = None,
+        batch_size: int = 32,
+        normalize_embeddings: bool = False,
+        convert_to_numpy: bool = True,
+        **kwargs,
+    ) -> np.ndarray:
+        single = isinstance(texts, str)
+        texts = [texts] if single else list(texts)
+        prefix = self.prompts.get(prompt_name, "") if prompt_name else ""
+        task_id = np.array(self.tasks.index(task), dtype=np.int64) if task else None
+
+        # length sorted batches keep padding (and wasted attention compute) down
+        order = np.argsort([-len(text) for text in texts], kind="stable")
+        vectors = np.empty((len(texts), 0), dtype=np.float32)
+        for start in range(0, len(texts), batch_size):
+            rows = order[start:start + batch_size]
+            batch = self._run([prefix + texts[i] for i in rows], task_id).astype(np.float32)
+            if not vectors.shape[1]:
+                vectors = np.empty((len(texts), batch.shape[1]), dtype=np.float32)
+            vectors[rows] = batch
+        if normalize_embeddings and len(vectors):
+            vectors /= np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+        return vectors[0] if single else vectors
+
+
+def load_embedding_model(model_name: str, backend: str = "torch", cache_dir: str = "data/models"):
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown embedding backend '{backend}', expected one of {EMBEDDING_BACKENDS}")
+    logging.info(f"Loading embedding model {model_name} ({backend})")
+    if backend == "torch":
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(model_name, trust_remote_code=True)
+    return OnnxEmbeddingModel(model_name, quantized=backend == "onnx-int8", cache_dir=cache_dir)
@@ -0,0 +1,181 @@
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+import hashlib
+import os
+import sqlite3
+import threading
+import numpy as np
+
+
+class EmbeddingCache:
+    """
+    Base embedding cache keyed on (model name, task, sha256(text)) - subclasses implement _get/_put
+    Vectors are stored as float32 and hits/misses are counted per cache layer
+    """
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(model: str, task: str, text: str) -> Tuple[str, str, str]:
+        return model, task, hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _get(self, keys: List[Tuple[str, str, str]]) -> List[Optional[np.ndarray]]:
+        raise NotImplementedError
+
+    def _put(self, keys: List[Tuple[str, str, str]], vectors: List[np.ndarray]):
+        raise NotImplementedError
+
+    def get_many(self, model: str, task: str, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        vectors = self._get([self.make_key(model, task, text) for text in texts])
+        found = sum(vector is not None for vector in vectors)
+        self.hits += found
+        self.misses += len(vectors) - found
+        return vectors
+
+    def put_many(self, model: str, task: str, texts: Sequence[str], vectors: Sequence[np.ndarray]):
+        keys = [self.make_key(model, task, text) for text in texts]
+        self._put(keys, [np.asarray(vector, dtype=np.float32) for vector in vectors])
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+class LRUEmbeddingCache(EmbeddingCache):
+    """
+    In-memory LRU cache, optionally in front of a persistent backend cache
+    Backend hits are promoted into memory
+    """
+    def __init__(self, max_entries: int = 10000, backend: Optional[EmbeddingCache] = None):
+        super().__init__()
+        self.max_entries = max_entries
+        self.backend = backend
+        self._entries: "OrderedDict[Tuple[str, str, str], np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, keys):
+        with self._lock:
+            vectors = []
+            for key in keys:
+                vector = self._entries.get(key)
+                if vector is not None:
+                    self._entries.move_to_end(key)
+                vectors.append(vector)
+
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if self.backend is not None and missing:
+            backend_vectors = self.backend._get([keys[i] for i in missing])
+            self.backend.hits += sum(vector is not None for vector in backend_vectors)
+            self.backend.misses += sum(vector is None for vector in backend_vectors)
+            promoted = [(keys[i], vector) for i, vector in zip(missing, backend_vectors) if vector is not None]
+            self._remember(promoted)
+            for i, vector in zip(missing, backend_vectors):
+                vectors[i] = vector
+        return vectors
+
+    def _put(self, keys, vectors):
+        self._remember(list(zip(keys, vectors)))
+        if self.backend is not None:
+            self.backend._put(keys, vectors)
+
+    def _remember(self, items):
+        with self._lock:
+            for key, vector in items:
+                self._entries[key] = vector
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        stats = super().stats()
+        if self.backend is not None:
+            stats.update({f"backend_{name}": value for name, value in self.backend.stats().items()})
+        return stats
+
+
+class MmapEmbeddingCache(EmbeddingCache):
+    """
+    Persistent cache - one append-only float32 matrix file per (model, task), read back through np.memmap
+    A SQLite index maps each key to its row in the matrix file
+    """
+    def __init__(self, directory: str):
+        super().__init__()
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._maps: Dict[Tuple[str, str], np.memmap] = {}
+        self.conn = sqlite3.connect(os.path.join(directory, "index.sqlite"), check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS namespaces (model TEXT, task TEXT, file TEXT, dim INTEGER, rows INTEGER, "
+            "PRIMARY KEY (model, task))"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS vectors (model TEXT, task TEXT, text_hash TEXT, row INTEGER, "
+            "PRIMARY KEY (model, task, text_hash))"
+        )
+        self.conn.commit()
+
+    def _namespace(self, model: str, task: str):
+        return self.conn.execute(
+            "SELECT file, dim, rows FROM namespaces WHERE model = ? AND task = ?", (model, task)
+        ).fetchone()
+
+    def _matrix(self, model: str, task: str, file: str, dim: int, rows: int) -> np.memmap:
+        """
+        Memory map the namespace file, remapping when rows were appended since the last map
+        """
+        matrix = self._maps.get((model, task))
+        if matrix is None or matrix.shape[0] < rows:
+            matrix = np.memmap(os.path.join(self.directory, file), dtype=np.float32, mode="r", shape=(rows, dim))
+            self._maps[(model, task)] = matrix
+        return matrix
+
+    def _get(self, keys):
+        vectors: List[Optional[np.ndarray]] = [None] * len(keys)
+        with self._lock:
+            for i, (model, task, text_hash) in enumerate(keys):
+                row = self.conn.execute(
+                    "SELECT row FROM vectors WHERE model = ? AND task = ? AND text_hash = ?", (model, task, text_hash)
+                ).fetchone()
+                if row is None:
+                    continue
+                file, dim, rows = self._namespace(model, task)
+                vectors[i] = np.array(self._matrix(model, task, file, dim, rows)[row[0]])
+        return vectors
+
+    def _put(self, keys, vectors):
+        with self._lock:
+            for (model, task, text_hash), vector in zip(keys, vectors):
+                exists = self.conn.execute(
+                    "SELECT 1 FROM vectors WHERE model = ? AND task = ? AND text_hash = ?", (model, task, text_hash)
+                ).fetchone()
+                if exists:
+                    continue
+                namespace = self._namespace(model, task)
+                if namespace is None:
+                    file = hashlib.sha256(f"{model}\0{task}".encode("utf-8")).hexdigest()[:16] + ".f32"
+                    namespace = (file, vector.shape[0], 0)
+                    self.conn.execute(
+                        "INSERT INTO namespaces (model, task, file, dim, rows) VALUES (?, ?, ?, ?, 0)",
+                        (model, task, file, vector.shape[0]),
+                    )
+                file, dim, _ = namespace
+                if vector.shape[0] != dim:
+                    raise ValueError(f"Embedding dimension {vector.shape[0]} does not match cached dimension {dim}")
+                path = os.path.join(self.directory, file)
+                # row comes from the file size so a write that never got indexed can't shift later rows
+                row = os.path.getsize(path) // (dim * 4) if os.path.exists(path) else 0
+                with open(path, "ab") as f:
+                    f.truncate(row * dim * 4)
+                    f.write(vector.astype(np.float32).tobytes())
+                self.conn.execute(
+                    "INSERT INTO vectors (model, task, text_hash, row) VALUES (?, ?, ?, ?)",
+                    (model, task, text_hash, row),
+                )
+                self.conn.execute(
+                    "UPDATE namespaces SET rows = ? WHERE model = ? AND task = ?", (row + 1, model, task)
+                )
+            self.conn.commit()
+
+    def close(self):
+        self.conn.close()
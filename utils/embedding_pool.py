@@ -0,0 +1,128 @@
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Callable, List, Optional, Sequence
+import atexit
+import logging
+import multiprocessing
+import os
+import threading
+import time
+import numpy as np
+from utils.embedding_backends import load_embedding_model
+
+# Kept free of config/model imports - spawned workers import this module before loading their model
+
+_worker_model = None
+
+
+def _init_worker(model_factory: Callable, model_name: str, threads: int):
+    global _worker_model
+    # onnxruntime sessions size their thread pool from this
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    _worker_model = model_factory(model_name)
+
+
+def _encode_in_worker(texts: List[str], task: str, batch_size: int) -> np.ndarray:
+    vectors = _worker_model.encode(
+        texts,
+        task=task,
+        prompt_name=task,
+        batch_size=batch_size,
+        normalize_embeddings=True,
+        convert_to_numpy=True,
+    )
+    return np.asarray(vectors, dtype=np.float32)
+
+
+class CPUEmbeddingPool:
+    """
+    Shards encode calls across worker processes, each holding its own model copy loaded once at startup
+    Texts are sorted by length so every batch holds similar lengths (little padding), batches are spread
+    over the workers and the results are scattered back into input order as one float32 matrix.
+    Each worker gets cpu_count / workers torch threads so the processes don't oversubscribe the cores.
+    """
+    def __init__(
+        self,
+        model_name: str,
+        num_workers: int,
+        batch_size: int = 32,
+        threads_per_worker: Optional[int] = None,
+        model_factory: Callable = load_embedding_model,
+    ):
+        self.model_name = model_name
+        self.num_workers = num_workers
+        self.batch_size = batch_size
+        threads = threads_per_worker or max(1, (os.cpu_count() or 1) // num_workers)
+        self.executor = ProcessPoolExecutor(
+            max_workers=num_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(model_factory, model_name, threads),
+        )
+        logging.info(f"Started embedding pool for {model_name}: {num_workers} workers x {threads} threads")
+
+    def start(self, task: str = "retrieval.passage"):
+        """
+        Load the model in every worker ahead of the first real request
+        """
+        futures = [self.executor.submit(_encode_in_worker, ["warmup"], task, 1) for _ in range(self.num_workers)]
+        for future in futures:
+            future.result()
+
+    def encode(self, texts: Sequence[str], task: str, batch_size: Optional[int] = None) -> np.ndarray:
+        batch_size = batch_size or self.batch_size
+        order = np.argsort([-len(text) for text in texts], kind="stable")
+        batches = [order[i:i + batch_size] for i in range(0, len(order), batch_size)]
+        futures = [
+            self.executor.submit(_encode_in_worker, [texts[i] for i in batch], task, batch_size) for batch in batches
+        ]
+        vectors = None
+        for batch, future in zip(batches, futures):
+            result = future.result()
+            if vectors is None:
+                vectors = np.empty((len(texts), result.shape[1]), dtype=np.float32)
+            vectors[batch] = result
+        return vectors if vectors is not None else np.empty((0, 0), dtype=np.float32)
+
+    def tune_batch_size(self, texts: Sequence[str], task: str, candidates=(8, 16, 32, 64, 128)) -> int:
+        """
+        Time encoding `texts` at each candidate batch size and keep the fastest
+        """
+        timings = {}
+        for batch_size in candidates:
+            start = time.perf_counter()
+            self.encode(texts, task, batch_size)
+            timings[batch_size] = time.perf_counter() - start
+        self.batch_size = min(timings, key=timings.get)
+        logging.info(f"Embedding batch size timings: {timings}, using {self.batch_size}")
+        return self.batch_size
+
+    def close(self):
+        self.executor.shutdown(cancel_futures=True)
+
+
+# process-wide, like the model registry in utils.services - pools start once and live until exit
+_embedding_pools = {}
+_embedding_pools_lock = threading.Lock()
+
+
+def get_embedding_pool(model_name: str, num_workers: int, batch_size: int = 32, backend: str = "torch") -> CPUEmbeddingPool:
+    with _embedding_pools_lock:
+        pool = _embedding_pools.get((model_name, backend))
+        if pool is None:
+            pool = CPUEmbeddingPool(
+                model_name, num_workers, batch_size, model_factory=partial(load_embedding_model, backend=backend)
+            )
+            _embedding_pools[(model_name, backend)] = pool
+        return pool
+
+
+@atexit.register
+def _close_pools():
+    for pool in _embedding_pools.values():
+        pool.close()
@@ -0,0 +1,73 @@
+from typing import Any, Dict, List, Optional
+import json
+
+
+class JSONObjectStream:
+    """
+    Incremental scanner that pulls complete JSON objects out of streamed LLM text
+    Tracks string/escape state and brace depth across feed() calls, so each object is returned as soon
+    as its closing brace arrives. Text outside objects (code fences, prose, a wrapping list or
+    {"chunks": [...]} object) is skipped and an unterminated object at the end of a truncated response
+    is simply never returned - every object completed before the cut survives.
+    """
+    def __init__(self, required_keys=("content", "overview")):
+        self.required_keys = required_keys
+        # only the text from the earliest open object that may still be returned is kept, starting at offset `base`
+        self.buffer = ""
+        self.base = 0
+        # offsets of the currently open '{' - None once the object holds a returned chunk and can't be one itself
+        self.starts: List[Optional[int]] = []
+        self.in_string = False
+        self.escaped = False
+        self.objects_found = 0
+
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        """
+        Add streamed text, return the objects with all required keys that closed within it
+        Consumed text is dropped once per feed, so a long response costs time linear in its length
+        """
+        buffer = self.buffer + text
+        base = self.base
+        found = []
+        for index in range(len(self.buffer), len(buffer)):
+            char = buffer[index]
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char == "{":
+                self.starts.append(base + index)
+            elif char == "}" and self.starts:
+                start = self.starts.pop()
+                if start is None:
+                    continue
+                obj = self._load(buffer[start - base:index + 1])
+                if isinstance(obj, dict) and all(key in obj for key in self.required_keys):
+                    found.append(obj)
+                    # enclosing objects are wrappers ({"chunks": [...]}), their text is no longer needed
+                    self.starts = [None] * len(self.starts)
+        live = [start for start in self.starts if start is not None]
+        cut = live[0] if live else base + len(buffer)
+        self.buffer = buffer[cut - base:]
+        self.base = cut
+        self.objects_found += len(found)
+        return found
+
+    @staticmethod
+    def _load(text: str) -> Any:
+        try:
+            return json.loads(text)
+        except json.JSONDecodeError:
+            return None
+
+    @property
+    def truncated(self) -> bool:
+        """
+        True when the text ended inside an object or string, i.e. the response was cut off
+        """
+        return bool(self.starts) or self.in_string
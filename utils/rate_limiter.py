@@ -0,0 +1,220 @@
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+import asyncio
+import logging
+import random
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Token bucket rate limiter shared across coroutines (and threads)
+    Refills `rate` tokens per second up to `capacity`; callers reserve tokens and sleep off any deficit
+    """
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def _reserve(self, tokens: float) -> float:
+        """
+        Take tokens from the bucket and return how long the caller has to wait for them
+        """
+        with self._lock:
+            self._refill()
+            self.tokens -= tokens
+            return max(0.0, -self.tokens / self.rate)
+
+    async def acquire(self, tokens: float = 1.0):
+        wait = self._reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def penalize(self, seconds: float):
+        """
+        Drain the bucket so every caller sharing it backs off for `seconds` - used on 429 responses
+        """
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.tokens, 0.0) - seconds * self.rate
+
+
+class ProviderScheduler:
+    """
+    Per-provider scheduler for LLM requests
+    Paces requests and tokens per minute with token buckets and caps in-flight requests with an AIMD limit -
+    halved on a rate-limit response, grown by one after a window of clean responses.
+    Rate-limited and transient failures are retried with jittered exponential backoff.
+    """
+    def __init__(
+        self,
+        requests_per_minute: float,
+        tokens_per_minute: float,
+        max_concurrency: int,
+        min_concurrency: int = 1,
+        initial_concurrency: Optional[int] = None,
+        max_retries: int = 5,
+        backoff: float = 1.0,
+        max_backoff: float = 60.0,
+        burst_seconds: float = 6.0,
+        classify: Optional[Callable[[Exception], Optional[str]]] = None,
+    ):
+        self.request_bucket = TokenBucket(requests_per_minute / 60, capacity=max(1.0, requests_per_minute / 60 * burst_seconds))
+        self.token_bucket = TokenBucket(tokens_per_minute / 60, capacity=tokens_per_minute / 60 * burst_seconds)
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.concurrency = min(max_concurrency, initial_concurrency or max_concurrency)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        # classify(exc) -> "rate_limit", "retry" or None (not retryable)
+        self.classify = classify or (lambda exc: None)
+        self.in_flight = 0
+        self.throttled = 0
+        self.retries = 0
+        self._successes = 0
+        self._last_decrease = 0.0
+        self._loop = None
+        self._cond = None
+
+    def _condition(self) -> asyncio.Condition:
+        """
+        The scheduler outlives event loops (one asyncio.run per onboarding), so rebind per loop
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop, self._cond, self.in_flight = loop, asyncio.Condition(), 0
+        return self._cond
+
+    async def _enter(self):
+        cond = self._condition()
+        async with cond:
+            await cond.wait_for(lambda: self.in_flight < self.concurrency)
+            self.in_flight += 1
+
+    async def _exit(self):
+        cond = self._condition()
+        async with cond:
+            self.in_flight -= 1
+            cond.notify_all()
+
+    def _on_success(self):
+        self._successes += 1
+        if self._successes >= self.concurrency and self.concurrency < self.max_concurrency:
+            self.concurrency += 1
+            self._successes = 0
+
+    def _on_rate_limit(self, delay: float):
+        """
+        One decrease per backoff window - a burst of 429s from requests already in flight counts once
+        """
+        self.throttled += 1
+        self._successes = 0
+        now = time.monotonic()
+        if now - self._last_decrease < delay:
+            return
+        self._last_decrease = now
+        self.concurrency = max(self.min_concurrency, self.concurrency // 2)
+        self.request_bucket.penalize(delay)
+        logging.warning(f"Rate limited, concurrency lowered to {self.concurrency} for {delay:.1f}s")
+
+    @staticmethod
+    def _retry_after(exc: Exception) -> Optional[float]:
+        headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+        try:
+            return float(headers.get("retry-after"))
+        except (TypeError, ValueError):
+            return None
+
+    def _delay(self, attempt: int, exc: Exception) -> float:
+        retry_after = self._retry_after(exc)
+        if retry_after is not None:
+            return retry_after + random.uniform(0, self.backoff)
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))  # full jitter
+
+    def _handle_error(self, exc: Exception, attempt: int) -> float:
+        """
+        Re-raise errors that can't be retried, otherwise return how long to sleep before the next attempt
+        """
+        kind = self.classify(exc)
+        if kind is None or attempt == self.max_retries:
+            raise exc
+        self.retries += 1
+        delay = self._delay(attempt, exc)
+        logging.warning(f"Retrying request ({attempt + 1}/{self.max_retries}) after {type(exc).__name__}")
+        if kind == "rate_limit":
+            self._on_rate_limit(delay)
+            return 0.0  # the penalized request bucket holds every caller back
+        return delay
+
+    async def _acquire_budget(self, tokens: float):
+        await self.request_bucket.acquire()
+        if tokens:
+            await self.token_bucket.acquire(tokens)
+
+    async def run(self, call: Callable[[], Awaitable[Any]], tokens: float = 0) -> Any:
+        """
+        Run `call` once the request/token budget is reserved and a concurrency slot is free, retrying retryable errors
+        `tokens` is the estimated token usage of the request, charged against tokens per minute
+        """
+        for attempt in range(self.max_retries + 1):
+            delay = 0.0
+            # reserve the budget first - waiting on it must not hold a slot other requests could use
+            await self._acquire_budget(tokens)
+            await self._enter()
+            try:
+                result = await call()
+            except Exception as e:
+                delay = self._handle_error(e, attempt)
+            else:
+                self._on_success()
+                return result
+            finally:
+                await self._exit()
+            await asyncio.sleep(delay)
+
+    async def stream(self, open_stream: Callable[[], Awaitable[AsyncIterator[Any]]], tokens: float = 0) -> AsyncIterator[Any]:
+        """
+        Streaming variant of run - the slot is held until the stream is consumed.
+        Failures before the first item are retried like run, later ones propagate since items were already yielded.
+        """
+        for attempt in range(self.max_retries + 1):
+            delay = 0.0
+            started = False
+            await self._acquire_budget(tokens)
+            await self._enter()
+            try:
+                async for item in await open_stream():
+                    started = True
+                    yield item
+            except Exception as e:
+                if started:
+                    raise
+                delay = self._handle_error(e, attempt)
+            else:
+                self._on_success()
+                return
+            finally:
+                await self._exit()
+            await asyncio.sleep(delay)
+
+    def limits(self) -> Dict[str, float]:
+        """
+        Current limits and counters, for logging and dashboards
+        """
+        return {
+            "concurrency": self.concurrency,
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "requests_per_minute": self.request_bucket.rate * 60,
+            "tokens_per_minute": self.token_bucket.rate * 60,
+            "throttled": self.throttled,
+            "retries": self.retries,
+        }
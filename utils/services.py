@@ -1,19 +1,49 @@
-from sentence_transformers import SentenceTransformer
-from typing import List
+from typing import List, Optional
 from fastapi import HTTPException
-from config.config import zillizconfig
+from config.config import zillizconfig, embeddingconfig
+from utils.embedding_cache import EmbeddingCache, LRUEmbeddingCache, MmapEmbeddingCache
+from utils.chunk_batch import fit_embeddings
+from utils.embedding_pool import get_embedding_pool
+from utils.embedding_backends import load_embedding_model
 import numpy as np
 import logging
 from openai import OpenAI, OpenAIError
+import asyncio
+import threading
+
+# process-wide model registry - models load on first encode and are shared by every EmbeddingService
+# (module state survives Streamlit reruns, so the UI only pays the load once per process)
+_embedding_models = {}
+_embedding_models_lock = threading.Lock()
+
+def get_embedding_model(model_name: str, backend: Optional[str] = None):
+    """
+    Returns the shared model for model_name on the configured backend (EMBEDDING_BACKEND), loading it on first use
+    """
+    backend = backend or embeddingconfig.EMBEDDING_BACKEND
+    model = _embedding_models.get((model_name, backend))
+    if model is None:
+        with _embedding_models_lock:
+            model = _embedding_models.get((model_name, backend))
+            if model is None:
+                model = load_embedding_model(model_name, backend, embeddingconfig.EMBEDDING_MODEL_DIR)
+                _embedding_models[(model_name, backend)] = model
+    return model
 
 class EmbeddingService:
     """
     This class provides services for creating and generating passage as well as query embedddings
     """
-    def __init__(self):
-        model_name = "jinaai/jina-embeddings-v3"
-        self.model = SentenceTransformer(model_name, trust_remote_code=True)
+    def __init__(self, cache: Optional[EmbeddingCache] = None):
+        model_name = embeddingconfig.JINA_MODEL_NAME
+        self.model_name = model_name
         self.task = "retrieval.passage"
+        if cache is None and embeddingconfig.EMBEDDING_CACHE_ENABLED:
+            cache = LRUEmbeddingCache(
+                max_entries=embeddingconfig.EMBEDDING_CACHE_MAX_ENTRIES,
+                backend=MmapEmbeddingCache(embeddingconfig.EMBEDDING_CACHE_PATH),
+            )
+        self.cache = cache
         try:
             logging.info("Initializing OpenAI client")
             self.client = None
@@ -23,18 +53,50 @@ class EmbeddingService:
             logging.error(f"Error initializing OpenAI client: {str(e)}")
             raise
 
-    def _pad_embedding(self, vector: np.ndarray) -> List[float]:
+    @property
+    def model(self):
+        return get_embedding_model(self.model_name)
+
+    @property
+    def cache_model_name(self) -> str:
+        # quantized / onnx vectors differ slightly from torch ones, keep them apart in the embedding cache
+        backend = embeddingconfig.EMBEDDING_BACKEND
+        return self.model_name if backend == "torch" else f"{self.model_name}@{backend}"
+
+    def warmup(self, background: bool = False):
+        """
+        Load the model and run one encode ahead of the first real request
         """
-        Pad """
-        vector = vector.tolist()
-        current_dim = len(vector)
-        target_dim = zillizconfig.VECTOR_DIMENSION
+        if background:
+            threading.Thread(target=self.warmup, daemon=True).start()
+            return
+        if embeddingconfig.EMBEDDING_WORKERS > 1:
+            self._pool().start(self.task)
+            return
+        self._encode(["warmup"], self.task)
+
+    def _pool(self):
+        return get_embedding_pool(
+            self.model_name, embeddingconfig.EMBEDDING_WORKERS, embeddingconfig.EMBEDDING_BATCH_SIZE,
+            embeddingconfig.EMBEDDING_BACKEND
+        )
 
-        if current_dim > target_dim:
-            return vector[:target_dim]
-        elif current_dim < target_dim:
-            return vector + [0.0] * (target_dim - current_dim)
-        return vector
+    def _pad_embedding(self, vector: np.ndarray, dim: Optional[int] = None) -> List[float]:
+        """
+        Matryoshka-truncate or pad to the field's dim - dim=None means the legacy layout, zero-padded to
+        VECTOR_DIMENSION, so pass the collection's dim for collections created with per-field dims
+        """
+        return fit_embeddings(vector, dim or zillizconfig.VECTOR_DIMENSION)[0].tolist()
+
+    def _to_matrix(self, vectors: List[np.ndarray], dim: Optional[int] = None) -> np.ndarray:
+        """
+        Stack encoded rows into one (N, dim) float32 matrix, padded or truncated - dim=None means the legacy
+        VECTOR_DIMENSION layout
+        """
+        dim = dim or zillizconfig.VECTOR_DIMENSION
+        if not vectors:
+            return np.empty((0, dim), dtype=np.float32)
+        return fit_embeddings(np.stack(vectors), dim)
 
     def connect(self):
         try:
@@ -44,43 +106,125 @@ class EmbeddingService:
         except Exception as e:
             logging.error(f"Error connecting to OpenAI: {str(e)}")
             raise HTTPException(status_code=500, detail="Error connecting to OpenAI")
-        
-    async def get_embeddings(self, texts: List[str]) -> List[List[float]]:
+
+    def _cached_encode(self, model_name: str, task: str, texts: List[str], encode) -> List[np.ndarray]:
+        """
+        Looks texts up in the embedding cache and only encodes the misses (once per distinct text)
+        """
+        if self.cache is None:
+            return [np.asarray(vector, dtype=np.float32) for vector in encode(texts)]
+
+        vectors = self.cache.get_many(model_name, task, texts)
+        missing_texts = list(dict.fromkeys(text for text, vector in zip(texts, vectors) if vector is None))
+        if missing_texts:
+            new_vectors = [np.asarray(vector, dtype=np.float32) for vector in encode(missing_texts)]
+            self.cache.put_many(model_name, task, missing_texts, new_vectors)
+            encoded = dict(zip(missing_texts, new_vectors))
+            vectors = [encoded[text] if vector is None else vector for text, vector in zip(texts, vectors)]
+        logging.debug(f"Embedding cache stats: {self.cache.stats()}")
+        return vectors
+
+    def _encode(self, texts: List[str], task: str):
+        if embeddingconfig.EMBEDDING_WORKERS > 1:
+            return self._pool().encode(texts, task)
+        return self.model.encode(
+            texts,
+            task=task,
+            prompt_name=task,
+            batch_size=embeddingconfig.EMBEDDING_BATCH_SIZE,
+            normalize_embeddings=True
+        )
+
+    async def embed_passages(self, texts: List[str], dim: Optional[int] = None) -> np.ndarray:
+        """
+        Passage embeddings as a (N, dim) float32 matrix - used by the upload path
+        """
+        try:
+            # encode is CPU bound - run it in a worker thread so the event loop keeps other requests moving
+            embeddings = await asyncio.to_thread(
+                self._cached_encode, self.cache_model_name, self.task, texts, lambda batch: self._encode(batch, self.task)
+            )
+            return self._to_matrix(embeddings, dim)
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Embedding error: {str(e)}")
+
+    async def get_embeddings(self, texts: List[str], dim: Optional[int] = None) -> List[List[float]]:
+        return (await self.embed_passages(texts, dim)).tolist()
+
+    async def get_query_embeddings(self, query: str, dim: Optional[int] = None) -> List[float]:
+        """
+        Query embedding fitted to dim - dim=None gives the legacy VECTOR_DIMENSION layout
+        """
         try:
-            embeddings = self.model.encode(
-                texts,
-                task=self.task,
-                prompt_name=self.task,
-                normalize_embeddings=True
+            [embedding] = self._cached_encode(
+                self.cache_model_name, "retrieval.query", [query], lambda batch: self._encode(batch, "retrieval.query")
             )
-            return [self._pad_embedding(vec) for vec in embeddings]
+            return [self._pad_embedding(embedding, dim)]
         except Exception as e:
             raise HTTPException(status_code=400, detail=f"Embedding error: {str(e)}")
 
-    async def get_query_embeddings(self, query: str) -> List[float]:
+    async def get_many_query_embeddings(self, queries: List[str], dim: Optional[int] = None) -> List[List[float]]:
+        """
+        Query embeddings for a list of queries in a single encode call
+        """
         try:
-            embedding = self.model.encode(
-                query,
-                task="retrieval.query",
-                prompt_name="retrieval.query",
-                normalize_embeddings=True
+            embeddings = await asyncio.to_thread(
+                self._cached_encode, self.cache_model_name, "retrieval.query", queries,
+                lambda batch: self._encode(batch, "retrieval.query")
             )
-            return [self._pad_embedding(embedding)]
+            return [self._pad_embedding(embedding, dim) for embedding in embeddings]
         except Exception as e:
             raise HTTPException(status_code=400, detail=f"Embedding error: {str(e)}")
-    
-    async def get_openaiembeddings(self, text: List[str]) -> List[float]:
+
+    def _openai_dimensions(self, dim: Optional[int]) -> Optional[int]:
+        """
+        The `dimensions` to request - only below the model's native size, which text-embedding-3 shortens Matryoshka style
+        """
+        return dim if dim and dim < embeddingconfig.OPENAI_EMBEDDING_DIMENSION else None
+
+    def _openai_cached_encode(self, texts: List[str], dim: Optional[int] = None) -> List[np.ndarray]:
+        dimensions = self._openai_dimensions(dim)
+        model_name = embeddingconfig.OPENAI_EMBEDDING_MODEL
+        return self._cached_encode(
+            f"{model_name}@{dimensions}" if dimensions else model_name, "default", texts,
+            lambda batch: self._openai_encode(batch, dimensions)
+        )
+
+    def _openai_encode(self, texts: List[str], dimensions: Optional[int] = None) -> List[List[float]]:
+        response = self.client.embeddings.create(
+            model=embeddingconfig.OPENAI_EMBEDDING_MODEL,
+            input=texts,
+            **({"dimensions": dimensions} if dimensions else {})
+        )
+        return [item.embedding for item in response.data]
+
+    async def embed_openai(self, texts: List[str], dim: Optional[int] = None) -> np.ndarray:
+        """
+        OpenAI embeddings as a (N, dim) float32 matrix - used by the upload path
+        """
+        try:
+            embeddings = await asyncio.to_thread(self._openai_cached_encode, texts, dim)
+            if not embeddings:
+                return np.empty((0, dim or 0), dtype=np.float32)
+            matrix = np.stack(embeddings)
+            return fit_embeddings(matrix, dim) if dim else matrix
+        except OpenAIError as e:
+            logging.error(f"Error getting embedding: {str(e)}")
+            raise HTTPException(status_code=400, detail="Error getting embedding")
+
+    async def get_openaiembeddings(self, text: List[str], dim: Optional[int] = None) -> List[float]:
         """
         Create embedddingusing openai model
         """
+        if isinstance(text, str):
+            text = [text]
         try:
             logging.debug(f"Getting embedding for list of texts of (length: {len(text)})")
-            response = self.client.embeddings.create(
-                model="text-embedding-3-large",
-                input=text
-            )
+            embeddings = await asyncio.to_thread(self._openai_cached_encode, text, dim)
             logging.debug("Successfully generated embedding")
-            return [item.embedding for item in response.data]
+            if dim:
+                return [fit_embeddings(embedding, dim)[0].tolist() for embedding in embeddings]
+            return [embedding.tolist() for embedding in embeddings]
         except OpenAIError as e:
             logging.error(f"Error getting embedding: {str(e)}")
             raise HTTPException(status_code=400, detail="Error getting embedding")
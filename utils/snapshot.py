@@ -0,0 +1,228 @@
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+from config.config import AIAgentOnboardingDataResponse, metaData
+from utils.chunk_batch import ChunkBatch
+import json
+import os
+import struct
+import numpy as np
+
+# File layout: MAGIC, row groups, JSON footer, footer length (uint64), MAGIC
+# Each row group stores its columns back to back - string columns as int64 offsets + utf-8 blob,
+# page as int64 (-1 for None) and each embedding field as a (rows, dim) float32 matrix.
+# The footer lists every row group's column offsets plus the sessions/urls it contains,
+# so readers can memory-map the file and only touch the row groups a query needs.
+SNAPSHOT_MAGIC = b"EXSNAP01"
+STRING_COLUMNS = ["session_id", "source", "url", "content", "overview", "source_urls"]
+VECTOR_FIELDS = ["vector", "vector_openai"]
+ROW_GROUP_SIZE = 1024
+
+
+def _string_column(values: List[str]) -> bytes:
+    encoded = [value.encode("utf-8") for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    return offsets.tobytes() + b"".join(encoded)
+
+
+class SnapshotWriter:
+    """
+    Streams chunks into a snapshot file one row group at a time, so only ROW_GROUP_SIZE records are held in memory
+    """
+    def __init__(self, path: str, row_group_size: int = ROW_GROUP_SIZE):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.row_group_size = row_group_size
+        self.file = open(path, "wb")
+        self.file.write(SNAPSHOT_MAGIC)
+        self.row_groups: List[Dict[str, Any]] = []
+        self.count = 0
+        self._records: List[AIAgentOnboardingDataResponse] = []
+        self._vectors: Dict[str, List[np.ndarray]] = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write(self, record: AIAgentOnboardingDataResponse):
+        self.write_batch(ChunkBatch.from_records([record]))
+
+    def write_batch(self, batch: ChunkBatch):
+        """
+        Buffer a batch, flushing full row groups - a vector field is kept only when every buffered record has it
+        """
+        if not len(batch):
+            return
+        if not self._records:
+            self._vectors = {field: [] for field in VECTOR_FIELDS if field in batch.vectors}
+        for field in list(self._vectors):
+            if field in batch.vectors:
+                self._vectors[field].append(batch.vectors[field])
+            else:
+                del self._vectors[field]
+        self._records.extend(batch.records)
+        while len(self._records) >= self.row_group_size:
+            self._flush(self.row_group_size)
+
+    def _flush(self, rows: int):
+        vectors = {field: np.concatenate(parts) for field, parts in self._vectors.items()}
+        group = ChunkBatch(self._records[:rows], {field: matrix[:rows] for field, matrix in vectors.items()})
+        self._records = self._records[rows:]
+        self._vectors = {field: [matrix[rows:]] for field, matrix in vectors.items()}
+
+        meta = [record.meta_data for record in group.records]
+        columns = {
+            "session_id": [m.session_id for m in meta],
+            "source": [m.source for m in meta],
+            "url": [m.url or "" for m in meta],
+            "content": [record.content for record in group.records],
+            "overview": [record.overview for record in group.records],
+            "source_urls": ["\n".join(m.source_urls) for m in meta],
+        }
+        info = {"rows": len(group), "columns": {}, "vectors": {},
+                "sessions": sorted(set(columns["session_id"])), "urls": sorted(set(columns["url"]))}
+        for name in STRING_COLUMNS:
+            info["columns"][name] = self._write(_string_column(columns[name]))
+        pages = np.asarray([-1 if m.page is None else m.page for m in meta], dtype=np.int64)
+        info["columns"]["page"] = self._write(pages.tobytes())
+        for field, matrix in group.vectors.items():
+            info["vectors"][field] = {"offset": self._write(np.ascontiguousarray(matrix).tobytes()), "dim": matrix.shape[1]}
+        self.row_groups.append(info)
+        self.count += len(group)
+
+    def _write(self, data: bytes) -> int:
+        # 8 byte aligned so int64/float32 columns can be viewed straight out of the memory map
+        padding = -self.file.tell() % 8
+        self.file.write(b"\0" * padding)
+        offset = self.file.tell()
+        self.file.write(data)
+        return offset
+
+    def close(self):
+        if self.file.closed:
+            return
+        if self._records:
+            self._flush(len(self._records))
+        footer = json.dumps({"count": self.count, "row_groups": self.row_groups}).encode("utf-8")
+        self.file.write(footer)
+        self.file.write(struct.pack("<Q", len(footer)))
+        self.file.write(SNAPSHOT_MAGIC)
+        self.file.close()
+
+
+class Snapshot:
+    """
+    Memory-mapped reader for snapshot files
+    Nothing is decoded up front - iterating pulls one row group at a time, and session/url filters
+    skip row groups that don't contain them using the footer index.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.data = np.memmap(path, dtype=np.uint8, mode="r")
+        if bytes(self.data[:8]) != SNAPSHOT_MAGIC or bytes(self.data[-8:]) != SNAPSHOT_MAGIC:
+            raise ValueError(f"{path} is not a snapshot file")
+        (footer_length,) = struct.unpack("<Q", bytes(self.data[-16:-8]))
+        footer = json.loads(bytes(self.data[-16 - footer_length:-16]))
+        self.count: int = footer["count"]
+        self.row_groups: List[Dict[str, Any]] = footer["row_groups"]
+
+    def __len__(self) -> int:
+        return self.count
+
+    def sessions(self) -> List[str]:
+        return sorted({session for group in self.row_groups for session in group["sessions"]})
+
+    def urls(self) -> List[str]:
+        return sorted({url for group in self.row_groups for url in group["urls"]})
+
+    def _strings(self, group: Dict[str, Any], name: str, rows: np.ndarray) -> List[str]:
+        offset = group["columns"][name]
+        offsets = np.frombuffer(self.data, dtype=np.int64, count=group["rows"] + 1, offset=offset)
+        blob = offset + offsets.nbytes
+        return [bytes(self.data[blob + offsets[i]:blob + offsets[i + 1]]).decode("utf-8") for i in rows]
+
+    def _rows(self, group: Dict[str, Any], session_id: Optional[str], url: Optional[str]) -> np.ndarray:
+        rows = np.arange(group["rows"])
+        if session_id is not None:
+            if session_id not in group["sessions"]:
+                return rows[:0]
+            rows = rows[np.asarray(self._strings(group, "session_id", rows)) == session_id]
+        if url is not None:
+            if url not in group["urls"]:
+                return rows[:0]
+            rows = rows[np.asarray(self._strings(group, "url", rows)) == url]
+        return rows
+
+    def iter_batches(
+        self, session_id: Optional[str] = None, url: Optional[str] = None, with_vectors: bool = True
+    ) -> Iterator[ChunkBatch]:
+        """
+        One ChunkBatch per row group (filtered by session and/or url) - vectors are views into the memory map
+        """
+        for group in self.row_groups:
+            rows = self._rows(group, session_id, url)
+            if not len(rows):
+                continue
+            columns = {name: self._strings(group, name, rows) for name in STRING_COLUMNS}
+            pages = np.frombuffer(self.data, dtype=np.int64, count=group["rows"], offset=group["columns"]["page"])[rows]
+            records = [
+                AIAgentOnboardingDataResponse(
+                    meta_data=metaData(
+                        session_id=columns["session_id"][i],
+                        source=columns["source"][i],
+                        url=columns["url"][i] or None,
+                        page=None if pages[i] < 0 else int(pages[i]),
+                        source_urls=columns["source_urls"][i].split("\n") if columns["source_urls"][i] else [],
+                    ),
+                    content=columns["content"][i],
+                    overview=columns["overview"][i],
+                )
+                for i in range(len(rows))
+            ]
+            vectors = {}
+            if with_vectors:
+                for field, info in group["vectors"].items():
+                    matrix = np.frombuffer(
+                        self.data, dtype=np.float32, count=group["rows"] * info["dim"], offset=info["offset"]
+                    ).reshape(group["rows"], info["dim"])
+                    vectors[field] = matrix if len(rows) == group["rows"] else matrix[rows]
+            yield ChunkBatch(records, vectors)
+
+    def iter_records(self, session_id: Optional[str] = None, url: Optional[str] = None) -> Iterator[AIAgentOnboardingDataResponse]:
+        """
+        Lazily yield records without their vectors
+        """
+        for batch in self.iter_batches(session_id, url, with_vectors=False):
+            yield from batch.records
+
+
+def write_snapshot(
+    path: str, chunks: Iterable[Union[AIAgentOnboardingDataResponse, ChunkBatch]], row_group_size: int = ROW_GROUP_SIZE
+) -> int:
+    """
+    Write records or ChunkBatches to a snapshot file, returns the number of records written
+    """
+    with SnapshotWriter(path, row_group_size) as writer:
+        for chunk in chunks:
+            if isinstance(chunk, ChunkBatch):
+                writer.write_batch(chunk)
+            else:
+                writer.write(chunk)
+    return writer.count
+
+
+def convert_json_snapshot(json_path: str, snapshot_path: str) -> int:
+    """
+    Convert a legacy data_snapshot_*.json file into the binary snapshot format
+    """
+    with open(json_path, "r", encoding="utf-8") as f:
+        raw_data = json.load(f)
+    # model_dump writes missing vectors as "", which doesn't validate back into the model
+    records = (
+        AIAgentOnboardingDataResponse(**{key: value for key, value in item.items() if value != "" or key not in VECTOR_FIELDS})
+        for item in raw_data
+    )
+    return write_snapshot(snapshot_path, records)
@@ -0,0 +1,93 @@
+from typing import Any, AsyncIterable, AsyncIterator, Callable, Dict, List, Tuple
+import asyncio
+
+_STREAM_DONE = object()
+
+
+class _StreamError:
+    def __init__(self, error: Exception):
+        self.error = error
+
+
+async def _pump(stream: AsyncIterable, queue: asyncio.Queue):
+    """
+    Copy a stream into a queue, ending with a done marker (or the error that stopped it)
+    When the pump is cancelled the stream is closed too, so its own cleanup runs even while it waits on a full queue
+    """
+    try:
+        async for item in stream:
+            await queue.put(item)
+    except Exception as e:
+        await queue.put(_StreamError(e))
+    else:
+        await queue.put(_STREAM_DONE)
+    finally:
+        aclose = getattr(stream, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+
+async def merge_streams(*streams: AsyncIterable, maxsize: int = 0) -> AsyncIterator[Any]:
+    """
+    Yield items from several async streams in the order they are produced
+    The bounded queue makes fast producers wait for the consumer
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize)
+    tasks = [asyncio.create_task(_pump(stream, queue)) for stream in streams]
+    try:
+        remaining = len(tasks)
+        while remaining:
+            item = await queue.get()
+            if item is _STREAM_DONE:
+                remaining -= 1
+            elif isinstance(item, _StreamError):
+                raise item.error
+            else:
+                yield item
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def micro_batches(
+    stream: AsyncIterable,
+    batch_size: int,
+    max_wait: float,
+    key: Callable[[Any], Any] = lambda item: None,
+) -> AsyncIterator[Tuple[Any, List[Any]]]:
+    """
+    Group stream items by key into (key, batch) lists of up to batch_size
+    A partial batch is flushed once its first item has waited max_wait seconds
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(batch_size)
+    pump_task = asyncio.create_task(_pump(stream, queue))
+    buffers: Dict[Any, List[Any]] = {}
+    deadlines: Dict[Any, float] = {}
+    try:
+        while True:
+            timeout = max(0.0, min(deadlines.values()) - loop.time()) if deadlines else None
+            try:
+                item = await asyncio.wait_for(queue.get(), timeout)
+            except asyncio.TimeoutError:
+                now = loop.time()
+                for batch_key in [batch_key for batch_key, deadline in deadlines.items() if deadline <= now]:
+                    del deadlines[batch_key]
+                    yield batch_key, buffers.pop(batch_key)
+                continue
+
+            if item is _STREAM_DONE:
+                break
+            if isinstance(item, _StreamError):
+                raise item.error
+            batch_key = key(item)
+            buffers.setdefault(batch_key, []).append(item)
+            deadlines.setdefault(batch_key, loop.time() + max_wait)
+            if len(buffers[batch_key]) >= batch_size:
+                del deadlines[batch_key]
+                yield batch_key, buffers.pop(batch_key)
+
+        for batch_key, batch in buffers.items():
+            yield batch_key, batch
+    finally:
+        pump_task.cancel()